@@ -1,7 +1,20 @@
 from dataiku.connector import Connector
 from dataikuapi.utils import DataikuException
 from odata_client import ODataClient
-from odata_common import get_clean_row_method, get_list_title, RecordsLimit, get_sap_mode
+from odata_common import get_clean_row_method, get_hash_key, get_list_title, RecordsLimit, get_sap_mode, CompiledRowCleaner
+from odata_pagination import (
+    ClientSidePager, ParallelClientSidePager, BatchClientSidePager, ServerSidePager, PrefetchingServerSidePager,
+    KeysetPager, ShardedPager, sample_shard_boundaries, get_property_extremes
+)
+from odata_partitioning import ODataPartitioning
+from odata_incremental import StateStore, HighWaterMark, Checkpoint
+from odata_filters import build_shard_filters, combine_filters, format_literal, parse_shard_boundaries
+from odata_writer import ODataWriter
+from odata_tuning import BulkSizeTuner
+from odata_async import AsyncClientSidePager, AsyncShardedPager
+from odata_expand import ExpandedRowBuilder, EXPAND_SEPARATOR, parse_expand, format_expand
+from odata_constants import ODataConstants
+import cProfile
 import logging
 
 
@@ -12,6 +25,8 @@ logging.basicConfig(level=logging.INFO,
 
 class SAPODataConnector(Connector):
 
+    MAX_RESUMES = 3
+
     def __init__(self, config, plugin_config):
         """
         The configuration parameters set up by the user in the settings tab of the
@@ -21,17 +36,84 @@ class SAPODataConnector(Connector):
         object 'plugin_config' to the constructor
         """
         Connector.__init__(self, config, plugin_config)
-        logger.info("Starting SAP-OData v1.0.4")
+        logger.info("Starting SAP-OData v1.1.0")
         self.odata_list_title = get_list_title(config)
         self.bulk_size = config.get("bulk_size", 1000)
         self.odata_filter_query = ""
         self.sap_mode = get_sap_mode(config)
+        self.parallel_pages = 1
+        self.pages_per_batch = 1
+        self.stream_pages = False
+        self.typed_schema = False
+        self.metadata_cache_ttl = 0
+        self.metadata = None
+        self.selected_columns = []
+        self.select_columns_from_schema = False
+        self.pagination_strategy = "default"
+        self.shard_property = None
+        self.shard_boundaries = []
+        self.number_of_shards = 1
+        self.partitioning = None
+        self.incremental_mode = "none"
+        self.incremental_property = ""
+        self.count_cache_ttl = 0
+        self.report_progress = False
+        self.progress_interval = 10
+        self.profile_row_cleaning = False
+        self.changeset_size = 100
+        self.auto_bulk_size = False
+        self.target_page_duration = 5
+        self.max_page_size = 64
+        self.page_cache_ttl = 0
+        self.resume_extraction = False
+        self.async_engine = False
+        self.max_connections = 16
+        self.expand = {}
+        self.expand_mode = "flatten"
+        self.accept_compression = True
 
         if config.get("show_advanced_parameters", False):
             self.odata_filter_query = config.get("odata_filter_query", "")
+            self.parallel_pages = config.get("parallel_pages", 1) or 1
+            self.pages_per_batch = config.get("pages_per_batch", 1) or 1
+            self.stream_pages = config.get("stream_pages", False)
+            self.typed_schema = config.get("typed_schema", False)
+            self.metadata_cache_ttl = int(config.get("metadata_cache_ttl", 24) or 0) * 3600
+            self.selected_columns = [column.strip() for column in config.get("selected_columns", []) or [] if column and column.strip()]
+            self.select_columns_from_schema = config.get("select_columns_from_schema", False)
+            self.pagination_strategy = config.get("pagination_strategy", "default") or "default"
+            self.shard_property = (config.get("shard_property") or "").strip()
+            self.shard_boundaries = [boundary.strip() for boundary in config.get("shard_boundaries", []) or [] if boundary and boundary.strip()]
+            self.number_of_shards = config.get("number_of_shards", 4) or 1
+            self.incremental_mode = config.get("incremental_mode", "none") or "none"
+            self.incremental_property = (config.get("incremental_property") or "").strip()
+            self.count_cache_ttl = int(config.get("count_cache_ttl", 0) or 0) * 60
+            self.report_progress = config.get("report_progress", False)
+            self.progress_interval = config.get("progress_interval", 10) or 0
+            self.profile_row_cleaning = config.get("profile_row_cleaning", False)
+            self.changeset_size = config.get("changeset_size", 100) or 100
+            self.auto_bulk_size = config.get("auto_bulk_size", False)
+            self.target_page_duration = config.get("target_page_duration", 5) or 5
+            self.max_page_size = config.get("max_page_size", 64) or 64
+            self.page_cache_ttl = int(config.get("page_cache_ttl", 0) or 0) * 60
+            self.resume_extraction = config.get("resume_extraction", False)
+            self.async_engine = config.get("async_engine", False)
+            self.max_connections = config.get("max_connections", 16) or 1
+            self.expand = parse_expand(config.get("expand", []))
+            self.expand_mode = config.get("expand_mode", "flatten") or "flatten"
+            self.accept_compression = config.get("accept_compression", True)
+        if self.stream_pages and (self.parallel_pages > 1 or self.pages_per_batch > 1 or self.async_engine):
+            logger.warning("Pages can't be streamed when fetched in parallel or in $batch, streaming is disabled")
+            self.stream_pages = False
+        if self.auto_bulk_size and (self.parallel_pages > 1 or self.pages_per_batch > 1 or self.async_engine):
+            logger.warning("The bulk size is only tuned with sequential pagination, pages fetched in parallel or in $batch use {}".format(self.bulk_size))
 
         self.clean_row = get_clean_row_method(config)
         self.client = ODataClient(config)
+        self.client.page_cache_ttl = self.page_cache_ttl
+        self.client.accept_compression = self.accept_compression is not False
+        self.metrics = self.client.metrics
+        self.metrics.progress_interval = self.progress_interval
         # According to https://www.odata.org/documentation/odata-version-2-0/uri-conventions/
         # https://services.odata.org/OData/OData.svc/Category(1)/Products?$top=2&$orderby=name
         # <-      service root URI                -><- resource path  -><- query options   ->
@@ -55,7 +137,25 @@ class SAPODataConnector(Connector):
 
         Supported types are: string, int, bigint, float, double, date, boolean
         """
-        return None
+        if not self.typed_schema:
+            return None
+        if self.expand:
+            logger.info("The columns of expanded navigation properties are not in the service metadata, the schema will be infered")
+            return None
+        schema = self.get_metadata().get_dss_schema(self.odata_list_title)
+        if schema is None:
+            logger.warning("Entity {} not found in the service metadata, the schema will be infered".format(self.odata_list_title))
+        elif self.selected_columns:
+            schema["columns"] = [column for column in schema["columns"] if column["name"] in self.selected_columns]
+        return schema
+
+    def get_metadata(self):
+        if self.metadata is None:
+            self.metadata = self.client.get_metadata(
+                cache_ttl=self.metadata_cache_ttl,
+                refresh=self.config.get("refresh_service_cache", False)
+            )
+        return self.metadata
 
     def generate_rows(self, dataset_schema=None, dataset_partitioning=None,
                       partition_id=None, records_limit=-1):
@@ -68,34 +168,314 @@ class SAPODataConnector(Connector):
         The dataset schema and partitioning are given for information purpose.
         """
         limit = RecordsLimit(records_limit=records_limit)
-        skip = None
+        self.client.page_cache_records_limit = records_limit if records_limit is not None and records_limit > 0 else None
+        if self.typed_schema:
+            properties = self.get_metadata().get_properties(self.odata_list_title)
+            if properties:
+                self.clean_row = CompiledRowCleaner(properties=properties)
+        self.metrics.reset()
+        if self.profile_row_cleaning:
+            self.metrics.set_profiler(cProfile.Profile())
+        clean_row = self.metrics.get_timed_cleaner(self.clean_row)
+        query = {
+            "filter": combine_filters(self.odata_filter_query, self.get_partition_filter(partition_id)),
+            "select": self.get_selected_columns(dataset_schema)
+        }
+        row_builder = None
+        if self.expand:
+            query["expand"] = format_expand(self.expand, self.client.odata_version)
+            row_builder = ExpandedRowBuilder(self.expand, explode=self.expand_mode == "explode")
+        state_key, state, high_water_mark, total_count = None, {}, None, None
+        if self.is_incremental_run(records_limit):
+            state_key = get_hash_key(
+                self.client.odata_instance, self.odata_list_title, query, partition_id,
+                self.incremental_mode, self.incremental_property
+            )
+            state = StateStore().load(state_key)
+        if self.incremental_mode == "delta_token":
+            self.client.track_changes = True
+            self.client.delta_link = None  # only the link sent back during this run is saved
+            if state.get("delta_link"):
+                logger.info("Retrieving the changes since the last run")
+        else:
+            if state_key:
+                high_water_mark = HighWaterMark(self.incremental_property, state.get("high_water_mark"), state.get("high_water_mark_rows"))
+                query["filter"] = combine_filters(query["filter"], self.get_high_water_mark_filter(high_water_mark.value))
+            if self.report_progress or (self.is_client_side_pagination() and (self.parallel_pages > 1 or self.pages_per_batch > 1 or self.async_engine)):
+                total_count = self.count_rows(query.get("filter"))
+        checkpoint = self.get_checkpoint(records_limit)
+        row_count, rows_to_skip = 0, 0
+
+        def save_checkpoint(position):
+            checkpoint.save(position, row_count)
+
+        def create_pager():
+            start_position = checkpoint.position if checkpoint else None
+            on_page_done = save_checkpoint if checkpoint else None
+            if self.incremental_mode == "delta_token" and state.get("delta_link"):
+                # the first load is paged like a full extraction, the following runs only follow the delta link
+                return ServerSidePager(
+                    self.client, self.odata_list_title, query=query, first_page_url=state.get("delta_link"),
+                    start_position=start_position, on_page_done=on_page_done
+                )
+            return self.get_pager(
+                records_limit=records_limit, query=query, total_count=total_count,
+                start_position=start_position, on_page_done=on_page_done
+            )
+
+        pager = create_pager()
+        if checkpoint and not getattr(pager, "supports_checkpoints", False):
+            logger.warning("Extractions can only be resumed with sequential pagination, checkpoints are disabled")
+            checkpoint = None
+        try:
+            resumes = 0
+            while True:
+                pages = pager.iterate_pages()
+                try:
+                    for items in pages:
+                        if row_builder:
+                            items = row_builder.get_rows(items)
+                        for item in items:
+                            if rows_to_skip:
+                                # already retrieved before the failure, in the page being resumed
+                                rows_to_skip -= 1
+                                continue
+                            if high_water_mark and not high_water_mark.observe(item):
+                                # retrieved by the previous run, counted so that a resumed page skips it as well
+                                row_count += 1
+                                continue
+                            yield clean_row(item)
+                            row_count += 1
+                            if limit.increment_and_check_if_is_reached():
+                                logger.info("Limit is reached")
+                                return
+                        self.log_progress(row_count, total_count)
+                    break
+                except Exception as error:
+                    if not checkpoint or resumes >= self.MAX_RESUMES:
+                        raise
+                    resumes += 1
+                    rows_to_skip = row_count - checkpoint.row_count
+                    logger.warning("Extraction failed after {} rows: {}. Resuming from the last completed page ({}/{})".format(
+                        row_count, error, resumes, self.MAX_RESUMES
+                    ))
+                    pager = create_pager()
+                finally:
+                    pages.close()
+            if state_key:
+                self.save_incremental_state(state_key, state, high_water_mark)
+        finally:
+            self.metrics.log_summary()
+
+    def get_checkpoint(self, records_limit):
+        """
+        Returns the checkpoint of a full extraction when failed extractions are resumed, None otherwise
+        """
+        if not self.resume_extraction or (records_limit is not None and records_limit > 0):
+            return None
+        return Checkpoint()
+
+    def count_rows(self, filter=None):
+        try:
+            return self.client.get_count(entity=self.odata_list_title, filter=filter, cache_ttl=self.count_cache_ttl)
+        except Exception as error:
+            logger.warning("Could not count the rows: {}".format(error))
+            return None
+
+    def log_progress(self, row_count, total_count):
+        if self.report_progress:
+            self.metrics.log_progress(row_count, total_count)
+
+    def is_incremental_run(self, records_limit):
+        # Previews and samples neither use nor move the checkpoint
+        if records_limit is not None and records_limit > 0:
+            return False
+        if self.incremental_mode == "high_water_mark" and not self.incremental_property:
+            logger.warning("Incremental extraction requires a last changed property, running a full extraction")
+            return False
+        return self.incremental_mode in ["delta_token", "high_water_mark"]
+
+    def get_high_water_mark_filter(self, value):
+        if value is None:
+            return None
+        edm_type = self.get_property_types().get(self.incremental_property)
+        logger.info("Retrieving the rows where {} is {} or after".format(self.incremental_property, value))
+        return "{} ge {}".format(self.incremental_property, format_literal(value, edm_type, self.client.odata_version))
+
+    def save_incremental_state(self, state_key, state, high_water_mark=None):
+        if high_water_mark:
+            if high_water_mark.value is None:
+                return
+            state["high_water_mark"] = high_water_mark.value
+            state["high_water_mark_rows"] = sorted(high_water_mark.row_hashes)
+        elif self.client.delta_link:
+            state["delta_link"] = self.client.delta_link
+        else:
+            logger.warning("The service did not send a delta link, the next run will be a full extraction")
+            state.pop("delta_link", None)
+        StateStore().save(state_key, state)
+        logger.info("Incremental state saved")
+
+    def get_odata_partitioning(self):
+        if self.partitioning is None:
+            edm_type = None
+            if self.config.get("partitioning_type", "none") not in [None, "none"]:
+                edm_type = self.get_property_types().get((self.config.get("partitioning_property") or "").strip())
+            self.partitioning = ODataPartitioning(self.config, odata_version=self.client.odata_version, edm_type=edm_type)
+        return self.partitioning
+
+    def get_partition_filter(self, partition_id):
+        if not partition_id:
+            return None
+        partition_filter = self.get_odata_partitioning().get_partition_filter(partition_id)
+        logger.info("Partition {} -> $filter={}".format(partition_id, partition_filter))
+        return partition_filter
+
+    def get_selected_columns(self, dataset_schema=None):
+        """
+        Returns the properties to push down as $select, or None to retrieve all of them.
+        """
+        selected_columns = self.get_selected_properties(dataset_schema)
+        if selected_columns and self.expand and self.client.odata_version != ODataConstants.ODATA_V4:
+            # before v4, expanded navigation properties are only sent back if they are selected too
+            selected_columns = selected_columns + list(self.expand.keys())
+        return selected_columns
+
+    def get_selected_properties(self, dataset_schema=None):
+        selected_columns = self.selected_columns
+        if not selected_columns and self.select_columns_from_schema and dataset_schema:
+            selected_columns = [column.get("name") for column in dataset_schema.get("columns", [])]
+            # columns of the expanded navigation properties are retrieved with $expand
+            selected_columns = [column for column in selected_columns if EXPAND_SEPARATOR not in column]
+        if not selected_columns:
+            return None
+        try:
+            properties = self.get_metadata().get_properties(self.odata_list_title)
+        except Exception as error:
+            logger.warning("Could not check the selected columns against the service metadata: {}".format(error))
+            return selected_columns
+        if not properties:
+            return selected_columns
+        property_names = [odata_property.get("name") for odata_property in properties]
+        unknown_columns = [column for column in selected_columns if column not in property_names]
+        if unknown_columns:
+            logger.warning("Columns {} are not properties of {}, they are not selected".format(unknown_columns, self.odata_list_title))
+        selected_columns = [column for column in selected_columns if column in property_names]
+        return selected_columns or None
+
+    def get_pager(self, records_limit=-1, query=None, total_count=None, start_position=None, on_page_done=None):
+        if self.pagination_strategy == "sharded":
+            if self.shard_property:
+                return self.get_sharded_pager(records_limit=records_limit, query=query)
+            logger.warning("Sharded extraction requires a shard property, using the default pagination")
+        if not self.is_client_side_pagination():
+            if self.parallel_pages > 1:
+                logger.info("Prefetching up to {} pages in the background".format(self.parallel_pages))
+                return PrefetchingServerSidePager(
+                    self.client, self.odata_list_title,
+                    query=query, prefetch_pages=self.parallel_pages
+                )
+            return ServerSidePager(
+                self.client, self.odata_list_title,
+                query=query, stream_pages=self.stream_pages,
+                start_position=start_position, on_page_done=on_page_done
+            )
         bulk_size = self.get_bulk_size(records_limit=records_limit)
-        items, next_page_url = self.client.get_entity_collections(
-            entity=self.odata_list_title,
-            top=bulk_size,
-            skip=skip,
-            filter=self.odata_filter_query
+        if self.pagination_strategy == "keyset":
+            keys = self.get_keys()
+            if keys and bulk_size:
+                logger.info("Keyset pagination on {}".format([key_name for key_name, _ in keys]))
+                return KeysetPager(self.client, self.odata_list_title, keys, bulk_size, query=query, tuner=self.get_tuner(records_limit, bulk_size))
+            logger.warning("Keyset pagination requires entity keys in the service metadata and a bulk size, using $skip")
+        if self.async_engine and bulk_size and not self.fits_in_one_page(records_limit, bulk_size):
+            logger.info("Fetching pages of {} rows with up to {} concurrent requests".format(bulk_size, self.max_connections))
+            return AsyncClientSidePager(
+                self.client, self.odata_list_title, bulk_size,
+                query=query, max_connections=self.max_connections, total_count=total_count, records_limit=records_limit
+            )
+        if self.pages_per_batch > 1 and bulk_size and not self.fits_in_one_page(records_limit, bulk_size):
+            logger.info("Fetching {} pages of {} rows per $batch request".format(self.pages_per_batch, bulk_size))
+            return BatchClientSidePager(
+                self.client, self.odata_list_title, bulk_size=bulk_size,
+                query=query, pages_per_batch=self.pages_per_batch, total_count=total_count, records_limit=records_limit
+            )
+        if self.parallel_pages > 1 and bulk_size and not self.fits_in_one_page(records_limit, bulk_size):
+            logger.info("Fetching {} pages of {} rows in parallel".format(self.parallel_pages, bulk_size))
+            return ParallelClientSidePager(
+                self.client, self.odata_list_title, bulk_size=bulk_size,
+                query=query, parallel_pages=self.parallel_pages, total_count=total_count, records_limit=records_limit
+            )
+        return ClientSidePager(
+            self.client, self.odata_list_title, bulk_size=bulk_size,
+            query=query, stream_pages=self.stream_pages, tuner=self.get_tuner(records_limit, bulk_size),
+            start_position=start_position, on_page_done=on_page_done
         )
-        while items:
-            number_of_items = len(items)
-            for item in items:
-                yield self.clean_row(item)
-                if limit.increment_and_check_if_is_reached():
-                    logger.info("Limit is reached")
-                    return
+
+    def get_tuner(self, records_limit, bulk_size):
+        if not self.auto_bulk_size or not bulk_size or self.fits_in_one_page(records_limit, bulk_size):
+            return None
+        if self.stream_pages:
+            logger.warning("The bulk size can't be tuned on streamed pages, using {}".format(bulk_size))
+            return None
+        logger.info("Tuning the bulk size from {} toward pages of {}s and at most {}MB".format(bulk_size, self.target_page_duration, self.max_page_size))
+        return BulkSizeTuner(bulk_size, target_duration=self.target_page_duration, max_page_bytes=self.max_page_size * 1024 * 1024)
+
+    def get_sharded_pager(self, records_limit=-1, query=None):
+        query = query or {}
+        edm_type = self.get_property_types().get(self.shard_property)
+        try:
+            boundaries = parse_shard_boundaries(self.shard_boundaries, edm_type)
+        except ValueError as error:
+            raise DataikuException("Invalid shard boundaries for {}: {}".format(self.shard_property, error))
+        if not boundaries and self.number_of_shards > 1:
+            boundaries = sample_shard_boundaries(
+                self.client, self.odata_list_title, self.shard_property,
+                self.number_of_shards, edm_type=edm_type, filter=query.get("filter")
+            )
+        shard_filters = build_shard_filters(self.shard_property, boundaries, edm_type, self.client.odata_version)
+        logger.info("Extracting {} shards in parallel: {}".format(len(shard_filters), shard_filters))
+        bulk_size = self.get_bulk_size(records_limit=records_limit)
+        shard_queries = []
+        for shard_filter in shard_filters:
+            shard_query = dict(query)
+            shard_query["filter"] = combine_filters(query.get("filter"), shard_filter)
+            shard_queries.append(shard_query)
+        if self.async_engine:
+            return AsyncShardedPager(
+                self.client, self.odata_list_title, shard_queries,
+                bulk_size=bulk_size, max_connections=self.max_connections
+            )
+        pagers = []
+        for shard_query in shard_queries:
             if self.is_client_side_pagination():
-                if skip is None:
-                    skip = 0
-                skip = skip + number_of_items
+                pagers.append(ClientSidePager(self.client, self.odata_list_title, bulk_size=bulk_size, query=shard_query))
             else:
-                if not next_page_url:
-                    # Server side pagination with no next_page_url
-                    # -> time to quit
-                    return
-            items, next_page_url = self.client.get_entity_collections(
-                entity=self.odata_list_title, top=bulk_size, skip=skip,
-                page_url=next_page_url, filter=self.odata_filter_query, can_raise=False
-            )
+                pagers.append(ServerSidePager(self.client, self.odata_list_title, query=shard_query))
+        return ShardedPager(pagers, buffered_pages=max(self.parallel_pages, len(pagers)))
+
+    def get_keys(self):
+        """
+        Returns the entity keys as a list of (property name, EDM type)
+        """
+        entity_type = self.get_metadata().get_entity_type(self.odata_list_title)
+        if not entity_type:
+            return []
+        property_types = self.get_property_types()
+        return [(key_name, property_types.get(key_name)) for key_name in entity_type.get("keys", [])]
+
+    def get_property_types(self):
+        """
+        Returns the EDM type of each property of the entity, or an empty dict if the service metadata is not available
+        """
+        try:
+            properties = self.get_metadata().get_properties(self.odata_list_title)
+        except Exception as error:
+            logger.warning("Could not retrieve the service metadata: {}".format(error))
+            return {}
+        return dict((odata_property.get("name"), odata_property.get("type")) for odata_property in properties)
+
+    def fits_in_one_page(self, records_limit, bulk_size):
+        return records_limit is not None and 0 < records_limit <= bulk_size
 
     def get_bulk_size(self, records_limit=None):
         if self.is_client_side_pagination():
@@ -130,17 +510,39 @@ class SAPODataConnector(Connector):
 
         Note: the writer is responsible for clearing the partition, if relevant.
         """
-        raise DataikuException("Unimplemented")
+        if partition_id:
+            logger.warning("Existing rows of partition {} are not cleared, new rows are added".format(partition_id))
+        return ODataWriter(
+            self.client, self.odata_list_title, dataset_schema,
+            changeset_size=self.changeset_size, property_types=self.get_property_types()
+        )
 
     def get_partitioning(self):
         """
         Return the partitioning schema that the connector defines.
         """
-        raise DataikuException("Unimplemented")
+        partitioning = self.get_odata_partitioning().get_dss_partitioning()
+        if partitioning is None:
+            raise DataikuException("Unimplemented")
+        return partitioning
 
     def list_partitions(self, partitioning):
         """Return the list of partitions for the partitioning scheme
         passed as parameter"""
+        odata_partitioning = self.get_odata_partitioning()
+        if odata_partitioning.partitioning_type == "discrete":
+            return odata_partitioning.values
+        if odata_partitioning.partitioning_type == "time":
+            first_value = odata_partitioning.start
+            last_value = None
+            if not first_value:
+                extremes = get_property_extremes(
+                    self.client, self.odata_list_title, odata_partitioning.property_name, filter=self.odata_filter_query
+                )
+                if not extremes:
+                    return []
+                first_value, last_value = extremes
+            return odata_partitioning.list_time_partitions(first_value, last_value)
         return []
 
     def partition_exists(self, partitioning, partition_id):
@@ -149,7 +551,14 @@ class SAPODataConnector(Connector):
         Implementation is only required if the corresponding flag is set to True
         in the connector definition
         """
-        raise DataikuException("unimplemented")
+        if not self.get_odata_partitioning().is_partitioned():
+            raise DataikuException("unimplemented")
+        items, _ = self.client.get_entity_collections(
+            entity=self.odata_list_title, top=1,
+            filter=combine_filters(self.odata_filter_query, self.get_partition_filter(partition_id)),
+            can_raise=False
+        )
+        return len(items) > 0
 
     def get_records_count(self, partitioning=None, partition_id=None):
         """
@@ -158,4 +567,5 @@ class SAPODataConnector(Connector):
         Implementation is only required if the corresponding flag is set to True
         in the connector definition
         """
-        raise DataikuException("unimplemented")
+        odata_filter = combine_filters(self.odata_filter_query, self.get_partition_filter(partition_id))
+        return self.client.get_count(entity=self.odata_list_title, filter=odata_filter, cache_ttl=self.count_cache_ttl)
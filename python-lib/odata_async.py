@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from time import time
+from dataikuapi.utils import DataikuException
+from odata_batch import BatchPartResponse
+from odata_pagination import PageWindows, put_page, drain_pages
+from odata_session_pool import session_pool
+from odata_throttling import THROTTLING_STATUS_CODES, get_request_kind, parse_retry_after
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+LIMITER_POLL_INTERVAL = 0.01  # seconds
+
+
+class ExtractionStopped(Exception):
+    pass
+
+
+class AsyncODataTransport(object):
+    """
+    Sends the GET requests of an ODataClient from an event loop, with the client's headers, credentials and cookies,
+    and at most max_connections requests in flight. The requests also wait for a slot of the client's concurrency limiter,
+    so that they slow down with the other requests of the client when the server is overloaded.
+    aiohttp is used when it is installed, otherwise the requests are sent by the client's session in a thread pool.
+    """
+    def __init__(self, client, max_connections=16):
+        self.client = client
+        # the limiter never lets more requests through
+        self.max_connections = min(max_connections, client.limiter.max_concurrency)
+        self.semaphore = None
+        self.session = None
+        self.executor = None
+
+    async def open(self):
+        self.semaphore = asyncio.Semaphore(self.max_connections)
+        if aiohttp is None:
+            # more threads than connections kept by the session would open and close connections all the time
+            max_workers = min(self.max_connections, session_pool.pool_maxsize)
+            logger.info("aiohttp is not installed, sending the requests from {} threads".format(max_workers))
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
+            return
+        auth = None
+        if self.client.session.auth:
+            auth = aiohttp.BasicAuth(*self.client.session.auth)
+        headers = dict((name, value) for name, value in self.client.get_headers().items() if value is not None)
+        cookies = dict((cookie.name, cookie.value) for cookie in self.client.session.cookies)
+        self.session = aiohttp.ClientSession(
+            auth=auth, headers=headers, cookies=cookies,
+            connector=aiohttp.TCPConnector(limit=self.max_connections, ssl=self.client.ignore_ssl_check is not True)
+        )
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+        if self.executor:
+            self.executor.shutdown(wait=False)
+
+    async def get_page(self, url, can_raise=True):
+        """
+        Same checks and retries as ODataClient.get_entity_collections. Returns the items of the page and its next link.
+        """
+        attempt = 0
+        while True:
+            response = await self.get(url)
+            attempt += 1
+            if not self.client.assert_response_ok(response, can_raise=can_raise):
+                return [], None
+            decode_start_time = time()
+            data = self.client.decode(response)
+            decode_time = time() - decode_start_time
+            if is_service_error(data) and attempt < self.client.MAX_RETRIES:
+                logger.warning("Remote service error : {}. Attempt {}, trying again".format(data["error"]["message"]["value"], attempt))
+                self.client.metrics.record_retry()
+                await asyncio.sleep(self.client.backoff.get_delay(attempt))
+                continue
+            # raises on errors left after the retries
+            self.client._should_retry(data, self.client.MAX_RETRIES)
+            items, next_page_url = self.client.get_page_from_data(data)
+            self.client.metrics.record_page(len(items), decode_time=decode_time)
+            return items, next_page_url
+
+    async def get(self, url):
+        async with self.semaphore:
+            if self.session is None:
+                # the client's requests go through its limiter
+                return await asyncio.get_event_loop().run_in_executor(self.executor, self.client.get, url)
+            attempt = 0
+            while True:
+                logger.info("Accessing endpoint {}".format(url))
+                await self.acquire_limiter_slot()
+                start_time = time()
+                connection_error = None
+                try:
+                    async with self.session.get(url) as response:
+                        ttfb = time() - start_time
+                        content = await response.read()
+                        status_code, reason, headers = response.status, response.reason, dict(response.headers)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                    connection_error = error
+                finally:
+                    self.client.limiter.release()
+                if connection_error:
+                    if attempt >= self.client.MAX_THROTTLING_RETRIES:
+                        raise DataikuException("Error while accessing {}: {}".format(url, connection_error))
+                    self.client.limiter.on_throttled("{}".format(connection_error))
+                    delay = self.client.backoff.get_delay(attempt)
+                    logger.warning("Connection error: {}. Attempt {}, trying again in {:.1f}s".format(connection_error, attempt + 1, delay))
+                    self.client.metrics.record_retry()
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                # aiohttp hands over the decompressed body, the size received is the Content-Length
+                wire_size = int(headers.get("Content-Length") or len(content))
+                self.client.metrics.record_request(ttfb, time() - start_time - ttfb, wire_size, content_bytes=len(content))
+                if status_code not in THROTTLING_STATUS_CODES:
+                    self.client.limiter.on_success(ttfb, get_request_kind("GET", url))
+                    return BatchPartResponse(status_code, reason, headers, content)
+                if attempt >= self.client.MAX_THROTTLING_RETRIES:
+                    return BatchPartResponse(status_code, reason, headers, content)
+                self.client.limiter.on_throttled("error {}".format(status_code))
+                delay = self.client.backoff.get_delay(attempt, parse_retry_after(headers.get("Retry-After")))
+                logger.warning("Error {} on {}. Attempt {}, trying again in {:.1f}s".format(status_code, url, attempt + 1, delay))
+                self.client.metrics.record_retry()
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def acquire_limiter_slot(self):
+        # the limiter blocks the threads waiting for a slot, the event loop polls it instead
+        while not self.client.limiter.try_acquire():
+            await asyncio.sleep(LIMITER_POLL_INTERVAL)
+
+
+def is_service_error(data):
+    error = data.get("error")
+    return isinstance(error, dict) and isinstance(error.get("message"), dict) and "value" in error["message"]
+
+
+class AsyncPager(ABC):
+    """
+    Runs the requests of a pager on an event loop in a background thread, and hands its pages
+    over to the synchronous generate_rows through a queue of at most `buffered_pages` pages.
+    Subclasses request the pages in produce.
+    """
+    supports_checkpoints = False
+
+    def __init__(self, client, entity, query=None, max_connections=16, buffered_pages=None):
+        self.client = client
+        self.entity = entity
+        self.query = query or {}  # filter, select... forwarded to the client
+        self.max_connections = max_connections
+        self.buffered_pages = buffered_pages or max_connections
+
+    def iterate_pages(self):
+        pages = Queue(maxsize=self.buffered_pages)
+        stop = threading.Event()
+        worker = threading.Thread(target=self.run, args=(pages, stop))
+        worker.daemon = True
+        worker.start()
+        try:
+            while True:
+                items, error = pages.get()
+                if error:
+                    raise error
+                if items is None:
+                    return
+                yield items
+        finally:
+            stop.set()
+            drain_pages(pages)
+
+    def run(self, pages, stop):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.run_transport(pages, stop))
+            put_page(pages, stop, (None, None))
+        except ExtractionStopped:
+            pass
+        except Exception as error:
+            put_page(pages, stop, (None, error))
+        finally:
+            loop.close()
+
+    def create_transport(self):
+        return AsyncODataTransport(self.client, max_connections=self.max_connections)
+
+    async def run_transport(self, pages, stop):
+        transport = self.create_transport()
+        await transport.open()
+        loop = asyncio.get_event_loop()
+
+        async def emit(items):
+            # the queue is bounded, waiting for room in it must not block the event loop
+            if not await loop.run_in_executor(None, put_page, pages, stop, (items, None)):
+                raise ExtractionStopped()
+        try:
+            await self.produce(transport, emit)
+        finally:
+            await transport.close()
+
+    @abstractmethod
+    async def produce(self, transport, emit):
+        """
+        Requests the pages with the transport, and hands each one over with `await emit(items)`
+        """
+
+    def get_url(self, query, top=None, skip=None, page_url=None):
+        return self.client.get_entity_collections_url(entity=self.entity, top=top, skip=skip, page_url=page_url, **query)
+
+    async def fetch_sequentially(self, transport, emit, query, bulk_size=None, items=None, next_page_url=None, skip=0):
+        """
+        Follows the next links, or $skip / $top windows of bulk_size rows, one page after the other
+        """
+        if items is None:
+            items, next_page_url = await transport.get_page(self.get_url(query, top=bulk_size))
+        while items:
+            await emit(items)
+            skip += len(items)
+            if next_page_url:
+                url = next_page_url
+            elif bulk_size:
+                url = self.get_url(query, top=bulk_size, skip=skip)
+            else:
+                return
+            items, next_page_url = await transport.get_page(url, can_raise=False)
+
+
+class AsyncClientSidePager(AsyncPager):
+    """
+    $skip / $top pagination with up to max_connections windows requested at the same time.
+    Pages are yielded in their original order. If the server enforces its own page size,
+    the pagination falls back to following its next links.
+    """
+    def __init__(self, client, entity, bulk_size, query=None, max_connections=16, total_count=None, records_limit=None):
+        super(AsyncClientSidePager, self).__init__(client, entity, query=query, max_connections=max_connections)
+        self.bulk_size = bulk_size
+        self.windows = PageWindows(bulk_size, total_count=total_count, records_limit=records_limit, pagination_name="the asyncio engine")
+
+    async def produce(self, transport, emit):
+        items, next_page_url = await transport.get_page(self.get_url(self.query, top=self.bulk_size))
+        if self.windows.is_paged_by_server(items, next_page_url):
+            await self.fetch_sequentially(transport, emit, self.query, bulk_size=self.bulk_size, items=items, next_page_url=next_page_url)
+            return
+        await emit(items)
+        pending_windows = deque()
+        try:
+            while True:
+                while len(pending_windows) < self.max_connections and self.windows.has_next(len(pending_windows)):
+                    skip = self.windows.pop_next()
+                    pending_windows.append((skip, asyncio.ensure_future(self.get_window(transport, skip))))
+                if not pending_windows:
+                    return
+                skip, window = pending_windows.popleft()
+                items = await window
+                if items:
+                    await emit(items)
+                if self.windows.is_last_page(skip, items):
+                    following_pages = [await pending_windows[0][1]] if pending_windows else []
+                    self.windows.assert_no_rows_after_last_page(following_pages)
+                    return
+        finally:
+            for _, window in pending_windows:
+                window.cancel()
+            if pending_windows:
+                await asyncio.gather(*[window for _, window in pending_windows], return_exceptions=True)
+
+    async def get_window(self, transport, skip):
+        items, _ = await transport.get_page(self.get_url(self.query, top=self.bulk_size, skip=skip), can_raise=False)
+        return items
+
+
+class AsyncShardedPager(AsyncPager):
+    """
+    Extracts disjoint $filter shards at the same time, each one page after the other, with all their requests
+    sharing the same connection limit. Pages come in the order they arrive.
+    bulk_size None follows the server's next links.
+    """
+    def __init__(self, client, entity, queries, bulk_size=None, max_connections=16):
+        super(AsyncShardedPager, self).__init__(client, entity, max_connections=max_connections)
+        self.queries = queries
+        self.bulk_size = bulk_size
+
+    async def produce(self, transport, emit):
+        shards = [asyncio.ensure_future(self.fetch_sequentially(transport, emit, query, bulk_size=self.bulk_size)) for query in self.queries]
+        try:
+            await asyncio.gather(*shards)
+        finally:
+            for shard in shards:
+                shard.cancel()
+            await asyncio.gather(*shards, return_exceptions=True)
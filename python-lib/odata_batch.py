@@ -0,0 +1,161 @@
+import json
+import re
+import uuid
+from urllib.parse import quote
+
+
+CRLF = "\r\n"
+# characters left as is by requests.utils.requote_uri, which encodes the URL of the GET requests sent by requests
+URL_SAFE_CHARACTERS = "!#$%&'()*+,/:;=?@[]~"
+invalid_percent_pattern = re.compile(r'%(?![0-9a-fA-F]{2})')
+boundary_pattern = re.compile(r'boundary=("?)([^";]+)\1', re.IGNORECASE)
+status_line_pattern = re.compile(r'HTTP/\d\.\d\s+(\d{3})\s*(.*)')
+
+
+class BatchPartResponse(object):
+    """
+    One response of a multipart $batch response, exposing the parts of
+    the requests.Response interface used by ODataClient
+    """
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def __repr__(self):
+        return "<Response [{}]>".format(self.status_code)
+
+
+def get_batch_boundary():
+    return "batch_{}".format(uuid.uuid4())
+
+
+def build_batch_body(boundary, relative_urls, headers=None):
+    """
+    Builds a multipart/mixed $batch body made of one GET request per relative URL
+    """
+    lines = []
+    for relative_url in relative_urls:
+        lines.append("--{}".format(boundary))
+        lines.append("Content-Type: application/http")
+        lines.append("Content-Transfer-Encoding: binary")
+        lines.append("")
+        lines.append("GET {} HTTP/1.1".format(requote_url(relative_url)))
+        for header_name, header_value in (headers or {}).items():
+            if header_value is not None:
+                lines.append("{}: {}".format(header_name, header_value))
+        lines.append("")
+        lines.append("")
+    lines.append("--{}--".format(boundary))
+    lines.append("")
+    return CRLF.join(lines).encode("utf-8")
+
+
+def build_changeset_body(boundary, changeset_boundary, relative_url, payloads, headers=None):
+    """
+    Builds a multipart/mixed $batch body holding one changeset, made of one POST of each JSON payload on relative_url.
+    The service applies all the requests of the changeset, or none of them.
+    """
+    lines = [
+        "--{}".format(boundary),
+        "Content-Type: multipart/mixed; boundary={}".format(changeset_boundary),
+        ""
+    ]
+    for content_id, payload in enumerate(payloads, start=1):
+        lines.append("--{}".format(changeset_boundary))
+        lines.append("Content-Type: application/http")
+        lines.append("Content-Transfer-Encoding: binary")
+        lines.append("Content-ID: {}".format(content_id))
+        lines.append("")
+        lines.append("POST {} HTTP/1.1".format(requote_url(relative_url)))
+        lines.append("Content-Type: application/json")
+        for header_name, header_value in (headers or {}).items():
+            if header_value is not None:
+                lines.append("{}: {}".format(header_name, header_value))
+        lines.append("")
+        lines.append(json.dumps(payload))
+    lines.append("--{}--".format(changeset_boundary))
+    lines.append("--{}--".format(boundary))
+    lines.append("")
+    return CRLF.join(lines).encode("utf-8")
+
+
+def requote_url(url):
+    """
+    Percent-encodes the characters not allowed in a request line, such as the spaces of a $filter,
+    and leaves the URL escapes already there untouched
+    """
+    safe_characters = URL_SAFE_CHARACTERS
+    if invalid_percent_pattern.search(url):
+        safe_characters = safe_characters.replace("%", "")
+    return quote(url, safe=safe_characters)
+
+
+def get_changeset_boundary():
+    return "changeset_{}".format(uuid.uuid4())
+
+
+def get_boundary(content_type):
+    match = boundary_pattern.search(content_type or "")
+    if not match:
+        raise ValueError("No boundary in the $batch response content type '{}'".format(content_type))
+    return match.group(2)
+
+
+def parse_batch_response(content, content_type):
+    """
+    Splits a multipart/mixed $batch response into BatchPartResponse, in the order of the requests.
+    Nested changeset responses are flattened.
+    """
+    boundary = get_boundary(content_type).encode("utf-8")
+    responses = []
+    for part in split_multipart(content, boundary):
+        part_headers, part_body = split_headers(part)
+        part_content_type = part_headers.get("content-type", "")
+        if part_content_type.lower().startswith("multipart/mixed"):
+            responses.extend(parse_batch_response(part_body, part_content_type))
+            continue
+        responses.append(parse_http_response(part_body))
+    return responses
+
+
+def split_multipart(content, boundary):
+    delimiter = b"--" + boundary
+    parts = []
+    for chunk in content.split(delimiter)[1:]:
+        if chunk.startswith(b"--"):
+            break
+        parts.append(chunk.strip(b"\r\n"))
+    return parts
+
+
+def split_headers(block):
+    normalized_block = block.replace(b"\r\n", b"\n")
+    if b"\n\n" in normalized_block:
+        raw_headers, body = normalized_block.split(b"\n\n", 1)
+    else:
+        raw_headers, body = normalized_block, b""
+    headers = {}
+    for line in raw_headers.decode("utf-8").split("\n"):
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return headers, body
+
+
+def parse_http_response(block):
+    block = block.lstrip(b"\r\n")
+    status_line, _, rest = block.replace(b"\r\n", b"\n").partition(b"\n")
+    match = status_line_pattern.match(status_line.decode("utf-8"))
+    if not match:
+        raise ValueError("Malformed $batch part: '{}'".format(status_line))
+    headers, body = split_headers(rest)
+    return BatchPartResponse(int(match.group(1)), match.group(2), headers, body.strip(b"\n"))
@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+def get_cache_folder():
+    return os.path.join(tempfile.gettempdir(), "dss-plugin-sap-odata")
+
+
+class DiskCache(object):
+    """
+    JSON documents stored on the local disk, one file per key, expiring after ttl seconds.
+    When max_size (bytes) is set, the least recently used documents are removed once the namespace gets bigger.
+    Documents can be stored gzip compressed.
+    """
+    def __init__(self, namespace, ttl, max_size=None, compress=False):
+        self.folder = os.path.join(get_cache_folder(), namespace)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compress = compress
+
+    def get(self, key):
+        path = self.get_path(key)
+        try:
+            modification_time = os.path.getmtime(path)
+            if time.time() - modification_time > self.ttl:
+                return None
+            with self.open(path, "r") as cache_file:
+                value = json.load(cache_file)
+            # the access time orders the documents for eviction, the modification time is kept for the ttl
+            os.utime(path, (time.time(), modification_time))
+            return value
+        except (OSError, IOError, ValueError, EOFError):
+            return None
+
+    def set(self, key, value):
+        path = self.get_path(key)
+        try:
+            if not os.path.isdir(self.folder):
+                os.makedirs(self.folder, mode=0o700)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=self.folder)
+            os.close(file_descriptor)
+            with self.open(temporary_path, "w") as cache_file:
+                json.dump(value, cache_file)
+            os.replace(temporary_path, path)
+        except (OSError, IOError) as error:
+            logger.warning("Could not write cache file {}: {}".format(path, error))
+            return
+        if self.max_size:
+            self.evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            pass
+
+    def is_refresh_requested(self, key, refresh):
+        """
+        The refresh option is saved with the settings and stays set: the document is only refreshed
+        the first time the option is seen set, and again once it has been unset and set back
+        """
+        marker_key = "refresh {}".format(key)
+        was_requested = self.get(marker_key) is not None
+        if refresh and not was_requested:
+            self.set(marker_key, True)
+            return True
+        if not refresh and was_requested:
+            self.delete(marker_key)
+        return False
+
+    def evict(self):
+        files = []
+        try:
+            for file_name in os.listdir(self.folder):
+                file_stat = os.stat(os.path.join(self.folder, file_name))
+                files.append((file_stat.st_atime, file_stat.st_size, file_name))
+        except OSError:
+            return
+        total_size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, file_name in sorted(files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.folder, file_name))
+            except OSError:
+                continue
+            total_size -= file_size
+
+    def open(self, path, mode):
+        if self.compress:
+            return gzip.open(path, mode + "t", encoding="utf-8")
+        return open(path, mode)
+
+    def get_path(self, key):
+        return os.path.join(self.folder, hashlib.sha256(key.encode("utf-8")).hexdigest())
@@ -2,9 +2,19 @@ import requests
 import logging
 from odata_constants import ODataConstants
 from dss_constants import DSSConstants
-from odata_common import get_odata_instance, get_list_title, get_login
+from odata_common import get_hash_key, get_odata_instance, get_list_title, get_login
+from odata_stream import ODataPageStream
+from odata_cache import DiskCache
+from odata_metadata import ODataMetadata, parse_metadata
+from odata_batch import build_batch_body, build_changeset_body, get_batch_boundary, get_changeset_boundary, parse_batch_response
+from odata_session_pool import session_pool
+from odata_throttling import (
+    AdaptiveConcurrencyLimiter, Backoff, THROTTLING_STATUS_CODES, UNPROCESSED_STATUS_CODES, get_request_kind, parse_retry_after
+)
+from odata_metrics import ExtractionMetrics
+from odata_json import json_codec
 from dataikuapi.utils import DataikuException
-from time import sleep
+from time import sleep, time
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO,
@@ -14,6 +24,11 @@ logging.basicConfig(level=logging.INFO,
 class ODataClient():
 
     MAX_RETRIES = 3
+    MAX_THROTTLING_RETRIES = 6
+    MAX_CONCURRENCY = 32
+    STREAM_CHUNK_SIZE = 65536
+    METADATA_CACHE_MAX_SIZE = 64 * 1024 * 1024
+    PAGE_CACHE_MAX_SIZE = 512 * 1024 * 1024
 
     def __init__(self, config):
         self.auth_type = config.get(DSSConstants.AUTH_TYPE)
@@ -24,6 +39,7 @@ class ODataClient():
         self.ignore_ssl_check = login.get("ignore_ssl_check", False)
         self.odata_list_title = get_list_title(config)
         odata_version = login.get(ODataConstants.VERSION)
+        self.odata_version = odata_version
         self.set_odata_protocol_version(odata_version)
 
         if "sap-odata_oauth" in config and ODataConstants.OAUTH in config["sap-odata_oauth"]:
@@ -31,7 +47,16 @@ class ODataClient():
         else:
             self.odata_access_token = None
         self.session = self.get_session(config, odata_version)
-        self.retries = 0
+        self.track_changes = False
+        self.delta_link = None  # last delta link sent back by the service
+        self.page_cache_ttl = 0  # seconds, 0 disables the page cache
+        self.page_cache_records_limit = None  # records limit of the preview or sample being read, full extractions are not cached
+        self.last_page_statistics = None  # cost of the last page retrieved with get_entity_collections
+        self.backoff = Backoff()
+        self.limiter = AdaptiveConcurrencyLimiter(max_concurrency=self.MAX_CONCURRENCY)  # shared by all the threads using this client
+        self.metrics = ExtractionMetrics()
+        self.json_codec = json_codec
+        self.accept_compression = True
 
     def set_odata_protocol_version(self, odata_version):
         if odata_version == ODataConstants.ODATA_V4:
@@ -52,101 +77,442 @@ class ODataClient():
             self.data_container = ODataConstants.DATA_CONTAINER_V2
 
     def get_session(self, config, odata_version):
-        session = requests.Session()
-        if self.ignore_ssl_check is True:
-            session.verify = False
+        """
+        Returns the session of the process pool for this instance and credentials, so that connections,
+        SAP handshake, cookies and CSRF token are reused between clients.
+        """
         login_config = config.get(ODataConstants.LOGIN, {}) if self.auth_type == "login" else config.get("sap-odata_user-account", {})
+        auth = None
+        self.sap_client = None
         if odata_version == ODataConstants.ODATA_VSAP:
             if self.auth_type == "user-account":
                 username_password = login_config.get("username_password", {})
-                session.auth = (
+                auth = (
                     username_password.get("user", ""),
                     username_password.get("password", "")
                 )
             else:
-                session.auth = (
+                auth = (
                     login_config.get(ODataConstants.USERNAME, ""),
                     login_config.get(ODataConstants.PASSWORD, "")
                 )
             self.sap_client = login_config.get(ODataConstants.SAP_CLIENT, "")
-            session.head(
-                self.odata_instance,
-                params={
-                    ODataConstants.SAP_CLIENT_HEADER: self.sap_client
-                }
-            )
         elif ODataConstants.LOGIN in config and \
             ODataConstants.USERNAME in config[ODataConstants.LOGIN] and \
                 ODataConstants.PASSWORD in config[ODataConstants.LOGIN]:
-            session.auth = (
+            auth = (
                 login_config.get(ODataConstants.USERNAME, ""),
                 login_config.get(ODataConstants.PASSWORD, "")
             )
+        session_key = get_hash_key(self.odata_instance, auth, self.odata_access_token, self.sap_client, self.ignore_ssl_check)
+        self.pooled_session = session_pool.get(session_key, auth=auth, verify=self.ignore_ssl_check is not True)
+        session = self.pooled_session.session
+        if odata_version == ODataConstants.ODATA_VSAP:
+            with self.pooled_session.lock:
+                if self.pooled_session.needs_handshake():
+                    session.head(
+                        self.odata_instance,
+                        params={
+                            ODataConstants.SAP_CLIENT_HEADER: self.sap_client
+                        }
+                    )
+                    self.pooled_session.set_handshake_done()
+                else:
+                    logger.info("Reusing the session opened on {}".format(self.odata_instance))
         return session
 
-    def get_entity_collections(self, entity="", top=None, skip=None, page_url=None, filter=None, can_raise=True):
-        if entity is None:
-            entity = ""
-        if self.odata_list_title is None or self.odata_list_title == "":
-            top = None  # SAP will complain if $top is present in a request to list entities
-        query_options = self.get_base_query_options(top=top, skip=skip, filter=filter)
-        url = page_url if page_url else self.odata_instance + '/' + entity.strip("/") + self.get_query_string(query_options)
+    def get_entity_collections(self, entity="", top=None, skip=None, page_url=None, filter=None, select=None, orderby=None, expand=None, can_raise=True,
+                               stop=None):
+        """
+        stop is an optional threading.Event, set when the page is no longer needed: no new attempt is made once it is set.
+        """
+        url = self.get_entity_collections_url(entity=entity, top=top, skip=skip, page_url=page_url, filter=filter, select=select, orderby=orderby, expand=expand)
+        page_cache, page_cache_key = self.get_page_cache(), None
+        if page_cache:
+            page_cache_key = "{} {} {}".format(self.get_authorization_scope(), self.page_cache_records_limit, url)
+            data = page_cache.get(page_cache_key)
+            if data is not None:
+                logger.info("Page {} read from the cache".format(url))
+                items, next_page_url = self.get_page_from_data(data)
+                self.metrics.record_page(len(items))
+                return items, next_page_url
         data = None
-        while self._should_retry(data):
+        attempt = 0
+        while self._should_retry(data, attempt, stop=stop):
             logger.info("requests get url {}".format(url))
-            response = self.get(url)
+            start_time = time()
+            response = self.get(url, stop=stop)
+            attempt += 1
             if self.assert_response_ok(response, can_raise=can_raise):
-                data = response.json()
+                decode_start_time = time()
+                data = self.decode(response)
+                decode_time = time() - decode_start_time
+                self.last_page_statistics = {
+                    "ttfb": response.elapsed.total_seconds(),
+                    "duration": time() - start_time,
+                    "bytes": len(response.content)
+                }
             else:
                 return {}, None
-            data = response.json()
+        if page_cache:
+            page_cache.set(page_cache_key, data)
+        items, next_page_url = self.get_page_from_data(data)
+        self.metrics.record_page(len(items), decode_time=decode_time)
+        return items, next_page_url
+
+    def get_page_cache(self):
+        """
+        Returns the cache of the pages, when it is enabled and a preview or sample is read.
+        Full extractions, and change tracking responses, are never cached.
+        """
+        if not self.page_cache_ttl or not self.page_cache_records_limit or self.track_changes:
+            return None
+        return DiskCache("pages", self.page_cache_ttl, max_size=self.PAGE_CACHE_MAX_SIZE, compress=True)
+
+    def get_page_from_data(self, data):
         next_page_url = data.get(ODataConstants.NEXT_LINK, None)
+        delta_link = data.get(ODataConstants.DELTA_LINK_V4, None)
         item = data.get(ODataConstants.DATA_CONTAINER_V4, data.get(ODataConstants.DATA_CONTAINER_V2, {}))
-        next_page_url = item.get(ODataConstants.NEXT_LINK_SAP, next_page_url)
+        if isinstance(item, dict):
+            next_page_url = item.get(ODataConstants.NEXT_LINK_SAP, next_page_url)
+            delta_link = item.get(ODataConstants.DELTA_LINK_SAP, delta_link)
+        if delta_link:
+            self.delta_link = delta_link
         return self.format(item), next_page_url
 
-    def _should_retry(self, data):
+    def get_entity_collections_batch(self, windows, entity="", filter=None, select=None, orderby=None, expand=None, can_raise=True):
+        """
+        Fetches several $skip / $top windows in a single $batch request.
+        windows is a list of (skip, top). Returns one (items, next_page_url) per window, in the same order.
+        Each part is checked like a single request, and the parts to retry are sent again in a new $batch.
+        """
+        pages = [None] * len(windows)
+        attempts = [0] * len(windows)
+        pending = list(range(len(windows)))
+        while pending:
+            urls = [
+                self.get_entity_collections_url(entity=entity, top=windows[index][1], skip=windows[index][0], filter=filter, select=select, orderby=orderby, expand=expand)
+                for index in pending
+            ]
+            responses = self.post_batch(urls)
+            parts_to_retry = []
+            retry_delay = 0
+            for index, response in zip(pending, responses):
+                attempts[index] += 1
+                if response.status_code in THROTTLING_STATUS_CODES and attempts[index] <= self.MAX_THROTTLING_RETRIES:
+                    self.limiter.on_throttled("error {} in $batch part".format(response.status_code))
+                    self.metrics.record_retry()
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    retry_delay = max(retry_delay, self.backoff.get_delay(attempts[index] - 1, retry_after))
+                    parts_to_retry.append(index)
+                    continue
+                if not self.assert_response_ok(response, can_raise=can_raise):
+                    pages[index] = ([], None)
+                    continue
+                decode_start_time = time()
+                data = self.decode(response)
+                decode_time = time() - decode_start_time
+                if self._should_retry(data, attempts[index]):
+                    parts_to_retry.append(index)
+                    continue
+                pages[index] = self.get_page_from_data(data)
+                self.metrics.record_page(len(pages[index][0]), decode_time=decode_time)
+            if retry_delay:
+                logger.warning("$batch parts throttled, retrying in {:.1f}s".format(retry_delay))
+                sleep(retry_delay)
+            pending = parts_to_retry
+        return pages
+
+    def post_batch(self, urls):
+        """
+        Sends the GET requests on urls as one multipart $batch request and returns their responses, in the same order
+        """
+        boundary = get_batch_boundary()
+        part_headers = {}
+        if self.force_json:
+            part_headers["Accept"] = DSSConstants.CONTENT_TYPE
+        body = build_batch_body(boundary, [self.get_relative_url(url) for url in urls], headers=part_headers)
+        logger.info("Sending {} requests in a $batch".format(len(urls)))
+        # the parts are only reads, sending them again is safe
+        responses = self.send_batch(body, boundary, idempotent=True)
+        if len(responses) != len(urls):
+            raise DataikuException("The $batch response contains {} parts for {} requests".format(len(responses), len(urls)))
+        return responses
+
+    def post_changeset(self, entity, payloads):
+        """
+        Creates one entity per payload in a single $batch changeset. Returns the responses of the changeset:
+        one per payload if it succeeded, or the single error response of the failed changeset.
+        """
+        boundary = get_batch_boundary()
+        part_headers = {}
+        if self.force_json:
+            part_headers["Accept"] = DSSConstants.CONTENT_TYPE
+        body = build_changeset_body(boundary, get_changeset_boundary(), entity.strip("/"), payloads, headers=part_headers)
+        return self.send_batch(body, boundary)
+
+    def send_batch(self, body, boundary, idempotent=False):
+        batch_url = self.odata_instance + "/" + ODataConstants.BATCH
+        headers = {"Content-Type": ODataConstants.BATCH_CONTENT_TYPE.format(boundary)}
+        response = self.post(batch_url, body, headers=headers, idempotent=idempotent)
+        if self.is_csrf_token_rejected(response):
+            logger.info("CSRF token rejected, fetching a new one")
+            self.pooled_session.clear_csrf_token()
+            response = self.post(batch_url, body, headers=headers, idempotent=idempotent)
+        self.assert_response_ok(response)
+        if response.status_code not in [200, 202]:
+            raise DataikuException("$batch request failed with error {}: {}".format(response.status_code, response.content))
+        try:
+            return parse_batch_response(response.content, response.headers.get("Content-Type"))
+        except ValueError as error:
+            raise DataikuException("Could not read the $batch response: {}".format(error))
+
+    def decode(self, response):
+        return self.json_codec.loads(response.content)
+
+    def get_relative_url(self, url):
+        # $batch parts address the resources relatively to the service root
+        if url.startswith(self.odata_instance + "/"):
+            return url[len(self.odata_instance) + 1:]
+        return url
+
+    def get_csrf_token(self):
+        """
+        Returns the token modifying requests must carry. SAP Gateway sends it back when asked with X-CSRF-Token: Fetch,
+        it is bound to the session cookies, so it is kept with the pooled session.
+        """
+        csrf_token = self.pooled_session.get_csrf_token()
+        if csrf_token is None:
+            response = self.get(self.odata_instance + "/", headers={ODataConstants.CSRF_TOKEN: ODataConstants.CSRF_TOKEN_FETCH})
+            csrf_token = response.headers.get(ODataConstants.CSRF_TOKEN) if response is not None else None
+            if not csrf_token:
+                logger.info("The service did not send a CSRF token")
+            csrf_token = csrf_token or ""
+            self.pooled_session.set_csrf_token(csrf_token)
+        return csrf_token
+
+    def is_csrf_token_rejected(self, response):
+        return response.status_code == 403 and \
+            (response.headers.get(ODataConstants.CSRF_TOKEN) or "").lower() == ODataConstants.CSRF_TOKEN_REQUIRED
+
+    def stream_entity_collections(self, entity="", top=None, skip=None, page_url=None, filter=None, select=None, orderby=None, expand=None, can_raise=True):
+        """
+        Same as get_entity_collections, but the page is returned as an ODataPageStream
+        which decodes the rows while they are read. The next page link is available
+        on the stream once all its rows have been consumed.
+        """
+        url = self.get_entity_collections_url(entity=entity, top=top, skip=skip, page_url=page_url, filter=filter, select=select, orderby=orderby, expand=expand)
+        data = None
+        attempt = 0
+        while self._should_retry(data, attempt):
+            logger.info("requests streamed get url {}".format(url))
+            response = self.get(url, stream=True)
+            attempt += 1
+            if not self.assert_response_ok(response, can_raise=can_raise):
+                response.close()
+                return ODataPageStream([]).open()
+            page = ODataPageStream(
+                response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE),
+                on_close=response.close
+            ).open()
+            data = {"error": page.error} if page.error else {}
+        # rows are decoded while they are consumed, so the decode time is part of the cleaning time
+        self.metrics.record_page(0)
+        return page
+
+    def get_metadata(self, cache_ttl=0, refresh=False):
+        """
+        Returns the service's $metadata, parsed. The parsed document is cached
+        on disk for cache_ttl seconds, keyed by the metadata URL and the credentials.
+        refresh replaces the cached document, once until it is unset.
+        """
+        url = self.odata_instance + "/" + ODataConstants.METADATA
+        cache = DiskCache("metadata", cache_ttl, max_size=self.METADATA_CACHE_MAX_SIZE)
+        cache_key = "{} {}".format(self.get_authorization_scope(), url)
+        summary = None
+        if cache_ttl and not cache.is_refresh_requested(cache_key, refresh):
+            summary = cache.get(cache_key)
+        if summary is None:
+            logger.info("Retrieving metadata from {}".format(url))
+            response = self.get(url, headers={"accept": ODataConstants.METADATA_CONTENT_TYPE})
+            if response is None:
+                raise DataikuException("Could not retrieve the service metadata")
+            self.assert_response_ok(response)
+            summary = parse_metadata(response.content)
+            if cache_ttl:
+                cache.set(cache_key, summary)
+        return ODataMetadata(summary)
+
+    def get_count(self, entity="", filter=None, cache_ttl=0):
+        """
+        Returns the number of rows of an entity set, with /$count in v4 and $inlinecount=allpages otherwise.
+        Counts can be cached on disk for cache_ttl seconds.
+        """
+        if self.odata_version == ODataConstants.ODATA_V4:
+            query_options = self.get_base_query_options(filter=filter)
+            url = self.odata_instance + '/' + entity.strip("/") + "/" + ODataConstants.COUNT + self.get_query_string(query_options)
+        else:
+            query_options = self.get_base_query_options(top=1, filter=filter)
+            query_options.append(ODataConstants.INLINE_COUNT)
+            url = self.odata_instance + '/' + entity.strip("/") + self.get_query_string(query_options)
+        cache = DiskCache("counts", cache_ttl)
+        cache_key = "{} {}".format(self.get_authorization_scope(), url)
+        count = cache.get(cache_key) if cache_ttl else None
+        if count is not None:
+            return count
+        logger.info("Counting rows with {}".format(url))
+        response = self.get(url)
+        if response is None:
+            raise DataikuException("Could not count the rows")
+        self.assert_response_ok(response)
+        if self.odata_version == ODataConstants.ODATA_V4:
+            count = int(response.text.strip())
+        else:
+            data = self.decode(response)
+            item = data.get(ODataConstants.DATA_CONTAINER_V2, {})
+            count = int(item.get(ODataConstants.COUNT_V2, data.get(ODataConstants.COUNT_V3, data.get(ODataConstants.COUNT_V4))))
+        if cache_ttl:
+            cache.set(cache_key, count)
+        return count
+
+    def get_authorization_scope(self):
+        """
+        Identifies the credentials used, without exposing them, so that cached answers are not shared between users
+        """
+        auth = self.session.auth or ("", "")
+        return get_hash_key(auth[0], auth[1], self.odata_access_token)
+
+    def get_entity_collections_url(self, entity="", top=None, skip=None, page_url=None, filter=None, select=None, orderby=None, expand=None):
+        if page_url:
+            return page_url
+        if entity is None:
+            entity = ""
+        if self.odata_list_title is None or self.odata_list_title == "":
+            top = None  # SAP will complain if $top is present in a request to list entities
+        query_options = self.get_base_query_options(top=top, skip=skip, filter=filter, select=select, orderby=orderby, expand=expand)
+        return self.odata_instance + '/' + entity.strip("/") + self.get_query_string(query_options)
+
+    def _should_retry(self, data, attempt, stop=None):
+        # attempt is kept by the caller so that pages can be fetched from several threads
         if data is None:
-            self.retries = 0
             return True
-        self.retries += 1
         if "error" in data:
             if "message" in data["error"] and "value" in data["error"]["message"]:
                 # SAP error causing troubles: {'error': {'code': '/IWBEP/CM_MGW_RT/004', 'message': {value': 'Metadata cache on
-                if self.retries < self.MAX_RETRIES:
-                    logging.warning("Remote service error : {}. Attempt {}, trying again".format(data["error"]["message"]["value"], self.retries))
-                    sleep(2)
+                if attempt < self.MAX_RETRIES:
+                    self.metrics.record_retry()
+                    logging.warning("Remote service error : {}. Attempt {}, trying again".format(data["error"]["message"]["value"], attempt))
+                    wait(self.backoff.get_delay(attempt), stop=stop)
                     return True
                 else:
-                    logging.error("Remote service error : {}. Attempt {}, stop trying.".format(data["error"]["message"]["value"], self.retries))
+                    logging.error("Remote service error : {}. Attempt {}, stop trying.".format(data["error"]["message"]["value"], attempt))
                     raise DataikuException("Remote service error : {}".format(data["error"]["message"]["value"]))
             else:
                 logging.error("Remote service error")
                 raise DataikuException("Remote service error")
         return False
 
-    def get(self, url, headers={}):
-        headers = self.get_headers()
+    def get(self, url, headers={}, stream=False, stop=None):
+        request_headers = self.get_headers()
+        request_headers.update(headers)
         args = {
-            "headers": headers
+            "headers": request_headers
         }
         if self.ignore_ssl_check is True:
             args["verify"] = False
+        if stream:
+            args["stream"] = True
         logger.info("Accessing endpoint {}".format(url))
         try:
-            ret = self.session.get(url, **args)
+            ret = self.send_request("GET", url, stop=stop, **args)
             return ret
         except Exception as err:
             logging.error('error:{}'.format(err))
+            raise DataikuException("Error while accessing {}: {}".format(url, err))
+
+    def post(self, url, data, headers={}, idempotent=False):
+        request_headers = self.get_headers()
+        request_headers.pop("accept", None)
+        request_headers.update(headers)
+        csrf_token = self.get_csrf_token()
+        if csrf_token:
+            request_headers[ODataConstants.CSRF_TOKEN] = csrf_token
+        args = {
+            "headers": request_headers,
+            "data": data
+        }
+        if self.ignore_ssl_check is True:
+            args["verify"] = False
+        logger.info("Posting to endpoint {}".format(url))
+        try:
+            return self.send_request("POST", url, idempotent=idempotent, **args)
+        except Exception as err:
+            logging.error('error:{}'.format(err))
+            raise DataikuException("Error while posting to {}: {}".format(url, err))
+
+    def send_request(self, method, url, idempotent=None, stop=None, **args):
+        """
+        Sends a request when the concurrency limit allows it. Throttling answers (429, 502, 503, 504) and
+        connection errors are retried after a jittered exponential backoff, or after the Retry-After delay.
+        Requests that are not idempotent, such as changesets, may have been processed when the gateway timed out
+        or the connection was lost: they are only retried on 429 and 503, sent back before processing.
+        Once the optional stop event is set, the backoff is interrupted and the request is not sent again.
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        retried_status_codes = THROTTLING_STATUS_CODES if idempotent else UNPROCESSED_STATUS_CODES
+        attempt = 0
+        while True:
+            assert_not_stopped(stop, url)
+            start_time = time()
+            try:
+                with self.limiter.slot():
+                    response = self.session.request(method, url, **args)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                if not idempotent or attempt >= self.MAX_THROTTLING_RETRIES:
+                    raise
+                self.limiter.on_throttled("{}".format(error))
+                self.metrics.record_retry()
+                delay = self.backoff.get_delay(attempt)
+                logger.warning("Connection error: {}. Attempt {}, trying again in {:.1f}s".format(error, attempt + 1, delay))
+                wait(delay, stop=stop)
+                attempt += 1
+                continue
+            if response.status_code not in THROTTLING_STATUS_CODES:
+                self.limiter.on_success(response.elapsed.total_seconds(), get_request_kind(method, url))
+                self.record_request(response, start_time, args.get("stream", False))
+                return response
+            if attempt >= self.MAX_THROTTLING_RETRIES or response.status_code not in retried_status_codes:
+                self.record_request(response, start_time, args.get("stream", False))
+                return response
+            self.limiter.on_throttled("error {}".format(response.status_code))
+            self.metrics.record_retry()
+            delay = self.backoff.get_delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+            logger.warning("Error {} on {}. Attempt {}, trying again in {:.1f}s".format(response.status_code, url, attempt + 1, delay))
+            response.close()
+            wait(delay, stop=stop)
+            attempt += 1
+
+    def record_request(self, response, start_time, stream=False):
+        ttfb = response.elapsed.total_seconds()
+        if stream:
+            # the body is not read yet: its size is only known from the headers, and its download is part of the decoding
+            self.metrics.record_request(ttfb, 0, int(response.headers.get("Content-Length") or 0))
+        else:
+            self.metrics.record_request(ttfb, max(0, time() - start_time - ttfb), get_wire_size(response), content_bytes=len(response.content))
 
     def get_headers(self):
         headers = {}
         if self.force_json:
             headers["accept"] = DSSConstants.CONTENT_TYPE
         headers["Authorization"] = self.get_authorization_bearer()
+        # compressed bodies are decompressed by urllib3 / aiohttp, also while pages are streamed
+        headers[ODataConstants.ACCEPT_ENCODING] = ODataConstants.COMPRESSED_ENCODINGS if self.accept_compression else ODataConstants.IDENTITY_ENCODING
+        if self.track_changes:
+            headers["Prefer"] = ODataConstants.TRACK_CHANGES
         return headers
 
-    def get_base_query_options(self, top=None, skip=None, records_limit=None, filter=None):
+    def get_base_query_options(self, top=None, skip=None, records_limit=None, filter=None, select=None, orderby=None, expand=None):
         if self.force_json and self.json_in_query_string:
             query_options = [DSSConstants.JSON_FORMAT]
         else:
@@ -161,6 +527,12 @@ class ODataClient():
             query_options.append(ODataConstants.TOP.format(top))
         if filter:
             query_options.append(ODataConstants.FILTER.format(filter))
+        if select:
+            query_options.append(ODataConstants.SELECT.format(",".join(select)))
+        if orderby:
+            query_options.append(ODataConstants.ORDER_BY.format(",".join(orderby)))
+        if expand:
+            query_options.append(ODataConstants.EXPAND.format(expand))
         return query_options
 
     def format(self, item):
@@ -203,9 +575,35 @@ class ODataClient():
             raise DataikuException("{}".format(response))
         if status_code == 401:
             raise DataikuException("Forbidden access")
+        if status_code in THROTTLING_STATUS_CODES:
+            logger.error("Error {}, response={}".format(status_code, response.content))
+            raise DataikuException("Error {}: the service is overloaded or unavailable, try again later".format(status_code))
         if status_code == 400:
             return_code = False
             logger.error("Error 400, response={}".format(response.content))
             if can_raise:
                 raise DataikuException("Error 400: {}".format(response))
         return return_code
+
+
+def wait(delay, stop=None):
+    if stop is None:
+        sleep(delay)
+    else:
+        stop.wait(delay)
+
+
+def assert_not_stopped(stop, url):
+    if stop is not None and stop.is_set():
+        raise DataikuException("Request to {} stopped, its answer is no longer needed".format(url))
+
+
+def get_wire_size(response):
+    """
+    Returns the size of the body as received, before decompression
+    """
+    try:
+        size = response.raw.tell()
+    except Exception:
+        size = None
+    return size or len(response.content)
@@ -1,8 +1,12 @@
+import hashlib
 import json
 import re
 import datetime
+from functools import lru_cache
 from dss_constants import DSSConstants
 from odata_constants import ODataConstants
+from odata_json import json_codec
+from odata_metadata import fits_in_double
 
 
 odata_data_pattern = re.compile(r'(?:/Date\()(-?\d+)(?:\)/)')
@@ -15,7 +19,7 @@ def clean_json_and_date(item):
     for key in item:
         value = item.get(key)
         if isinstance(value, dict):
-            item[key] = json.dumps(value)
+            item[key] = json_codec.dumps(value)
         elif isinstance(value, str):
             item[key] = convert_odata_date_to_dss(value)
     return item
@@ -28,7 +32,7 @@ def clean_json(item):
     for key in item:
         value = item.get(key)
         if isinstance(value, dict):
-            item[key] = json.dumps(value)
+            item[key] = json_codec.dumps(value)
     return item
 
 
@@ -43,8 +47,111 @@ def convert_odata_date_to_dss(input_string):
     return input_string
 
 
+# Dates tend to repeat across rows (posting dates, validity dates...)
+convert_odata_date_string_to_dss = lru_cache(maxsize=4096)(convert_odata_date_to_dss)
+
+
+def convert_odata_date_to_dss_cached(value):
+    if type(value) is not str:
+        return value
+    return convert_odata_date_string_to_dss(value)
+
+
+def to_integer(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+EDM_TYPES_CONVERTERS = {
+    "Edm.Byte": to_integer,
+    "Edm.DateTime": convert_odata_date_to_dss_cached,
+    "Edm.DateTimeOffset": convert_odata_date_to_dss_cached,
+    "Edm.Decimal": to_float,
+    "Edm.Double": to_float,
+    "Edm.Int16": to_integer,
+    "Edm.Int32": to_integer,
+    "Edm.Int64": to_integer,
+    "Edm.SByte": to_integer,
+    "Edm.Single": to_float
+}
+
+
+class CompiledRowCleaner(object):
+    """
+    Cleans rows like clean_json_and_date / clean_json, but works out once which keys
+    to drop and which columns hold dates. Nested objects are turned into JSON in any column,
+    whatever the values seen before, and the date conversion only applies to strings.
+    A row with a different set of keys updates the layout, and columns only seen empty so far
+    are checked until a value shows up.
+    When the entity properties from $metadata are given, values are converted to their declared types.
+    """
+    def __init__(self, should_convert_date=True, properties=None):
+        self.should_convert_date = should_convert_date
+        self.column_converters = {}
+        self.layout = None
+        self.keys_to_remove = ()
+        self.converters = ()
+        for odata_property in properties or []:
+            edm_type = odata_property.get("type") or ""
+            converter = EDM_TYPES_CONVERTERS.get(edm_type)  # complex types are nested objects, turned into JSON like any other
+            if edm_type == "Edm.Decimal" and not fits_in_double(odata_property):
+                converter = None
+            self.column_converters[odata_property.get("name")] = converter
+
+    def __call__(self, item):
+        if item.keys() != self.layout:
+            self.compile(item)
+        for key in self.keys_to_remove:
+            del item[key]
+        for key, converter in self.converters:
+            value = item[key]
+            if value is None:
+                continue
+            if isinstance(value, dict):
+                item[key] = json_codec.dumps(value)
+            elif converter is not None:
+                item[key] = converter(value)
+        return item
+
+    def compile(self, item=None):
+        if item is not None:
+            self.layout = set(item.keys())
+            self.keys_to_remove = tuple(key for key in DSSConstants.KEYS_TO_REMOVE if key in self.layout)
+        converters = []
+        for key in self.layout:
+            if key in self.keys_to_remove:
+                continue
+            if key not in self.column_converters:
+                converters.append((key, self.get_learning_converter(key)))
+            else:
+                converters.append((key, self.column_converters[key]))
+        self.converters = tuple(converters)
+
+    def get_learning_converter(self, key):
+        def learn_and_convert(value):
+            converter = self.get_converter_for(value)
+            self.column_converters[key] = converter
+            self.compile()
+            return converter(value) if converter else value
+        return learn_and_convert
+
+    def get_converter_for(self, value):
+        if self.should_convert_date and isinstance(value, str) and odata_data_pattern.match(value):
+            return convert_odata_date_to_dss_cached
+        return None
+
+
 def get_clean_row_method(config):
-    clean_row = clean_json_and_date  # New default behaviour
+    clean_row = CompiledRowCleaner(should_convert_date=True)  # New default behaviour
     should_convert_date = config.get("should_convert_date")
     if config.get("show_advanced_parameters", False):
         if should_convert_date is False:
@@ -62,6 +169,21 @@ def get_login(config):
     return login
 
 
+def get_hash_key(*parts):
+    """
+    Hash of JSON serializable parts, used to identify a service, an extraction or a set of credentials
+    in keys (cache, sessions, state files) without exposing the credentials
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def get_identity(config):
+    """
+    Hash of the credentials in use, so that cached answers are not shared between users
+    """
+    return get_hash_key(config.get(DSSConstants.AUTH_TYPE), get_login(config), config.get("sap-odata_oauth"))
+
+
 def get_odata_instance(config):
     odata_instance = ""
     odata_service_node = config.get("odata_service_node_select", "").strip("/")
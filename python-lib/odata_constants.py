@@ -1,13 +1,31 @@
 class ODataConstants(object):
+    ACCEPT_ENCODING = "Accept-Encoding"
+    BATCH = "$batch"
+    BATCH_CONTENT_TYPE = "multipart/mixed; boundary={}"
+    COMPRESSED_ENCODINGS = "gzip, deflate"
+    COUNT = "$count"
+    COUNT_V2 = "__count"
+    COUNT_V3 = "odata.count"
+    COUNT_V4 = "@odata.count"
+    CSRF_TOKEN = "X-CSRF-Token"
+    CSRF_TOKEN_FETCH = "Fetch"
+    CSRF_TOKEN_REQUIRED = "required"
     DATA_CONTAINER_V4 = "value"
     DATA_CONTAINER_V3 = "value"
     DATA_CONTAINER_V2 = "d"
     DATA_RESULTS = "results"
+    DELTA_LINK_SAP = "__delta"
+    DELTA_LINK_V4 = "@odata.deltaLink"
     ENTITYSETS = "EntitySets"
+    EXPAND = "$expand={}"
     FILTER = "$filter={}"
+    IDENTITY_ENCODING = "identity"
+    INLINE_COUNT = "$inlinecount=allpages"
     INSTANCE = "odata_instance"
     LIST_TITLE = "odata_list_title"
     LOGIN = "sap-odata_login"
+    METADATA = "$metadata"
+    METADATA_CONTENT_TYPE = "application/xml"
     NEXT_LINK = "@odata.nextLink"
     NEXT_LINK_SAP = "__next"
     OAUTH = "odata_oauth"
@@ -15,13 +33,16 @@ class ODataConstants(object):
     ODATA_V3 = "v3"
     ODATA_V4 = "v4"
     ODATA_VSAP = "sap"
+    ORDER_BY = "$orderby={}"
     PASSWORD = "odata_password"
     RECORD_LIMIT = "$top={}"
     SAP_CLIENT = "sap_client"
     SAP_CLIENT_HEADER = "sap-client"
+    SELECT = "$select={}"
     SERVICE_NODE = "odata_service_node"
     SKIP = "$skip={}"
     TOP = "$top={}"
+    TRACK_CHANGES = "odata.track-changes"
     UI_MANUAL_SELECT = "_dku_manual_select"
     USERNAME = "odata_username"
     VERSION = "odata_version"
@@ -0,0 +1,108 @@
+from dss_constants import DSSConstants
+from odata_constants import ODataConstants
+
+
+EXPAND_SEPARATOR = "/"
+
+
+def parse_expand(paths):
+    """
+    Turns navigation paths such as ["to_Item/to_Text", "to_Partner"] into a tree:
+    {"to_Item": {"to_Text": {}}, "to_Partner": {}}
+    """
+    tree = {}
+    for path in paths or []:
+        node = tree
+        for navigation_property in path.strip().strip("/").split("/"):
+            navigation_property = navigation_property.strip()
+            if navigation_property:
+                node = node.setdefault(navigation_property, {})
+    return tree
+
+
+def format_expand(tree, odata_version):
+    """
+    Returns the $expand option for a tree of navigation properties:
+    paths in v2 (to_Item/to_Text,to_Partner), nested options in v4 (to_Item($expand=to_Text),to_Partner)
+    """
+    if odata_version == ODataConstants.ODATA_V4:
+        return ",".join(
+            "{}($expand={})".format(name, format_expand(children, odata_version)) if children else name
+            for name, children in tree.items()
+        )
+    return ",".join(get_expand_paths(tree))
+
+
+def get_expand_paths(tree, prefix=""):
+    paths = []
+    for name, children in tree.items():
+        path = prefix + name
+        paths.append(path)
+        paths.extend(get_expand_paths(children, prefix=path + "/"))
+    return [path for path in paths if not any(other.startswith(path + "/") for other in paths)]
+
+
+def get_related_entities(value):
+    """
+    Returns the list of entities of an expanded navigation property:
+    v2 to-many {"results": [...]}, v4 to-many [...], to-one {...} or null
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        if "__deferred" in value:
+            return []  # not expanded
+        if isinstance(value.get(ODataConstants.DATA_RESULTS), list):
+            return value[ODataConstants.DATA_RESULTS]
+        return [value]
+    return []
+
+
+class ExpandedRowBuilder(object):
+    """
+    Turns the expanded navigation properties of an entity into columns named after their path,
+    e.g. to_Partner/Name. Related entities of a to-many navigation are either:
+    - flattened: numbered columns on the parent row, to_Item/0/Material, to_Item/1/Material...
+    - exploded: one row per related entity, parent columns repeated. A parent without related
+      entities still gives one row. Several to-many navigations give one row per combination.
+    """
+    def __init__(self, expand_tree, explode=False):
+        self.expand_tree = expand_tree
+        self.explode = explode
+
+    def get_rows(self, items):
+        for item in items:
+            for row in self.build_rows(item, self.expand_tree, ""):
+                yield row
+
+    def build_rows(self, entity, expand_tree, prefix):
+        row = {}
+        rows_of_navigations = []
+        for key, value in entity.items():
+            if key in DSSConstants.KEYS_TO_REMOVE:
+                continue
+            if key not in expand_tree:
+                row[prefix + key] = value
+                continue
+            navigation_prefix = prefix + key + EXPAND_SEPARATOR
+            related_entities = get_related_entities(value)
+            if self.explode:
+                related_rows = []
+                for related_entity in related_entities:
+                    related_rows.extend(self.build_rows(related_entity, expand_tree[key], navigation_prefix))
+                rows_of_navigations.append(related_rows or [{}])
+            elif is_to_one(value):
+                row.update(self.build_rows(value, expand_tree[key], navigation_prefix)[0])
+            else:
+                for index, related_entity in enumerate(related_entities):
+                    row.update(self.build_rows(related_entity, expand_tree[key], "{}{}{}".format(navigation_prefix, index, EXPAND_SEPARATOR))[0])
+        rows = [row]
+        for related_rows in rows_of_navigations:
+            rows = [dict(parent_row, **related_row) for parent_row in rows for related_row in related_rows]
+        return rows
+
+
+def is_to_one(value):
+    return isinstance(value, dict) and ODataConstants.DATA_RESULTS not in value and "__deferred" not in value
@@ -0,0 +1,196 @@
+import datetime
+import re
+from urllib.parse import quote
+from odata_common import odata_data_pattern
+from odata_constants import ODataConstants
+
+
+def combine_filters(*filters):
+    """
+    Joins $filter expressions with 'and', each one between parenthesis.
+    """
+    filters = [odata_filter for odata_filter in filters if odata_filter]
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return " and ".join(["({})".format(odata_filter) for odata_filter in filters])
+
+
+timezone_pattern = re.compile(r'.*(Z|[+-]\d\d:?\d\d)$')
+DATE_TYPES = ["Edm.DateTime", "Edm.DateTimeOffset"]
+NUMBER_TYPES = ["Edm.Byte", "Edm.Decimal", "Edm.Double", "Edm.Int16", "Edm.Int32", "Edm.Int64", "Edm.SByte", "Edm.Single"]
+V2_NUMBER_SUFFIXES = {"Edm.Decimal": "M", "Edm.Double": "d", "Edm.Int64": "L", "Edm.Single": "f"}
+
+
+def format_literal(value, edm_type=None, odata_version=ODataConstants.ODATA_V2):
+    """
+    Formats a value, as found in an OData JSON payload, as a $filter literal.
+    """
+    is_v4 = odata_version == ODataConstants.ODATA_V4
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if edm_type in DATE_TYPES:
+        return format_date_literal(value, edm_type, is_v4)
+    if edm_type == "Edm.Guid":
+        return value if is_v4 else "guid'{}'".format(value)
+    if edm_type in ["Edm.Time", "Edm.Duration"]:
+        return "duration'{}'".format(value) if is_v4 else "time'{}'".format(value)
+    if edm_type == "Edm.Date" and isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d")
+    if edm_type in ["Edm.Date", "Edm.TimeOfDay"]:
+        return value
+    if edm_type in NUMBER_TYPES:
+        suffix = "" if is_v4 else V2_NUMBER_SUFFIXES.get(edm_type, "")
+        return "{}{}".format(value, suffix)
+    if edm_type is None and isinstance(value, (int, float)):
+        return "{}".format(value)
+    return "'{}'".format(quote("{}".format(value).replace("'", "''"), safe=" '"))
+
+
+def format_date_literal(value, edm_type, is_v4):
+    timestamp = to_iso_timestamp(value)
+    has_timezone = timezone_pattern.match(timestamp) is not None
+    if is_v4:
+        return quote(timestamp if has_timezone else timestamp + "Z", safe=":")
+    if edm_type == "Edm.DateTimeOffset":
+        return "datetimeoffset'{}'".format(quote(timestamp if has_timezone else timestamp + "Z", safe=":"))
+    return "datetime'{}'".format(timestamp.rstrip("Z"))
+
+
+def to_iso_timestamp(value):
+    """
+    Converts a /Date(ms)/ value or a DSS / ISO date string into an ISO timestamp without timezone suffix for naive dates.
+    """
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%S")
+    match = odata_data_pattern.match(value)
+    if match:
+        epoch_timestamp = int(match.group(1)) / 1000
+        return datetime.datetime.utcfromtimestamp(epoch_timestamp).strftime("%Y-%m-%dT%H:%M:%S")
+    return value
+
+
+def build_keyset_filter(keys, last_key_values, odata_version=ODataConstants.ODATA_V2):
+    """
+    Builds the $filter selecting the rows that come after last_key_values in the (k1, k2, ...) order, e.g.
+    (k1 gt v1) or (k1 eq v1 and k2 gt v2)
+    keys is a list of (property name, EDM type)
+    """
+    alternatives = []
+    for index, (key_name, edm_type) in enumerate(keys):
+        conditions = []
+        for previous_index, (previous_name, previous_type) in enumerate(keys[:index]):
+            previous_value = format_literal(last_key_values[previous_index], previous_type, odata_version)
+            conditions.append("{} eq {}".format(previous_name, previous_value))
+        conditions.append("{} gt {}".format(key_name, format_literal(last_key_values[index], edm_type, odata_version)))
+        alternatives.append(" and ".join(conditions))
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return " or ".join(["({})".format(alternative) for alternative in alternatives])
+
+
+def build_range_filter(property_name, lower=None, upper=None, edm_type=None, odata_version=ODataConstants.ODATA_V2, include_nulls=False):
+    """
+    Builds the $filter selecting lower <= property < upper. A missing bound leaves the range open on that side.
+    """
+    conditions = []
+    if lower is not None:
+        conditions.append("{} ge {}".format(property_name, format_literal(lower, edm_type, odata_version)))
+    if upper is not None:
+        conditions.append("{} lt {}".format(property_name, format_literal(upper, edm_type, odata_version)))
+    range_filter = " and ".join(conditions)
+    if include_nulls:
+        null_filter = "{} eq null".format(property_name)
+        return "({}) or ({})".format(range_filter, null_filter) if range_filter else null_filter
+    return range_filter or None
+
+
+def parse_shard_boundaries(boundaries, edm_type=None):
+    """
+    Turns the boundaries entered by the user into values that can be formatted as literals of the property:
+    dates for date properties, numbers when the type of the property is not known.
+    Raises ValueError if a boundary of a date property is not a date.
+    """
+    if edm_type in DATE_TYPES or edm_type == "Edm.Date":
+        dates = [to_datetime(boundary) for boundary in boundaries]
+        invalid_boundaries = [boundary for boundary, date in zip(boundaries, dates) if date is None]
+        if invalid_boundaries:
+            raise ValueError("{} are not dates (expected YYYY-MM-DD or YYYY-MM-DDThh:mm:ss)".format(invalid_boundaries))
+        return dates
+    if edm_type is None:
+        return [parse_number(boundary) for boundary in boundaries]
+    return boundaries
+
+
+def parse_number(value):
+    for number_type in [int, float]:
+        try:
+            return number_type(value)
+        except ValueError:
+            continue
+    return value
+
+
+def build_shard_filters(property_name, boundaries, edm_type=None, odata_version=ODataConstants.ODATA_V2):
+    """
+    Splits the property domain in len(boundaries) + 1 disjoint ranges. Null values go in the first one.
+    """
+    bounds = [None] + list(boundaries) + [None]
+    shard_filters = []
+    for index in range(len(bounds) - 1):
+        shard_filters.append(build_range_filter(
+            property_name, lower=bounds[index], upper=bounds[index + 1],
+            edm_type=edm_type, odata_version=odata_version, include_nulls=(index == 0)
+        ))
+    return shard_filters
+
+
+def interpolate_boundaries(minimum, maximum, number_of_ranges, edm_type=None):
+    """
+    Returns number_of_ranges - 1 boundaries evenly spread between minimum and maximum,
+    for numeric and date properties. Returns None if the values can't be interpolated.
+    """
+    if edm_type in DATE_TYPES or edm_type == "Edm.Date" or is_date(minimum):
+        minimum, maximum = to_datetime(minimum), to_datetime(maximum)
+        if minimum is None or maximum is None:
+            return None
+        step = (maximum - minimum) / number_of_ranges
+        boundaries = [minimum + step * index for index in range(1, number_of_ranges)]
+    else:
+        try:
+            minimum, maximum = float(minimum), float(maximum)
+        except (TypeError, ValueError):
+            return None
+        step = (maximum - minimum) / number_of_ranges
+        boundaries = [minimum + step * index for index in range(1, number_of_ranges)]
+        if edm_type is None or edm_type not in ["Edm.Decimal", "Edm.Double", "Edm.Single"]:
+            boundaries = [int(boundary) for boundary in boundaries]
+    unique_boundaries = []
+    for boundary in boundaries:
+        if boundary > minimum and boundary not in unique_boundaries:
+            unique_boundaries.append(boundary)
+    return unique_boundaries
+
+
+def is_date(value):
+    return isinstance(value, str) and odata_data_pattern.match(value) is not None
+
+
+def to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if not isinstance(value, str):
+        return None
+    match = odata_data_pattern.match(value)
+    if match:
+        return datetime.datetime.utcfromtimestamp(int(match.group(1)) / 1000)
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
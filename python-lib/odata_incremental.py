@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import tempfile
+from odata_common import get_hash_key
+from odata_filters import to_datetime
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+def get_state_folder():
+    dip_home = os.environ.get("DIP_HOME")
+    if dip_home:
+        return os.path.join(dip_home, "local", "sap-odata-state")
+    return os.path.join(tempfile.gettempdir(), "dss-plugin-sap-odata-state")
+
+
+class StateStore(object):
+    """
+    Small JSON documents persisted between runs, one file per key.
+    """
+    def __init__(self, folder=None):
+        self.folder = folder or get_state_folder()
+
+    def load(self, key):
+        path = self.get_path(key)
+        if not os.path.isfile(path):
+            return {}
+        try:
+            with open(path, "r") as state_file:
+                return json.load(state_file)
+        except (OSError, IOError, ValueError) as error:
+            logger.warning("Could not read state file {}: {}".format(path, error))
+            return {}
+
+    def save(self, key, state):
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder, mode=0o700)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.folder)
+        with os.fdopen(file_descriptor, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(temporary_path, self.get_path(key))
+
+    def clear(self, key):
+        path = self.get_path(key)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def get_path(self, key):
+        return os.path.join(self.folder, "{}.json".format(key))
+
+
+class Checkpoint(object):
+    """
+    Position of an extraction after its last completed page and number of rows retrieved until then,
+    updated after each page so that an extraction failing during the run can be resumed from there.
+    It is not kept between runs: the dataset is made of the rows of a single run, a run starting
+    after the rows retrieved by a failed one would leave it truncated.
+    """
+    def __init__(self):
+        self.position = None
+        self.row_count = 0
+
+    def save(self, position, row_count):
+        self.position = position
+        self.row_count = row_count
+
+
+class HighWaterMark(object):
+    """
+    Keeps track of the largest value of a property seen in the raw rows, and of the rows holding it.
+    Rows committed after a run can carry the same value as the last rows it retrieved, so the next run
+    selects the rows from the mark included, and recognizes the ones already retrieved by their hash.
+    """
+    def __init__(self, property_name, value=None, row_hashes=None):
+        self.property_name = property_name
+        self.value = value
+        self.comparable_value = self.get_comparable(value)
+        self.row_hashes = set(row_hashes or [])  # rows retrieved holding the mark
+        self.retrieved_value = self.comparable_value
+        self.retrieved_row_hashes = frozenset(self.row_hashes)  # rows retrieved by the previous run holding its mark
+
+    def observe(self, item):
+        """
+        Moves the mark with a row. Returns False if the row holds the mark of the previous run and was retrieved by it.
+        """
+        value = item.get(self.property_name)
+        if value is None:
+            return True
+        comparable_value = self.get_comparable(value)
+        if comparable_value is None:
+            return True
+        if self.retrieved_row_hashes and comparable_value == self.retrieved_value and get_row_hash(item) in self.retrieved_row_hashes:
+            return False
+        if self.comparable_value is None or comparable_value >= self.comparable_value:
+            # only the rows holding the mark are hashed
+            self.merge(value, [get_row_hash(item)], comparable_value)
+        return True
+
+    def merge(self, value, row_hashes, comparable_value=None):
+        """
+        Moves the mark to value if it is larger, keeping the rows holding it
+        """
+        if comparable_value is None:
+            comparable_value = self.get_comparable(value)
+            if comparable_value is None:
+                return
+        if self.comparable_value is None or comparable_value > self.comparable_value:
+            self.value = value
+            self.comparable_value = comparable_value
+            self.row_hashes = set(row_hashes)
+        elif comparable_value == self.comparable_value:
+            self.row_hashes.update(row_hashes)
+
+    def get_comparable(self, value):
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return value
+        date_value = to_datetime(value)
+        if date_value is not None:
+            return date_value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+
+
+def get_row_hash(item):
+    return get_hash_key(item)
@@ -0,0 +1,66 @@
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+JSON_DECODERS = {
+    "orjson": orjson.loads if orjson else None,
+    "ujson": ujson.loads if ujson else None,
+    "json": json.loads
+}
+FASTEST_DECODERS = ["orjson", "ujson", "json"]
+# integers of 19 digits or more can exceed 64 bits, which fast libraries turn into floats.
+# Runs of digits are found by turning all digits into zeros, which is much faster than a regular expression.
+DIGITS_TO_ZEROS = bytes.maketrans(b"123456789", b"000000000")
+BIG_INTEGER_DIGITS = b"0" * 19
+
+
+class JSONCodec(object):
+    """
+    Decodes the OData responses with the fastest JSON library installed (orjson, then ujson),
+    and falls back on the standard library for the documents it rejects or could read differently
+    (NaN, integers over 64 bits, lone surrogates...), so that the values are always the ones json.loads returns.
+    Values are encoded with the standard library: the other libraries do not write the same text
+    (separators, escaping of non ASCII characters), and this text ends up in the datasets.
+    """
+    def __init__(self, decoder="auto"):
+        if decoder == "auto":
+            decoder = next(name for name in FASTEST_DECODERS if JSON_DECODERS.get(name))
+        if not JSON_DECODERS.get(decoder):
+            logger.warning("JSON library {} is not installed, using json".format(decoder))
+            decoder = "json"
+        self.decoder = decoder
+        self.fast_loads = JSON_DECODERS[decoder] if decoder != "json" else None
+
+    def loads(self, content):
+        if self.fast_loads is not None and not self.has_big_integers(content):
+            try:
+                return self.fast_loads(content)
+            except (ValueError, OverflowError):
+                pass
+        return json.loads(content)
+
+    def has_big_integers(self, content):
+        if not isinstance(content, bytes):
+            content = content.encode("utf-8", "surrogatepass")
+        return BIG_INTEGER_DIGITS in content.translate(DIGITS_TO_ZEROS)
+
+    def dumps(self, value):
+        return json.dumps(value)
+
+
+json_codec = JSONCodec()
@@ -0,0 +1,163 @@
+import xml.etree.ElementTree as ElementTree
+
+
+EDM_TYPES_TO_DSS = {
+    "Edm.Binary": "string",
+    "Edm.Boolean": "boolean",
+    "Edm.Byte": "smallint",
+    "Edm.Date": "date",
+    "Edm.DateTime": "date",
+    "Edm.DateTimeOffset": "date",
+    "Edm.Decimal": "double",
+    "Edm.Double": "double",
+    "Edm.Duration": "string",
+    "Edm.Guid": "string",
+    "Edm.Int16": "smallint",
+    "Edm.Int32": "int",
+    "Edm.Int64": "bigint",
+    "Edm.SByte": "tinyint",
+    "Edm.Single": "float",
+    "Edm.String": "string",
+    "Edm.Time": "string",
+    "Edm.TimeOfDay": "string"
+}
+MAX_DOUBLE_PRECISION = 15  # digits a double holds without rounding
+
+
+def get_local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_metadata(xml_content):
+    """
+    Summarizes a $metadata document (v2, v4 and SAP flavours) into a JSON serializable dict:
+    entity sets -> entity type name, and entity types -> keys, properties and navigation properties.
+    """
+    root = ElementTree.fromstring(xml_content)
+    entity_sets = {}
+    entity_types = {}
+    for schema in root.iter():
+        if get_local_name(schema.tag) != "Schema":
+            continue
+        prefixes = [schema.get("Namespace")]
+        if schema.get("Alias"):
+            prefixes.append(schema.get("Alias"))
+        for element in schema:
+            element_name = get_local_name(element.tag)
+            if element_name == "EntityType":
+                entity_type = parse_entity_type(element)
+                for prefix in prefixes:
+                    entity_types["{}.{}".format(prefix, element.get("Name"))] = entity_type
+            elif element_name == "EntityContainer":
+                for entity_set in element:
+                    if get_local_name(entity_set.tag) == "EntitySet":
+                        entity_sets[entity_set.get("Name")] = entity_set.get("EntityType")
+    return {
+        "entity_sets": entity_sets,
+        "entity_types": entity_types
+    }
+
+
+def parse_entity_type(element):
+    entity_type = {
+        "base_type": element.get("BaseType"),
+        "keys": [],
+        "properties": [],
+        "navigation_properties": []
+    }
+    for child in element:
+        child_name = get_local_name(child.tag)
+        if child_name == "Key":
+            for property_ref in child:
+                entity_type["keys"].append(property_ref.get("Name"))
+        elif child_name == "Property":
+            precision = child.get("Precision") or ""
+            entity_type["properties"].append({
+                "name": child.get("Name"),
+                "type": child.get("Type"),
+                "nullable": child.get("Nullable", "true") != "false",
+                "precision": int(precision) if precision.isdigit() else None
+            })
+        elif child_name == "NavigationProperty":
+            entity_type["navigation_properties"].append(child.get("Name"))
+    return entity_type
+
+
+class ODataMetadata(object):
+    def __init__(self, summary):
+        self.entity_sets = summary.get("entity_sets", {})
+        self.entity_types = summary.get("entity_types", {})
+
+    def get_entity_type(self, entity_set_name):
+        """
+        Returns the entity type of an entity set, with the properties of its base types,
+        or None if the entity set is not described in the $metadata.
+        """
+        entity_set_name = get_entity_set_name(entity_set_name)
+        entity_type = self.entity_types.get(self.entity_sets.get(entity_set_name))
+        if entity_type is None:
+            return None
+        keys = list(entity_type.get("keys", []))
+        properties = list(entity_type.get("properties", []))
+        navigation_properties = list(entity_type.get("navigation_properties", []))
+        base_type = self.entity_types.get(entity_type.get("base_type"))
+        while base_type:
+            keys = base_type.get("keys", []) + keys
+            properties = base_type.get("properties", []) + properties
+            navigation_properties = base_type.get("navigation_properties", []) + navigation_properties
+            base_type = self.entity_types.get(base_type.get("base_type"))
+        return {
+            "keys": keys,
+            "properties": properties,
+            "navigation_properties": navigation_properties
+        }
+
+    def get_properties(self, entity_set_name):
+        entity_type = self.get_entity_type(entity_set_name)
+        if entity_type is None:
+            return []
+        return entity_type.get("properties", [])
+
+    def get_keys(self, entity_set_name):
+        entity_type = self.get_entity_type(entity_set_name)
+        if entity_type is None:
+            return []
+        return entity_type.get("keys", [])
+
+    def get_dss_schema(self, entity_set_name):
+        properties = self.get_properties(entity_set_name)
+        if not properties:
+            return None
+        columns = []
+        for odata_property in properties:
+            columns.append({
+                "name": odata_property.get("name"),
+                "type": get_dss_type(odata_property)
+            })
+        return {"columns": columns}
+
+
+def get_dss_type(odata_property):
+    edm_type = odata_property.get("type")
+    if edm_type == "Edm.Decimal" and not fits_in_double(odata_property):
+        return "string"
+    return EDM_TYPES_TO_DSS.get(edm_type, "string")
+
+
+def fits_in_double(odata_property):
+    """
+    Edm.Decimal values are only read as doubles when the $metadata declares at most 15 digits,
+    amounts and quantities with more digits or an unknown precision are kept as they are sent, as strings
+    """
+    precision = odata_property.get("precision")
+    return precision is not None and precision <= MAX_DOUBLE_PRECISION
+
+
+def get_entity_set_name(entity):
+    """
+    Extracts the entity set name from the entity path entered by the user, e.g. Products(1)/Items?... -> Products
+    """
+    if not entity:
+        return entity
+    entity = entity.strip("/").split("?")[0]
+    return entity.split("/")[0].split("(")[0]
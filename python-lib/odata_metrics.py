@@ -0,0 +1,130 @@
+import io
+import json
+import logging
+import pstats
+import threading
+from time import perf_counter, time
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+class ExtractionMetrics(object):
+    """
+    Costs of an extraction, shared by all the threads of a client:
+    - per request: time to first byte, download time and bytes received
+    - per page: decode time and number of rows
+    - per run: row cleaning time and retries
+    """
+    PROFILE_LINES = 25
+
+    def __init__(self, progress_interval=0):
+        self.progress_interval = progress_interval  # seconds between two progress lines, 0 logs one per page
+        self.profiler = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.start_time = time()
+            self.last_progress_time = 0
+            self.requests = 0
+            self.retries = 0
+            self.bytes = 0
+            self.content_bytes = 0
+            self.ttfb = 0
+            self.max_ttfb = 0
+            self.download_time = 0
+            self.decode_time = 0
+            self.clean_time = 0
+            self.pages = 0
+            self.rows = 0
+            self.max_rows_per_page = 0
+
+    def record_request(self, ttfb, download_time, number_of_bytes, content_bytes=None):
+        """
+        number_of_bytes is the size received, content_bytes the size once decompressed, if different
+        """
+        with self.lock:
+            self.requests += 1
+            self.ttfb += ttfb
+            self.max_ttfb = max(self.max_ttfb, ttfb)
+            self.download_time += download_time
+            self.bytes += number_of_bytes
+            self.content_bytes += number_of_bytes if content_bytes is None else content_bytes
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def record_page(self, row_count, decode_time=0):
+        with self.lock:
+            self.pages += 1
+            self.decode_time += decode_time
+            self.max_rows_per_page = max(self.max_rows_per_page, row_count)
+
+    def set_profiler(self, profiler):
+        """
+        Attaches a profiler to the row cleaning hot path. Any object with cProfile's runcall works.
+        """
+        self.profiler = profiler
+
+    def get_timed_cleaner(self, clean_row):
+        """
+        Wraps the row cleaning method so that its time, and its profile when a profiler is attached, are recorded
+        """
+        profiler = self.profiler
+
+        def timed_clean_row(item):
+            start_time = perf_counter()
+            if profiler:
+                row = profiler.runcall(clean_row, item)
+            else:
+                row = clean_row(item)
+            # only the generator thread cleans rows, no lock needed
+            self.clean_time += perf_counter() - start_time
+            self.rows += 1
+            return row
+        return timed_clean_row
+
+    def get_summary(self):
+        with self.lock:
+            elapsed_time = time() - self.start_time
+            return {
+                "rows": self.rows,
+                "pages": self.pages,
+                "requests": self.requests,
+                "retries": self.retries,
+                "bytes": self.bytes,
+                "content_bytes": self.content_bytes,
+                "elapsed_time": round(elapsed_time, 3),
+                "rows_per_second": round(self.rows / elapsed_time, 1) if elapsed_time else None,
+                "average_ttfb": round(self.ttfb / self.requests, 3) if self.requests else None,
+                "max_ttfb": round(self.max_ttfb, 3),
+                "download_time": round(self.download_time, 3),
+                "decode_time": round(self.decode_time, 3),
+                "clean_time": round(self.clean_time, 3),
+                "average_rows_per_page": round(float(self.rows) / self.pages, 1) if self.pages else None,
+                "max_rows_per_page": self.max_rows_per_page
+            }
+
+    def log_progress(self, row_count, total_count=None):
+        now = time()
+        if now - self.last_progress_time < self.progress_interval:
+            return
+        self.last_progress_time = now
+        elapsed_time = max(now - self.start_time, 0.001)
+        rate = "{:.0f} rows/s, {:.1f}MB received".format(row_count / elapsed_time, self.bytes / 1024.0 / 1024.0)
+        if total_count:
+            logger.info("Progress: {} / {} rows ({:.1f}%), {}".format(row_count, total_count, 100.0 * row_count / total_count, rate))
+        else:
+            logger.info("Progress: {} rows, {}".format(row_count, rate))
+
+    def log_summary(self):
+        logger.info("Extraction summary: {}".format(json.dumps(self.get_summary(), sort_keys=True)))
+        if self.profiler and hasattr(self.profiler, "create_stats"):
+            output = io.StringIO()
+            pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(self.PROFILE_LINES)
+            logger.info("Row cleaning profile:\n{}".format(output.getvalue()))
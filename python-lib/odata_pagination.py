@@ -0,0 +1,468 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
+from dataikuapi.utils import DataikuException
+from odata_stream import ODataPageStream
+from odata_filters import build_keyset_filter, combine_filters, interpolate_boundaries
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+def get_page(client, stream_pages=False, **kwargs):
+    """
+    Returns the items of a page and its next link. When the page is streamed,
+    its length and next link are only known once the items have been consumed.
+    """
+    if stream_pages:
+        return client.stream_entity_collections(**kwargs), None
+    return client.get_entity_collections(**kwargs)
+
+
+def get_page_length(items):
+    if isinstance(items, ODataPageStream):
+        return items.row_count
+    return len(items)
+
+
+def get_page_next_link(items, next_page_url):
+    if isinstance(items, ODataPageStream):
+        return items.next_page_url
+    return next_page_url
+
+
+class ClientSidePager(object):
+    """
+    Sequential $skip / $top pagination, one page at a time.
+    If the server sends back a next link, it takes precedence over $skip.
+    With a tuner, the size of each page is set by the tuner.
+    Once the rows of a page have been consumed, on_page_done is called with the position
+    of the next page, from which the pagination can be started again with start_position.
+    """
+    supports_checkpoints = True
+
+    def __init__(self, client, entity, bulk_size=None, query=None, stream_pages=False, tuner=None, start_position=None, on_page_done=None):
+        self.client = client
+        self.entity = entity
+        self.bulk_size = bulk_size
+        self.query = query or {}  # filter, select... forwarded to the client
+        self.stream_pages = stream_pages
+        self.tuner = tuner
+        self.start_position = start_position or {}
+        self.on_page_done = on_page_done
+
+    def iterate_pages(self):
+        skip = self.start_position.get("skip")
+        items, next_page_url = get_page(
+            self.client, stream_pages=self.stream_pages,
+            entity=self.entity,
+            top=self.get_top(), skip=skip,
+            page_url=self.start_position.get("next_page_url"),
+            **self.query
+        )
+        for page in self.iterate_following_pages(items, next_page_url, skip=skip):
+            yield page
+
+    def iterate_following_pages(self, items, next_page_url, skip=None):
+        while items:
+            self.tune(items)
+            yield items
+            if skip is None:
+                skip = 0
+            skip = skip + get_page_length(items)
+            next_page_url = get_page_next_link(items, next_page_url)
+            if self.on_page_done:
+                self.on_page_done({"skip": skip, "next_page_url": next_page_url})
+            items, next_page_url = get_page(
+                self.client, stream_pages=self.stream_pages,
+                entity=self.entity, top=self.get_top(), skip=skip,
+                page_url=next_page_url, can_raise=False, **self.query
+            )
+
+    def get_top(self):
+        if self.tuner:
+            return self.tuner.bulk_size
+        return self.bulk_size
+
+    def tune(self, items):
+        # streamed pages are not measured, their cost is only known once they are consumed
+        if self.tuner and not isinstance(items, ODataPageStream):
+            self.tuner.observe(len(items), self.client.last_page_statistics)
+
+
+class PageWindows(object):
+    """
+    The $skip / $top windows of bulk_size rows following the first page, for the pagers requesting several windows at once.
+    """
+    def __init__(self, bulk_size, total_count=None, records_limit=None, pagination_name="parallel page requests"):
+        self.bulk_size = bulk_size
+        self.total_count = total_count  # when known, windows past the last row are requested one at a time
+        self.records_limit = records_limit  # previews and samples, no window is requested past it
+        self.pagination_name = pagination_name
+        self.next_skip = bulk_size
+
+    def is_paged_by_server(self, items, next_page_url):
+        """
+        Either the server enforces its own page size, in which case fixed windows would skip rows,
+        or the first page is the last one. In both cases the next pages are fetched sequentially.
+        """
+        if next_page_url:
+            logger.info("Server side paging detected, switching to sequential pagination")
+            return True
+        return len(items) < self.bulk_size
+
+    def has_next(self, pending_windows=0):
+        """
+        The count only tells how many windows can be requested ahead: rows may have been added since it was taken,
+        or it may come from the cache. Past the counted rows, windows are requested one at a time until one is short.
+        """
+        if self.records_limit is not None and 0 < self.records_limit <= self.next_skip:
+            return False
+        if self.total_count is None or self.next_skip < self.total_count:
+            return True
+        return pending_windows == 0
+
+    def pop_next(self):
+        skip = self.next_skip
+        self.next_skip += self.bulk_size
+        return skip
+
+    def is_last_page(self, skip, items):
+        if self.total_count is not None and skip + len(items) > self.total_count:
+            logger.warning("More than the {} rows counted, the count is ignored".format(self.total_count))
+            self.total_count = None
+        return len(items) < self.bulk_size
+
+    def assert_no_rows_after_last_page(self, following_pages):
+        for items in following_pages:
+            if items:
+                raise DataikuException(
+                    "The server returned less than {} rows for a page that is not the last one. "
+                    "Reduce the bulk size or disable {}".format(self.bulk_size, self.pagination_name)
+                )
+
+
+class ParallelClientSidePager(ClientSidePager):
+    """
+    $skip / $top pagination where the next `parallel_pages` windows are requested concurrently.
+    Pages are yielded in their original order, and at most `parallel_pages` pages are buffered.
+    """
+    supports_checkpoints = False
+
+    def __init__(self, client, entity, bulk_size=None, query=None, parallel_pages=1, total_count=None, records_limit=None):
+        super(ParallelClientSidePager, self).__init__(client, entity, bulk_size=bulk_size, query=query)
+        self.parallel_pages = parallel_pages
+        self.windows = PageWindows(bulk_size, total_count=total_count, records_limit=records_limit)
+
+    def iterate_pages(self):
+        items, next_page_url = self.client.get_entity_collections(
+            entity=self.entity,
+            top=self.bulk_size,
+            **self.query
+        )
+        if not items:
+            return
+        if self.windows.is_paged_by_server(items, next_page_url):
+            for page in self.iterate_following_pages(items, next_page_url, skip=None):
+                yield page
+            return
+        yield items
+
+        executor = ThreadPoolExecutor(max_workers=self.parallel_pages)
+        pending_windows = deque()
+        stop = threading.Event()  # set once the remaining windows are no longer needed, also the ones being requested
+        try:
+            while True:
+                while len(pending_windows) < self.parallel_pages and self.windows.has_next(len(pending_windows)):
+                    skip = self.windows.pop_next()
+                    pending_windows.append((skip, executor.submit(self.get_window, skip, stop)))
+                if not pending_windows:
+                    return
+                skip, window = pending_windows.popleft()
+                items = window.result()
+                if items:
+                    yield items
+                if self.windows.is_last_page(skip, items):
+                    following_pages = [pending_windows[0][1].result()] if pending_windows else []
+                    self.windows.assert_no_rows_after_last_page(following_pages)
+                    return
+        finally:
+            stop.set()
+            for _, window in pending_windows:
+                window.cancel()
+            executor.shutdown(wait=False)
+
+    def get_window(self, skip, stop):
+        if stop.is_set():
+            return []
+        items, _ = self.client.get_entity_collections(
+            entity=self.entity, top=self.bulk_size, skip=skip,
+            can_raise=False, stop=stop, **self.query
+        )
+        return items
+
+
+class BatchClientSidePager(ClientSidePager):
+    """
+    $skip / $top pagination where the next `pages_per_batch` windows are requested
+    in one $batch round trip.
+    """
+    supports_checkpoints = False
+
+    def __init__(self, client, entity, bulk_size=None, query=None, pages_per_batch=1, total_count=None, records_limit=None):
+        super(BatchClientSidePager, self).__init__(client, entity, bulk_size=bulk_size, query=query)
+        self.pages_per_batch = pages_per_batch
+        self.windows = PageWindows(bulk_size, total_count=total_count, records_limit=records_limit, pagination_name="$batch requests")
+
+    def iterate_pages(self):
+        items, next_page_url = self.client.get_entity_collections(
+            entity=self.entity,
+            top=self.bulk_size,
+            **self.query
+        )
+        if not items:
+            return
+        if self.windows.is_paged_by_server(items, next_page_url):
+            for page in self.iterate_following_pages(items, next_page_url, skip=None):
+                yield page
+            return
+        yield items
+
+        while True:
+            batch_windows = []
+            while len(batch_windows) < self.pages_per_batch and self.windows.has_next(len(batch_windows)):
+                batch_windows.append((self.windows.pop_next(), self.bulk_size))
+            if not batch_windows:
+                return
+            pages = self.client.get_entity_collections_batch(
+                batch_windows, entity=self.entity, can_raise=False, **self.query
+            )
+            for index, (items, _) in enumerate(pages):
+                if items:
+                    yield items
+                if self.windows.is_last_page(batch_windows[index][0], items):
+                    self.windows.assert_no_rows_after_last_page([following_items for following_items, _ in pages[index + 1:]])
+                    return
+
+
+class KeysetPager(object):
+    """
+    Seek pagination: pages are ordered on the entity keys, and the next page is selected
+    with a $filter on the keys being greater than the last key seen, instead of a growing $skip.
+    keys is a list of (property name, EDM type)
+    """
+    def __init__(self, client, entity, keys, bulk_size, query=None, tuner=None):
+        self.client = client
+        self.entity = entity
+        self.keys = keys
+        self.bulk_size = bulk_size
+        self.tuner = tuner
+        self.query = dict(query or {})
+        self.user_filter = self.query.pop("filter", None)
+        key_names = [key_name for key_name, _ in keys]
+        if self.query.get("select"):
+            self.query["select"] = self.query["select"] + [key_name for key_name in key_names if key_name not in self.query["select"]]
+        self.query["orderby"] = key_names
+
+    def iterate_pages(self):
+        last_key_values = None
+        while True:
+            keyset_filter = None
+            if last_key_values is not None:
+                keyset_filter = build_keyset_filter(self.keys, last_key_values, self.client.odata_version)
+            top = self.tuner.bulk_size if self.tuner else self.bulk_size
+            items, next_page_url = self.client.get_entity_collections(
+                entity=self.entity, top=top,
+                filter=combine_filters(self.user_filter, keyset_filter),
+                can_raise=last_key_values is None, **self.query
+            )
+            if not items:
+                return
+            if self.tuner:
+                self.tuner.observe(len(items), self.client.last_page_statistics)
+            # read before yielding, the rows are modified in place once cleaned
+            last_key_values = [items[-1].get(key_name) for key_name, _ in self.keys]
+            yield items
+            if len(items) < top and not next_page_url:
+                return
+
+
+class ServerSidePager(object):
+    """
+    Pagination driven by the __next / @odata.nextLink links sent back by the server.
+    Once the rows of a page have been consumed, on_page_done is called with the position
+    of the next page, from which the pagination can be started again with start_position.
+    """
+    supports_checkpoints = True
+
+    def __init__(self, client, entity, query=None, stream_pages=False, first_page_url=None, start_position=None, on_page_done=None):
+        self.client = client
+        self.entity = entity
+        self.query = query or {}  # filter, select... forwarded to the client
+        self.stream_pages = stream_pages
+        self.first_page_url = first_page_url
+        self.start_position = start_position or {}
+        self.on_page_done = on_page_done
+
+    def iterate_pages(self):
+        if self.start_position and not self.start_position.get("next_page_url"):
+            return  # the extraction already went through the last page
+        items, next_page_url = get_page(
+            self.client, stream_pages=self.stream_pages,
+            entity=self.entity, page_url=self.start_position.get("next_page_url", self.first_page_url),
+            **self.query
+        )
+        while items:
+            yield items
+            next_page_url = get_page_next_link(items, next_page_url)
+            if self.on_page_done:
+                self.on_page_done({"next_page_url": next_page_url})
+            if not next_page_url:
+                return
+            items, next_page_url = get_page(
+                self.client, stream_pages=self.stream_pages,
+                entity=self.entity, page_url=next_page_url,
+                can_raise=False, **self.query
+            )
+
+
+QUEUE_TIMEOUT = 1
+
+
+def put_page(pages, stop, page):
+    """
+    Puts a page in a bounded queue, unless the reader has stopped.
+    """
+    while not stop.is_set():
+        try:
+            pages.put(page, timeout=QUEUE_TIMEOUT)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def drain_pages(pages):
+    try:
+        while True:
+            pages.get_nowait()
+    except Empty:
+        pass
+
+
+class PrefetchingServerSidePager(ServerSidePager):
+    """
+    Server side pagination where a background worker follows the next links
+    while the current page is being processed. At most `prefetch_pages` pages
+    are held in the queue.
+    """
+    supports_checkpoints = False
+
+    def __init__(self, client, entity, query=None, prefetch_pages=1):
+        super(PrefetchingServerSidePager, self).__init__(client, entity, query=query)
+        self.prefetch_pages = prefetch_pages
+
+    def iterate_pages(self):
+        pages = Queue(maxsize=self.prefetch_pages)
+        stop = threading.Event()
+        worker = threading.Thread(target=self.fetch_pages, args=(pages, stop))
+        worker.daemon = True
+        worker.start()
+        try:
+            while True:
+                items, error = pages.get()
+                if error:
+                    raise error
+                if items is None:
+                    return
+                yield items
+        finally:
+            stop.set()
+            drain_pages(pages)
+
+    def fetch_pages(self, pages, stop):
+        try:
+            for items in super(PrefetchingServerSidePager, self).iterate_pages():
+                if not put_page(pages, stop, (items, None)):
+                    return
+            put_page(pages, stop, (None, None))
+        except Exception as error:
+            put_page(pages, stop, (None, error))
+
+
+class ShardedPager(object):
+    """
+    Runs several pagers, each one on its own disjoint $filter range, at the same time
+    and merges their pages. Pages come in the order they arrive, and at most
+    `buffered_pages` pages are held in the queue.
+    """
+    def __init__(self, pagers, buffered_pages=None):
+        self.pagers = pagers
+        self.buffered_pages = buffered_pages or len(pagers)
+
+    def iterate_pages(self):
+        pages = Queue(maxsize=self.buffered_pages)
+        stop = threading.Event()
+        for pager in self.pagers:
+            worker = threading.Thread(target=self.fetch_pages, args=(pager, pages, stop))
+            worker.daemon = True
+            worker.start()
+        running_shards = len(self.pagers)
+        try:
+            while running_shards:
+                items, error = pages.get()
+                if error:
+                    raise error
+                if items is None:
+                    running_shards -= 1
+                    continue
+                yield items
+        finally:
+            stop.set()
+            drain_pages(pages)
+
+    def fetch_pages(self, pager, pages, stop):
+        try:
+            for items in pager.iterate_pages():
+                if not put_page(pages, stop, (items, None)):
+                    return
+            put_page(pages, stop, (None, None))
+        except Exception as error:
+            put_page(pages, stop, (None, error))
+
+
+def get_property_extremes(client, entity, property_name, filter=None):
+    """
+    Returns the smallest and largest non null values of a property, found with $orderby / $top,
+    or None if no row matches.
+    """
+    extremes = []
+    for direction in ["asc", "desc"]:
+        items, _ = client.get_entity_collections(
+            entity=entity, top=1,
+            filter=combine_filters(filter, "{} ne null".format(property_name)),
+            select=[property_name],
+            orderby=["{} {}".format(property_name, direction)]
+        )
+        if not items:
+            return None
+        extremes.append(items[0].get(property_name))
+    logger.info("Values of {} range from {} to {}".format(property_name, extremes[0], extremes[1]))
+    return extremes
+
+
+def sample_shard_boundaries(client, entity, property_name, number_of_shards, edm_type=None, filter=None):
+    """
+    Splits evenly the interval between the smallest and largest values of the property.
+    """
+    extremes = get_property_extremes(client, entity, property_name, filter=filter)
+    if not extremes:
+        return []
+    boundaries = interpolate_boundaries(extremes[0], extremes[1], number_of_shards, edm_type)
+    if boundaries is None:
+        raise DataikuException("Shard boundaries can't be computed for {}, please enter them manually".format(property_name))
+    return boundaries
@@ -0,0 +1,86 @@
+import datetime
+from dataikuapi.utils import DataikuException
+from odata_constants import ODataConstants
+from odata_filters import build_range_filter, format_literal, to_datetime
+
+
+PARTITION_ID_FORMATS = {
+    "YEAR": "%Y",
+    "MONTH": "%Y-%m",
+    "DAY": "%Y-%m-%d",
+    "HOUR": "%Y-%m-%d-%H"
+}
+
+
+class ODataPartitioning(object):
+    """
+    Maps a DSS partitioning dimension on an OData property:
+    - time partitioning: each partition is a [start, end[ range of the date property
+    - discrete partitioning: each partition is one value of the property
+    """
+    def __init__(self, config, odata_version=ODataConstants.ODATA_V2, edm_type=None):
+        self.partitioning_type = config.get("partitioning_type", "none") or "none"
+        self.property_name = (config.get("partitioning_property") or "").strip()
+        self.period = config.get("partitioning_period", "DAY") or "DAY"
+        self.values = [value.strip() for value in config.get("partitioning_values", []) or [] if value and value.strip()]
+        self.start = (config.get("partitioning_start") or "").strip()
+        self.odata_version = odata_version
+        if edm_type is None and self.partitioning_type == "time":
+            edm_type = "Edm.DateTimeOffset" if odata_version == ODataConstants.ODATA_V4 else "Edm.DateTime"
+        self.edm_type = edm_type
+        if self.is_partitioned() and not self.property_name:
+            raise DataikuException("Select the property used for partitioning")
+
+    def is_partitioned(self):
+        return self.partitioning_type in ["time", "discrete"]
+
+    def get_dss_partitioning(self):
+        if self.partitioning_type == "time":
+            dimension = {"name": self.property_name, "type": "time", "params": {"period": self.period}}
+        elif self.partitioning_type == "discrete":
+            dimension = {"name": self.property_name, "type": "value"}
+        else:
+            return None
+        return {"dimensions": [dimension]}
+
+    def get_partition_filter(self, partition_id):
+        if not self.is_partitioned() or not partition_id:
+            return None
+        if self.partitioning_type == "time":
+            start, end = self.get_time_range(partition_id)
+            return build_range_filter(self.property_name, lower=start, upper=end, edm_type=self.edm_type, odata_version=self.odata_version)
+        return "{} eq {}".format(self.property_name, format_literal(partition_id, self.edm_type, self.odata_version))
+
+    def get_time_range(self, partition_id):
+        try:
+            start = datetime.datetime.strptime(partition_id, PARTITION_ID_FORMATS[self.period])
+        except (KeyError, ValueError):
+            raise DataikuException("Partition {} does not match the {} period".format(partition_id, self.period))
+        return start, self.get_next_period_start(start)
+
+    def get_next_period_start(self, start):
+        if self.period == "YEAR":
+            return start.replace(year=start.year + 1)
+        if self.period == "MONTH":
+            if start.month == 12:
+                return start.replace(year=start.year + 1, month=1)
+            return start.replace(month=start.month + 1)
+        if self.period == "DAY":
+            return start + datetime.timedelta(days=1)
+        return start + datetime.timedelta(hours=1)
+
+    def list_time_partitions(self, first_value, last_value=None):
+        """
+        Lists the ids of the time partitions going from first_value to last_value (or now)
+        """
+        start = to_datetime(first_value)
+        if start is None:
+            return []
+        end = to_datetime(last_value) if last_value else datetime.datetime.utcnow()
+        partition_id_format = PARTITION_ID_FORMATS[self.period]
+        start, _ = self.get_time_range(start.strftime(partition_id_format))
+        partition_ids = []
+        while start <= end:
+            partition_ids.append(start.strftime(partition_id_format))
+            start = self.get_next_period_start(start)
+        return partition_ids
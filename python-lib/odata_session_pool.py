@@ -0,0 +1,90 @@
+import logging
+import threading
+from collections import OrderedDict
+from time import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+class PooledSession(object):
+    """
+    A requests session kept between clients, with the state of the SAP handshake and the CSRF token.
+    SAP Gateway sessions time out, so both expire after state_ttl seconds.
+    """
+    def __init__(self, session, state_ttl):
+        self.session = session
+        self.state_ttl = state_ttl
+        self.handshake_time = None
+        self.csrf_token = None
+        self.csrf_token_time = None
+        self.lock = threading.Lock()
+
+    def needs_handshake(self):
+        return self.handshake_time is None or time() - self.handshake_time > self.state_ttl
+
+    def set_handshake_done(self):
+        self.handshake_time = time()
+
+    def get_csrf_token(self):
+        if self.csrf_token_time is None or time() - self.csrf_token_time > self.state_ttl:
+            return None
+        return self.csrf_token
+
+    def set_csrf_token(self, csrf_token):
+        self.csrf_token = csrf_token
+        self.csrf_token_time = time()
+
+    def clear_csrf_token(self):
+        self.csrf_token = None
+        self.csrf_token_time = None
+
+
+class SessionPool(object):
+    """
+    Sessions shared by all the clients of the process, so that their connections (TCP, TLS),
+    cookies and CSRF tokens are reused. The least recently used session is closed past max_sessions.
+    """
+    def __init__(self, max_sessions=16, pool_maxsize=32, state_ttl=20 * 60):
+        self.max_sessions = max_sessions
+        self.pool_maxsize = pool_maxsize
+        self.state_ttl = state_ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, auth=None, verify=True):
+        with self.lock:
+            pooled_session = self.sessions.get(key)
+            if pooled_session is not None:
+                self.sessions.move_to_end(key)
+                return pooled_session
+            pooled_session = PooledSession(self.create_session(auth, verify), self.state_ttl)
+            self.sessions[key] = pooled_session
+            while len(self.sessions) > self.max_sessions:
+                _, evicted_session = self.sessions.popitem(last=False)
+                evicted_session.session.close()
+            return pooled_session
+
+    def create_session(self, auth=None, verify=True):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if auth:
+            session.auth = auth
+        if verify is False:
+            session.verify = False
+        return session
+
+    def clear(self):
+        with self.lock:
+            for pooled_session in self.sessions.values():
+                pooled_session.session.close()
+            self.sessions.clear()
+
+
+session_pool = SessionPool()
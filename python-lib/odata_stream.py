@@ -0,0 +1,183 @@
+import codecs
+import json
+from odata_constants import ODataConstants
+
+
+WHITESPACES = " \t\n\r"
+END_OF_PAGE = object()
+
+
+class ODataPageStream(object):
+    """
+    Decodes an OData page from an iterator of bytes chunks, one row at a time,
+    so that the memory used does not depend on the page size.
+    Rows are taken from d.results, d or value. The next page link, the row count
+    and the error body are available as side results, once the rows are consumed.
+    """
+
+    def __init__(self, chunks, on_close=None):
+        self.chunks = iter(chunks)
+        self.on_close = on_close
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.is_exhausted = False
+        self.next_page_url = None
+        self.delta_link = None
+        self.count = None
+        self.error = None
+        self.row_count = 0
+        self.rows = None
+        self.first_row = END_OF_PAGE
+
+    def open(self):
+        """
+        Parses the page up to its first row, so that an error body is detected before any row is returned.
+        """
+        self.rows = self.iterate_document()
+        self.first_row = next(self.rows, END_OF_PAGE)
+        if self.first_row is END_OF_PAGE:
+            self.close()
+        return self
+
+    def __bool__(self):
+        return self.first_row is not END_OF_PAGE
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        if self.rows is None:
+            self.open()
+        if self.first_row is END_OF_PAGE:
+            return
+        first_row, self.first_row = self.first_row, END_OF_PAGE
+        self.row_count += 1
+        yield first_row
+        for row in self.rows:
+            self.row_count += 1
+            yield row
+        self.close()
+
+    def close(self):
+        if self.on_close:
+            self.on_close()
+            self.on_close = None
+
+    def iterate_document(self):
+        if not self.buffer and not self.read_chunk():
+            return  # empty body
+        self.expect("{")
+        for key in self.iterate_object_keys():
+            if key == ODataConstants.DATA_CONTAINER_V2:
+                for row in self.iterate_v2_container():
+                    yield row
+            elif key == ODataConstants.DATA_CONTAINER_V4:
+                for row in self.iterate_array():
+                    yield row
+            elif key == ODataConstants.NEXT_LINK:
+                self.next_page_url = self.read_value()
+            elif key == ODataConstants.COUNT_V4:
+                self.count = self.read_value()
+            elif key == ODataConstants.DELTA_LINK_V4:
+                self.delta_link = self.read_value()
+            elif key == "error":
+                self.error = self.read_value()
+            else:
+                self.read_value()
+
+    def iterate_v2_container(self):
+        if self.peek() == "[":
+            for row in self.iterate_array():
+                yield row
+            return
+        self.expect("{")
+        single_entity = {}
+        has_results = False
+        for key in self.iterate_object_keys():
+            if key == ODataConstants.DATA_RESULTS:
+                has_results = True
+                for row in self.iterate_array():
+                    yield row
+            elif key == ODataConstants.NEXT_LINK_SAP:
+                self.next_page_url = self.read_value()
+            elif key == ODataConstants.COUNT_V2:
+                self.count = self.read_value()
+            elif key == ODataConstants.DELTA_LINK_SAP:
+                self.delta_link = self.read_value()
+            else:
+                single_entity[key] = self.read_value()
+        if not has_results and single_entity:
+            yield single_entity
+
+    def iterate_object_keys(self):
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.position += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("Malformed OData page: unexpected '{}'".format(separator))
+
+    def iterate_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            separator = self.peek()
+            self.position += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError("Malformed OData page: unexpected '{}'".format(separator))
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                if self.read_chunk():
+                    continue
+                raise
+            if end == len(self.buffer) and self.read_chunk():
+                # a number could be cut in the middle
+                continue
+            self.position = end
+            return value
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError("Malformed OData page: expected '{}'".format(character))
+        self.position += 1
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACES:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_chunk():
+                raise ValueError("Malformed OData page: unexpected end of page")
+
+    def read_chunk(self):
+        while not self.is_exhausted:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.is_exhausted = True
+                text = self.text_decoder.decode(b"", final=True)
+            else:
+                text = self.text_decoder.decode(chunk)
+            if text:
+                self.buffer = self.buffer[self.position:] + text
+                self.position = 0
+                return True
+        return False
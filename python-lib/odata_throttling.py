@@ -0,0 +1,158 @@
+import datetime
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qs, urlparse
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+THROTTLING_STATUS_CODES = [429, 502, 503, 504]
+UNPROCESSED_STATUS_CODES = [429, 503]  # the request was refused before being processed
+
+
+def parse_retry_after(value):
+    """
+    Returns the number of seconds to wait given by a Retry-After header (seconds or HTTP date), or None.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_date is None:
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=datetime.timezone.utc)
+    return max(0, (retry_date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+def get_request_kind(method, url):
+    """
+    Groups the requests expected to take about as long to answer: same method, resource and page size,
+    so that a $count or a $metadata request does not set the latency expected from large pages.
+    """
+    parsed_url = urlparse(url or "")
+    top = parse_qs(parsed_url.query).get("$top", [None])[0]
+    return "{} {} {}".format(method, parsed_url.path, top)
+
+
+class Backoff(object):
+    """
+    Exponential backoff with full jitter: the nth retry waits a random time between 0 and base_delay * 2^n,
+    capped at max_delay. A delay requested by the server is honoured as a minimum.
+    """
+    def __init__(self, base_delay=1, max_delay=60):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay * 5))
+        return delay
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """
+    Caps the number of requests in flight across threads, AIMD style:
+    - the limit is halved, at most once per cool down period, when the server throttles (429, 503...)
+    - it grows back by one after a full limit worth of successful requests, as long as the latency is not much
+      worse than the best one observed for the same kind of request
+    The latency is the time to the first byte of the answer, so that the download of large pages is not taken
+    as a sign of overload. It only holds the limit back: larger pages and more requests in flight take longer
+    to answer without the gateway being overloaded.
+    """
+    LATENCY_TOLERANCE = 4
+    MIN_SLOW_LATENCY = 1  # seconds, faster answers never hold the limit back
+    LATENCY_SMOOTHING = 0.2
+    COOL_DOWN = 2
+
+    def __init__(self, max_concurrency=32):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.successes = 0
+        self.latencies = {}  # kind of request -> [best latency, average latency]
+        self.last_decrease = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def try_acquire(self):
+        """
+        Takes a slot if one is free, without waiting, for the callers that can't block such as event loops
+        """
+        with self.condition:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def on_success(self, latency, kind=None):
+        with self.condition:
+            best_latency, average_latency = self.update_latency(latency, kind)
+            if average_latency > max(self.LATENCY_TOLERANCE * best_latency, self.MIN_SLOW_LATENCY):
+                self.successes = 0
+                return
+            if self.in_flight + 1 < self.limit or self.limit >= self.max_concurrency:
+                # the limit is not what holds the requests back
+                return
+            self.successes += 1
+            if self.successes >= self.limit:
+                self.successes = 0
+                self.limit += 1
+                self.condition.notify()
+
+    def on_throttled(self, reason):
+        with self.condition:
+            self.decrease(reason)
+
+    def update_latency(self, latency, kind=None):
+        latencies = self.latencies.get(kind)
+        if latencies is None:
+            latencies = self.latencies[kind] = [max(latency, 0.001), latency]
+        else:
+            latencies[0] = min(latencies[0], max(latency, 0.001))
+            latencies[1] += self.LATENCY_SMOOTHING * (latency - latencies[1])
+        return latencies
+
+    def decrease(self, reason):
+        now = time.time()
+        if now - self.last_decrease < self.COOL_DOWN:
+            return
+        self.last_decrease = now
+        self.successes = 0
+        effective_limit = min(self.limit, self.in_flight + 1)
+        self.limit = max(1, effective_limit // 2)
+        for latencies in self.latencies.values():
+            # start measuring again from the best latency, so that one slow period does not keep the limit down
+            latencies[1] = latencies[0]
+        logger.warning("Server overloaded ({}), now sending at most {} requests at a time".format(reason, self.limit))
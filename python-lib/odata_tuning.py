@@ -0,0 +1,54 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+class BulkSizeTuner(object):
+    """
+    Picks the $top of the next pages from what the first pages cost. A page is modeled as
+    time to first byte + rows * transfer time per row, and the bulk size is moved toward the number of
+    rows that fills target_duration without going over max_page_bytes, by a factor of at most max_step per page.
+    Once tuning_pages pages have been observed, the bulk size stays the same.
+    """
+    def __init__(self, bulk_size, target_duration=5, max_page_bytes=64 * 1024 * 1024,
+                 min_bulk_size=100, max_bulk_size=100000, tuning_pages=5, max_step=4):
+        self.bulk_size = bulk_size or min_bulk_size
+        self.target_duration = target_duration
+        self.max_page_bytes = max_page_bytes
+        self.min_bulk_size = min_bulk_size
+        self.max_bulk_size = max_bulk_size
+        self.tuning_pages = tuning_pages
+        self.max_step = max_step
+        self.observed_pages = 0
+
+    def is_tuning(self):
+        return self.observed_pages < self.tuning_pages
+
+    def observe(self, row_count, statistics):
+        """
+        statistics is a dict with the page's time to first byte, total duration (seconds) and size (bytes)
+        """
+        if not self.is_tuning() or not row_count or not statistics:
+            return self.bulk_size
+        self.observed_pages += 1
+        ttfb = statistics.get("ttfb", 0)
+        duration = max(statistics.get("duration", 0), ttfb)
+        bytes_per_row = float(statistics.get("bytes", 0)) / row_count
+        seconds_per_row = (duration - ttfb) / row_count
+        candidates = [self.bulk_size * self.max_step, self.max_bulk_size]
+        if seconds_per_row > 0:
+            candidates.append((self.target_duration - ttfb) / seconds_per_row)
+        if bytes_per_row > 0:
+            candidates.append(self.max_page_bytes / bytes_per_row)
+        bulk_size = int(min(candidates))
+        bulk_size = max(bulk_size, self.bulk_size // self.max_step, self.min_bulk_size)
+        logger.info("Page of {} rows: {:.2f}s to first byte, {:.2f}s in total, {:.0f} bytes per row. Bulk size {} -> {}".format(
+            row_count, ttfb, duration, bytes_per_row, self.bulk_size, bulk_size
+        ))
+        self.bulk_size = bulk_size
+        if not self.is_tuning():
+            logger.info("Bulk size set to {}".format(self.bulk_size))
+        return self.bulk_size
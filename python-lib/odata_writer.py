@@ -0,0 +1,122 @@
+import datetime
+import logging
+import time
+from dataiku.connector import CustomDatasetWriter
+from dataikuapi.utils import DataikuException
+from odata_constants import ODataConstants
+from odata_filters import to_datetime
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO,
+                    format='sap-odata plugin %(levelname)s - %(message)s')
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+V2_STRING_TYPES = ["Edm.Decimal", "Edm.Int64"]  # serialized as JSON strings in OData v2
+
+
+def to_odata_value(value, edm_type=None, odata_version=ODataConstants.ODATA_V2):
+    """
+    Converts a DSS value into its OData JSON representation.
+    """
+    if value is None or edm_type is None:
+        return value
+    is_v4 = odata_version == ODataConstants.ODATA_V4
+    if edm_type in ["Edm.DateTime", "Edm.DateTimeOffset"]:
+        date = to_datetime(value)
+        if date is None:
+            return value
+        if is_v4:
+            return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return "/Date({})/".format(int((date - EPOCH).total_seconds() * 1000))
+    if edm_type in V2_STRING_TYPES and not is_v4:
+        return "{}".format(value)
+    return value
+
+
+class ODataWriter(CustomDatasetWriter):
+    """
+    Buffers the rows and creates them in the entity set with one $batch changeset every changeset_size rows.
+    A failed changeset is reported and the following ones are still sent.
+    """
+    def __init__(self, client, entity, dataset_schema, changeset_size=100, property_types=None):
+        CustomDatasetWriter.__init__(self)
+        self.client = client
+        self.entity = entity
+        self.columns = [column.get("name") for column in (dataset_schema or {}).get("columns", [])]
+        self.changeset_size = changeset_size
+        self.property_types = property_types or {}
+        self.buffer = []
+        self.written_rows = 0
+        self.failed_rows = 0
+        self.failed_changesets = 0
+        self.start_time = time.time()
+
+    def write_row(self, row):
+        self.buffer.append(self.get_payload(row))
+        if len(self.buffer) >= self.changeset_size:
+            self.flush()
+
+    def get_payload(self, row):
+        payload = {}
+        for column, value in zip(self.columns, row):
+            if value is None:
+                continue
+            payload[column] = to_odata_value(value, self.property_types.get(column), self.client.odata_version)
+        return payload
+
+    def flush(self):
+        if not self.buffer:
+            return
+        payloads, self.buffer = self.buffer, []
+        first_row = self.written_rows + self.failed_rows + 1
+        try:
+            error_message = get_changeset_error(self.client.post_changeset(self.entity, payloads), payloads)
+        except DataikuException as error:
+            # the whole $batch request failed (error status, connection lost...), the next changesets are still sent
+            error_message = "{}".format(error)
+        if error_message:
+            self.failed_changesets += 1
+            self.failed_rows += len(payloads)
+            logger.error("Rows {} to {} could not be written: {}".format(first_row, first_row + len(payloads) - 1, error_message))
+        else:
+            self.written_rows += len(payloads)
+        logger.info("{} rows written ({:.0f} rows/s)".format(self.written_rows, self.get_rows_per_second()))
+
+    def get_rows_per_second(self):
+        elapsed_time = time.time() - self.start_time
+        if elapsed_time <= 0:
+            return 0
+        return (self.written_rows + self.failed_rows) / elapsed_time
+
+    def close(self):
+        self.flush()
+        logger.info("{} rows written in {:.1f}s ({:.0f} rows/s)".format(
+            self.written_rows, time.time() - self.start_time, self.get_rows_per_second()
+        ))
+        if self.failed_changesets:
+            logger.error("{} rows in {} changesets could not be written".format(self.failed_rows, self.failed_changesets))
+
+
+def get_changeset_error(responses, payloads):
+    """
+    Returns the reason why a changeset failed, or None if all its rows were created
+    """
+    errors = [response for response in responses if response.status_code >= 400]
+    if errors:
+        return get_error_message(errors[0])
+    if len(responses) != len(payloads):
+        return "{} responses for {} rows".format(len(responses), len(payloads))
+    return None
+
+
+def get_error_message(response):
+    try:
+        error = response.json().get("error", {})
+        message = error.get("message", {})
+        if isinstance(message, dict):
+            message = message.get("value")
+        return "error {} {}".format(response.status_code, message or error)
+    except ValueError:
+        return "error {} {}".format(response.status_code, response.content[:500])
@@ -1,20 +1,42 @@
 from odata_client import ODataClient
-from odata_common import get_login, DSSSelectorChoices
+from odata_cache import DiskCache
+from odata_common import get_login, get_identity, get_odata_instance, DSSSelectorChoices
+
+
+ENTITY_SETS_CACHE_TTL = 24 * 3600
+ENTITY_SETS_CACHE_MAX_SIZE = 16 * 1024 * 1024
 
 
 def get_odata_list_selector(payload, config, plugin_config, inputs):
     choices = DSSSelectorChoices()
-    client = ODataClient(config)
-    items, _ = client.get_entity_collections(
-        entity=""
-    )
+    entity_sets = get_entity_sets(config)
     choices.append_manual_select()
-    for item in items:
-        entity_set = item.get("EntitySets")
+    for entity_set in entity_sets:
         choices.append("{}".format(entity_set), "{}".format(entity_set))
     return choices
 
 
+def get_entity_sets(config):
+    """
+    Lists the entity sets of the service. The list is cached on disk, per service and credentials,
+    and refreshed once when the user sets the refresh option.
+    """
+    cache = DiskCache("entity_sets", ENTITY_SETS_CACHE_TTL, max_size=ENTITY_SETS_CACHE_MAX_SIZE)
+    cache_key = "{} {}".format(get_identity(config), get_odata_instance(config))
+    entity_sets = None
+    if not cache.is_refresh_requested(cache_key, config.get("refresh_service_cache", False)):
+        entity_sets = cache.get(cache_key)
+    if entity_sets is None:
+        client = ODataClient(config)
+        items, _ = client.get_entity_collections(
+            entity=""
+        )
+        entity_sets = [item.get("EntitySets") for item in items]
+        if entity_sets:
+            cache.set(cache_key, entity_sets)
+    return entity_sets
+
+
 def get_odata_service_node_select(payload, config, plugin_config, inputs):
     choices = DSSSelectorChoices()
     service_names = get_service_names(config)
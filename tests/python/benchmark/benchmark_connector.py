@@ -0,0 +1,106 @@
+"""
+Runs SAPODataConnector.generate_rows against the local mock OData service and reports
+rows/s, requests, bytes received and peak RSS. The mock service runs in its own process,
+so that the peak RSS is the connector's.
+
+Requires the dataiku package (run it with the DSS python or the plugin code env).
+The mock service ignores $filter and $orderby and does not answer $batch requests, so the keyset,
+sharded and $batch paginations can't be measured with it.
+Usage: PYTHONPATH=python-lib:python-connectors/sap_odata python3 tests/python/benchmark/benchmark_connector.py \\
+    --version v2 --rows 100000 --width 50 --bulk-size 5000 --parallel-pages 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_odata_server import ENTITY_SET, MockODataServer, add_settings_arguments, get_settings  # noqa: E402
+
+
+def serve(settings, urls):
+    server = MockODataServer(settings)
+    urls.put(server.get_url())
+    server.serve_forever()
+
+
+def get_stats(url):
+    with urlopen(url + "/_stats") as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def build_config(url, arguments):
+    config = {
+        "auth_type": "login",
+        "sap-odata_login": {
+            "odata_instance": url,
+            "odata_version": arguments.version,
+            "sap_mode": arguments.sap_mode
+        },
+        "odata_list_selector": ENTITY_SET,
+        "bulk_size": arguments.bulk_size,
+        "should_convert_date": True,
+        "show_advanced_parameters": True,
+        "parallel_pages": arguments.parallel_pages,
+        "pages_per_batch": 1,
+        "stream_pages": arguments.stream_pages,
+        "typed_schema": arguments.typed_schema,
+        "auto_bulk_size": arguments.auto_bulk_size,
+        "metadata_cache_ttl": 0
+    }
+    config.update(json.loads(arguments.extra_config))
+    return config
+
+
+def is_served_by_mock(config):
+    return config.get("pagination_strategy", "default") == "default" and (config.get("pages_per_batch") or 1) <= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAP OData connector benchmark")
+    add_settings_arguments(parser)
+    parser.add_argument("--sap-mode", default="cds", choices=["cds", "odp"], help="cds: $skip / $top, odp: next links")
+    parser.add_argument("--bulk-size", type=int, default=1000)
+    parser.add_argument("--parallel-pages", type=int, default=1)
+    parser.add_argument("--stream-pages", action="store_true")
+    parser.add_argument("--typed-schema", action="store_true")
+    parser.add_argument("--auto-bulk-size", action="store_true")
+    parser.add_argument("--extra-config", default="{}", help="JSON merged into the connector config")
+    parser.add_argument("--records-limit", type=int, default=-1)
+    arguments = parser.parse_args()
+    if not is_served_by_mock(json.loads(arguments.extra_config)):
+        parser.error("the mock service can't serve the keyset, sharded and $batch paginations")
+
+    urls = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target=serve, args=(get_settings(arguments), urls))
+    server_process.daemon = True
+    server_process.start()
+    url = urls.get(timeout=10)
+    try:
+        from connector import SAPODataConnector
+        start = time.time()
+        connector = SAPODataConnector(build_config(url, arguments), {})
+        row_count = 0
+        for _ in connector.generate_rows(records_limit=arguments.records_limit):
+            row_count += 1
+        elapsed_time = time.time() - start
+        stats = get_stats(url)
+    finally:
+        server_process.terminate()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # kB on Linux
+    print(json.dumps({
+        "rows": row_count,
+        "seconds": round(elapsed_time, 3),
+        "rows_per_second": round(row_count / elapsed_time, 1) if elapsed_time else None,
+        "requests": stats.get("requests"),
+        "megabytes": round(stats.get("bytes", 0) / 1024.0 / 1024.0, 2),
+        "peak_rss_mb": round(peak_rss, 1)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compares the time spent cleaning rows with clean_json_and_date and CompiledRowCleaner, which replaces it
+when dates are converted, and with clean_json, still used when they are not.
+
+Usage: PYTHONPATH=python-lib python3 tests/python/benchmark/benchmark_row_cleaner.py [rows] [columns]
+"""
+import json
+import sys
+import time
+from odata_common import CompiledRowCleaner, clean_json, clean_json_and_date
+
+
+def build_row_template(number_of_columns):
+    row = {"__metadata": {"uri": "Entity('1')", "type": "Entity"}}
+    for column_index in range(number_of_columns):
+        kind = column_index % 10
+        name = "Column{}".format(column_index)
+        if kind == 0:
+            row[name] = "/Date(1700000000000)/"
+        elif kind == 1:
+            row[name] = {"__deferred": {"uri": "Entity('1')/{}".format(name)}}
+        elif kind == 2:
+            row[name] = column_index
+        elif kind == 3:
+            row[name] = None
+        else:
+            row[name] = "text value {}".format(column_index)
+    return json.dumps(row)
+
+
+def measure(clean_row, row_template, number_of_rows):
+    rows = [json.loads(row_template) for _ in range(number_of_rows)]
+    start = time.time()
+    for row in rows:
+        clean_row(row)
+    return time.time() - start
+
+
+def main():
+    number_of_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    number_of_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    row_template = build_row_template(number_of_columns)
+    print("{} rows x {} columns".format(number_of_rows, number_of_columns))
+    cleaners = [
+        ("clean_json_and_date", clean_json_and_date),
+        ("CompiledRowCleaner(dates)", CompiledRowCleaner(should_convert_date=True)),
+        ("clean_json", clean_json)
+    ]
+    for label, clean_row in cleaners:
+        duration = measure(clean_row, row_template, number_of_rows)
+        print("{:<30} {:.2f}s {:.0f} rows/s".format(label, duration, number_of_rows / duration))
+
+
+if __name__ == "__main__":
+    main()
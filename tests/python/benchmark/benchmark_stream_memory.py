@@ -0,0 +1,70 @@
+"""
+Compares the peak memory used to decode one OData page, either as a whole
+(as response.json() does) or streamed with ODataPageStream.
+
+Usage: PYTHONPATH=python-lib python3 tests/python/benchmark/benchmark_stream_memory.py [rows] [columns]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from odata_stream import ODataPageStream
+
+
+CHUNK_SIZE = 65536
+
+
+def build_page(number_of_rows, number_of_columns):
+    rows = []
+    for row_index in range(number_of_rows):
+        row = {"__metadata": {"uri": "Entity('{}')".format(row_index), "type": "Entity"}}
+        for column_index in range(number_of_columns):
+            row["Column{}".format(column_index)] = "value {} {}".format(row_index, column_index)
+        row["CreatedOn"] = "/Date(1700000000000)/"
+        rows.append(row)
+    page = {"d": {"results": rows, "__next": "Entity?$skiptoken=next"}}
+    return json.dumps(page).encode("utf-8")
+
+
+def iterate_chunks(body):
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+def decode_whole_page(body):
+    number_of_rows = 0
+    data = json.loads(body.decode("utf-8"))
+    for row in data["d"]["results"]:
+        number_of_rows += 1
+    return number_of_rows
+
+
+def decode_streamed_page(body):
+    number_of_rows = 0
+    for row in ODataPageStream(iterate_chunks(body)).open():
+        number_of_rows += 1
+    return number_of_rows
+
+
+def measure(method, body):
+    tracemalloc.start()
+    start = time.time()
+    number_of_rows = method(body)
+    duration = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return number_of_rows, duration, peak
+
+
+def main():
+    number_of_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    number_of_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    body = build_page(number_of_rows, number_of_columns)
+    print("Page of {} rows x {} columns, {:.1f} MB".format(number_of_rows, number_of_columns, len(body) / 1e6))
+    for label, method in [("response.json()", decode_whole_page), ("ODataPageStream", decode_streamed_page)]:
+        rows, duration, peak = measure(method, body)
+        print("{:<16} rows={} time={:.2f}s peak={:.1f} MB".format(label, rows, duration, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Local stand-in for an OData service, to measure the connector without a SAP system.
+
+- formats: v2 (d.results, __next), v4 (value, @odata.nextLink) and sap (v2 with $format=json and server side paging)
+- $top, $skip, $skiptoken, $inlinecount / $count, /$metadata, /$count
+- configurable latency, server page size, row width and /Date()/ values
+- injected 429 (with Retry-After), 500 and SAP metadata cache errors
+- gzip compressed answers, when the client accepts them
+- GET /_stats returns the number of requests and bytes sent
+
+Usage: python3 tests/python/benchmark/mock_odata_server.py --port 8000 --version v2 --rows 100000
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+ENTITY_SET = "Products"
+SAP_METADATA_CACHE_ERROR = {
+    "error": {
+        "code": "/IWBEP/CM_MGW_RT/004",
+        "message": {"lang": "en", "value": "Metadata cache on hub system is outdated"}
+    }
+}
+
+
+class MockODataSettings(object):
+    def __init__(self, version="v2", rows=10000, width=10, date_columns=2, server_page_size=None,
+                 latency=0.0, error_rate_429=0.0, error_rate_500=0.0, error_rate_sap=0.0, seed=0, compress=False):
+        self.version = version
+        self.rows = rows
+        self.width = width
+        self.date_columns = date_columns
+        self.server_page_size = server_page_size  # rows per page when the server drives the paging
+        self.latency = latency  # seconds added before each answer
+        self.error_rate_429 = error_rate_429
+        self.error_rate_500 = error_rate_500
+        self.error_rate_sap = error_rate_sap
+        self.seed = seed
+        self.compress = compress
+
+
+def build_row(index, settings):
+    row = {
+        "__metadata": {"uri": "{}({})".format(ENTITY_SET, index), "type": "Mock.Product"},
+        "ID": index,
+        "Name": "Product {}".format(index),
+        "Price": "{}.{:02d}".format(index % 1000, index % 100)
+    }
+    for column_index in range(settings.date_columns):
+        row["Date{}".format(column_index)] = "/Date({})/".format(1600000000000 + index * 60000 + column_index)
+    for column_index in range(settings.width):
+        row["Column{}".format(column_index)] = "value {} of row {}".format(column_index, index)
+    if settings.version == "v4":
+        del row["__metadata"]
+        for column_index in range(settings.date_columns):
+            timestamp = 1600000000 + index * 60 + column_index
+            row["Date{}".format(column_index)] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+    return row
+
+
+def build_metadata(settings):
+    date_type = "Edm.DateTimeOffset" if settings.version == "v4" else "Edm.DateTime"
+    properties = [
+        '<Property Name="ID" Type="Edm.Int32" Nullable="false"/>',
+        '<Property Name="Name" Type="Edm.String"/>',
+        '<Property Name="Price" Type="Edm.Decimal"/>'
+    ]
+    properties += ['<Property Name="Date{}" Type="{}"/>'.format(index, date_type) for index in range(settings.date_columns)]
+    properties += ['<Property Name="Column{}" Type="Edm.String"/>'.format(index) for index in range(settings.width)]
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<edmx:Edmx xmlns:edmx="http://schemas.microsoft.com/ado/2007/06/edmx" Version="1.0"><edmx:DataServices>'
+        '<Schema xmlns="http://schemas.microsoft.com/ado/2008/09/edm" Namespace="Mock">'
+        '<EntityType Name="Product"><Key><PropertyRef Name="ID"/></Key>{}</EntityType>'
+        '<EntityContainer Name="Container"><EntitySet Name="{}" EntityType="Mock.Product"/></EntityContainer>'
+        '</Schema></edmx:DataServices></edmx:Edmx>'
+    ).format("".join(properties), ENTITY_SET)
+
+
+class MockODataHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.send_body(200, b"", "application/json")
+
+    def do_GET(self):
+        server = self.server
+        settings = server.settings
+        url = urlparse(self.path)
+        path = url.path.rstrip("/").split("/")[-1] if url.path.strip("/") else ""
+        query = dict((name, values[0]) for name, values in parse_qs(url.query).items())
+        if path == "_stats":
+            self.send_json(200, server.get_stats(), count=False)
+            return
+        if settings.latency:
+            time.sleep(settings.latency)
+        error = server.draw_error()
+        if error == 429:
+            self.send_json(429, {"error": {"code": "429", "message": {"value": "Too many requests"}}}, headers={"Retry-After": "0"})
+        elif error == 500:
+            self.send_json(500, {"error": {"code": "500", "message": "Internal error"}})
+        elif error == "sap":
+            self.send_json(500, SAP_METADATA_CACHE_ERROR)
+        elif path == "$metadata":
+            self.send_body(200, build_metadata(settings).encode("utf-8"), "application/xml")
+        elif path == "$count":
+            self.send_body(200, "{}".format(settings.rows).encode("utf-8"), "text/plain")
+        elif path == ENTITY_SET:
+            self.send_json(200, self.get_page(query))
+        elif path == "":
+            self.send_json(200, self.get_service_document())
+        else:
+            self.send_json(404, {"error": {"code": "404", "message": {"value": "Resource not found"}}})
+
+    def get_page(self, query):
+        settings = self.server.settings
+        skip = int(query.get("$skiptoken", query.get("$skip", 0)))
+        top = int(query["$top"]) if "$top" in query else None
+        last_row = settings.rows if top is None else min(settings.rows, skip + top)
+        page_end = last_row
+        if settings.server_page_size:
+            page_end = min(last_row, skip + settings.server_page_size)
+        rows = [build_row(index, settings) for index in range(skip, page_end)]
+        next_link = None
+        if page_end < last_row:
+            next_link = "http://{}:{}/{}?$skiptoken={}".format(
+                self.server.server_address[0], self.server.server_address[1], ENTITY_SET, page_end
+            )
+            if top is not None:
+                next_link += "&$top={}".format(top - (page_end - skip))
+        count = settings.rows if query.get("$inlinecount") == "allpages" or query.get("$count") == "true" else None
+        if settings.version == "v4":
+            page = {"@odata.context": "$metadata#{}".format(ENTITY_SET), "value": rows}
+            if count is not None:
+                page["@odata.count"] = count
+            if next_link:
+                page["@odata.nextLink"] = next_link
+            return page
+        results = {"results": rows}
+        if count is not None:
+            results["__count"] = "{}".format(count)
+        if next_link:
+            results["__next"] = next_link
+        return {"d": results}
+
+    def get_service_document(self):
+        if self.server.settings.version == "v4":
+            return {"value": [{"name": ENTITY_SET, "kind": "EntitySet", "url": ENTITY_SET}]}
+        return {"d": {"EntitySets": [ENTITY_SET]}}
+
+    def send_json(self, status, payload, headers=None, count=True):
+        self.send_body(status, json.dumps(payload).encode("utf-8"), "application/json", headers=headers, count=count)
+
+    def send_body(self, status, body, content_type, headers=None, count=True):
+        compress = self.server.settings.compress and "gzip" in self.headers.get("Accept-Encoding", "")
+        if compress:
+            body = gzip.compress(body, compresslevel=6)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", "{}".format(len(body)))
+        for header_name, header_value in (headers or {}).items():
+            self.send_header(header_name, header_value)
+        self.end_headers()
+        self.wfile.write(body)
+        if count:
+            self.server.record(len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockODataServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, settings, host="127.0.0.1", port=0):
+        ThreadingHTTPServer.__init__(self, (host, port), MockODataHandler)
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def get_url(self):
+        return "http://{}:{}".format(self.server_address[0], self.server_address[1])
+
+    def draw_error(self):
+        with self.lock:
+            draw = self.random.random()
+        for error, rate in [(429, self.settings.error_rate_429), (500, self.settings.error_rate_500), ("sap", self.settings.error_rate_sap)]:
+            if draw < rate:
+                return error
+            draw -= rate
+        return None
+
+    def record(self, number_of_bytes):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += number_of_bytes
+
+    def get_stats(self):
+        with self.lock:
+            return {"requests": self.requests, "bytes": self.bytes_sent}
+
+    def start_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+def add_settings_arguments(parser):
+    parser.add_argument("--version", default="v2", choices=["v2", "v4", "sap"])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--width", type=int, default=10, help="number of string columns")
+    parser.add_argument("--date-columns", type=int, default=2)
+    parser.add_argument("--server-page-size", type=int, default=None, help="rows per page when the server drives the paging")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each request")
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-500", type=float, default=0.0)
+    parser.add_argument("--error-rate-sap", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compress", action="store_true", help="gzip the answers when the client accepts it")
+
+
+def get_settings(arguments):
+    return MockODataSettings(
+        version=arguments.version, rows=arguments.rows, width=arguments.width, date_columns=arguments.date_columns,
+        server_page_size=arguments.server_page_size, latency=arguments.latency,
+        error_rate_429=arguments.error_rate_429, error_rate_500=arguments.error_rate_500,
+        error_rate_sap=arguments.error_rate_sap, seed=arguments.seed, compress=arguments.compress
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OData service")
+    parser.add_argument("--port", type=int, default=8000)
+    add_settings_arguments(parser)
+    arguments = parser.parse_args()
+    server = MockODataServer(get_settings(arguments), port=arguments.port)
+    print("Serving {}/{} ({} rows, {})".format(server.get_url(), ENTITY_SET, arguments.rows, arguments.version))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+import pytest
+from dataikuapi.utils import DataikuException
+
+pytest.importorskip("dataiku.connector")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "python-connectors", "sap_odata"))
+import odata_cache  # noqa: E402
+import odata_incremental  # noqa: E402
+from connector import SAPODataConnector  # noqa: E402
+from test_odata_client import MockSession, build_page  # noqa: E402
+
+
+CONFIG = {
+    "auth_type": "login",
+    "sap-odata_login": {"odata_instance": "https://host/sap/opu/odata/sap/ZSALES_SRV", "odata_version": "v2"},
+    "odata_list_selector": "Products",
+    "bulk_size": 100,
+    "show_advanced_parameters": True,
+    "resume_extraction": True
+}
+
+
+class FailingPage(list):
+    """
+    A page whose rows can't all be read, as when the connection drops while a streamed page is decoded
+    """
+    def __init__(self, items, failing_row):
+        super(FailingPage, self).__init__(items)
+        self.failing_row = failing_row
+
+    def __iter__(self):
+        for index, item in enumerate(list.__iter__(self)):
+            if index == self.failing_row:
+                raise DataikuException("Connection reset while reading the page")
+            yield item
+
+
+class FlakyService(object):
+    """
+    Serves $skip / $top pages of row_count rows. Each failure, (skip, row index or None), makes the first request
+    of that page fail, either before it is sent back or after the given number of rows.
+    """
+    def __init__(self, row_count, failures):
+        self.rows = [{"ID": row_id} for row_id in range(row_count)]
+        self.failures = dict(failures)
+        self.requested_skips = []
+
+    def get_entity_collections(self, entity="", top=None, skip=None, page_url=None, can_raise=True, **query):
+        skip = skip or 0
+        self.requested_skips.append(skip)
+        items = [dict(row) for row in self.rows[skip:skip + top]]
+        if skip not in self.failures:
+            return items, None
+        failing_row = self.failures.pop(skip)
+        if failing_row is None:
+            raise DataikuException("Error 500 on page {}".format(skip))
+        return FailingPage(items, failing_row), None
+
+
+def get_connector(service, tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_incremental, "get_state_folder", lambda: str(tmp_path))
+    connector = SAPODataConnector(CONFIG, {})
+    connector.client.get_entity_collections = service.get_entity_collections
+    return connector
+
+
+def test_failed_pages_are_resumed_without_duplicates(tmp_path, monkeypatch):
+    service = FlakyService(1050, failures=[(300, None), (700, 42)])
+    connector = get_connector(service, tmp_path, monkeypatch)
+    row_ids = [row["ID"] for row in connector.generate_rows()]
+    assert row_ids == list(range(1050))
+    assert service.requested_skips.count(300) == 2
+    assert service.requested_skips.count(700) == 2
+    assert os.listdir(str(tmp_path)) == []  # the checkpoint is not kept between runs
+
+
+def test_next_run_starts_from_the_first_row(tmp_path, monkeypatch):
+    service = FlakyService(1050, failures=[(200, 30)])
+    connector = get_connector(service, tmp_path, monkeypatch)
+    connector.MAX_RESUMES = 0
+    first_run_ids = []
+    with pytest.raises(DataikuException):
+        for row in connector.generate_rows():
+            first_run_ids.append(row["ID"])
+    assert first_run_ids == list(range(230))
+    # the dataset is rebuilt from the rows of the new run only, it must not start where the failed run stopped
+    second_run_ids = [row["ID"] for row in get_connector(service, tmp_path, monkeypatch).generate_rows()]
+    assert second_run_ids == list(range(1050))
+
+
+class DeltaService(FlakyService):
+    """
+    Sends back a delta link with the last page of the first load, and none with the changes
+    """
+    def __init__(self, row_count, client):
+        super(DeltaService, self).__init__(row_count, failures=[])
+        self.client = client
+        self.requested_urls = []
+
+    def get_entity_collections(self, entity="", top=None, skip=None, page_url=None, can_raise=True, **query):
+        self.requested_urls.append(page_url)
+        if page_url:
+            return [{"ID": 0}], None
+        items, next_page_url = super(DeltaService, self).get_entity_collections(entity=entity, top=top, skip=skip, **query)
+        if len(items) < top:
+            self.client.delta_link = "Products?!deltatoken='1'"
+        return items, next_page_url
+
+
+def test_delta_link_is_dropped_when_the_service_sends_none(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_incremental, "get_state_folder", lambda: str(tmp_path))
+    config = dict(CONFIG, incremental_mode="delta_token", resume_extraction=False)
+    run_ids, requested_urls = [], []
+    for run in range(3):
+        connector = SAPODataConnector(config, {})
+        service = DeltaService(250, connector.client)
+        connector.client.get_entity_collections = service.get_entity_collections
+        run_ids.append([row["ID"] for row in connector.generate_rows()])
+        requested_urls.append(service.requested_urls)
+    assert run_ids == [list(range(250)), [0], list(range(250))]
+    assert requested_urls[1] == ["Products?!deltatoken='1'"]
+    assert set(requested_urls[2]) == {None}  # full extraction, the delta link was not sent back by the second run
+
+
+class ChangingService(FlakyService):
+    """
+    Rows with a Changed counter, selected with $filter=Changed ge n
+    """
+    def __init__(self, rows):
+        super(ChangingService, self).__init__(0, failures=[])
+        self.rows = rows
+
+    def get_entity_collections(self, entity="", top=None, skip=None, page_url=None, can_raise=True, filter=None, **query):
+        rows = self.rows
+        if filter:
+            lower_bound = int(filter.split(" ge ")[1])
+            rows = [row for row in rows if row["Changed"] >= lower_bound]
+        skip = skip or 0
+        return [dict(row) for row in rows[skip:skip + top]], None
+
+
+def test_rows_changed_at_the_high_water_mark_are_retrieved_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_incremental, "get_state_folder", lambda: str(tmp_path))
+    config = dict(CONFIG, incremental_mode="high_water_mark", incremental_property="Changed", resume_extraction=False)
+    rows = [{"ID": row_id, "Changed": row_id // 100} for row_id in range(250)]
+
+    def run():
+        connector = SAPODataConnector(config, {})
+        connector.get_property_types = lambda: {}
+        connector.client.get_entity_collections = ChangingService(rows).get_entity_collections
+        return [row["ID"] for row in connector.generate_rows()]
+
+    assert run() == list(range(250))
+    rows.append({"ID": 250, "Changed": 2})  # committed after the first run, with the same Changed value as its last rows
+    rows.append({"ID": 251, "Changed": 3})
+    assert run() == [250, 251]
+    assert run() == []
+
+
+def test_only_the_pages_of_previews_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+
+    def answer(method, url, **args):
+        skip = int((re.findall(r"\$skip=(\d+)", url) or [0])[0])
+        return build_page(skip, max(0, min(100, 1000 - skip)))
+    session = MockSession(answer)
+    requests_per_run = []
+    for records_limit in [150, 150, -1, -1]:
+        connector = SAPODataConnector(dict(CONFIG, page_cache_ttl=10), {})
+        connector.client.session = session
+        requests_before = len(session.requests)
+        rows = connector.generate_rows(records_limit=records_limit)
+        assert [row["ID"] for row in rows][:150] == list(range(150))
+        rows.close()
+        requests_per_run.append(len(session.requests) - requests_before)
+    assert requests_per_run[0] > 0 and requests_per_run[1] == 0
+    assert requests_per_run[2] > 0 and requests_per_run[3] == requests_per_run[2]
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from urllib.parse import parse_qs
+from dataikuapi.utils import DataikuException
+from odata_async import AsyncClientSidePager
+
+
+class MockClient(object):
+    def get_entity_collections_url(self, entity="", top=None, skip=None, page_url=None, filter=None, **query):
+        return "{}?$skip={}&$top={}&$filter={}".format(entity, skip or 0, top, filter)
+
+
+class MockTransport(object):
+    """
+    Serves $skip / $top windows of row_count rows, the windows further in the set being answered faster
+    """
+    def __init__(self, row_count, short_windows=None, failing_windows=None):
+        self.rows = [{"ID": row_id} for row_id in range(row_count)]
+        self.short_windows = short_windows or {}
+        self.failing_windows = failing_windows or []
+        self.requested_skips = []
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get_page(self, url, can_raise=True):
+        query = parse_qs(url.split("?", 1)[1])
+        skip, top = int(query["$skip"][0]), int(query["$top"][0])
+        self.requested_skips.append(skip)
+        await asyncio.sleep(max(0, 0.02 - skip / 100000.0))
+        if skip in self.failing_windows:
+            raise DataikuException("Error while accessing {}: connection reset".format(url))
+        top = self.short_windows.get(skip, top)
+        return [dict(row) for row in self.rows[skip:skip + top]], None
+
+
+def get_row_ids(pager, transport):
+    pager.create_transport = lambda: transport
+    return [row["ID"] for items in pager.iterate_pages() for row in items]
+
+
+def test_pages_are_yielded_in_order():
+    transport = MockTransport(4321)
+    pager = AsyncClientSidePager(MockClient(), "Products", 100, max_connections=8)
+    assert get_row_ids(pager, transport) == list(range(4321))
+
+
+def test_short_page_stops_the_extraction():
+    transport = MockTransport(10000, short_windows={2000: 300})
+    pager = AsyncClientSidePager(MockClient(), "Products", 500, max_connections=4)
+    with pytest.raises(DataikuException, match="less than 500 rows"):
+        get_row_ids(pager, transport)
+    transport = MockTransport(2300)
+    pager = AsyncClientSidePager(MockClient(), "Products", 500, max_connections=4)
+    assert get_row_ids(pager, transport) == list(range(2300))
+    assert max(transport.requested_skips) < 2300 + 4 * 500
+
+
+def test_request_errors_are_raised_to_the_reader():
+    transport = MockTransport(10000, failing_windows=[3000])
+    pager = AsyncClientSidePager(MockClient(), "Products", 500, max_connections=4)
+    pager.create_transport = lambda: transport
+    row_ids = []
+    with pytest.raises(DataikuException, match="connection reset"):
+        for items in pager.iterate_pages():
+            row_ids.extend(row["ID"] for row in items)
+    assert row_ids == list(range(3000))
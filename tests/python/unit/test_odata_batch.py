@@ -0,0 +1,112 @@
+import json
+from odata_batch import build_batch_body, build_changeset_body, parse_batch_response
+
+
+def build_response_part(status_line, body):
+    return (
+        "Content-Type: application/http\r\n"
+        "Content-Transfer-Encoding: binary\r\n"
+        "\r\n"
+        "{}\r\n"
+        "Content-Type: application/json\r\n"
+        "\r\n"
+        "{}\r\n"
+    ).format(status_line, body)
+
+
+def test_build_batch_body():
+    body = build_batch_body("batch_1", ["Entity?$skip=0&$top=2", "Entity?$skip=2&$top=2"], headers={"Accept": "application/json"})
+    assert body.decode("utf-8") == (
+        "--batch_1\r\n"
+        "Content-Type: application/http\r\n"
+        "Content-Transfer-Encoding: binary\r\n"
+        "\r\n"
+        "GET Entity?$skip=0&$top=2 HTTP/1.1\r\n"
+        "Accept: application/json\r\n"
+        "\r\n"
+        "\r\n"
+        "--batch_1\r\n"
+        "Content-Type: application/http\r\n"
+        "Content-Transfer-Encoding: binary\r\n"
+        "\r\n"
+        "GET Entity?$skip=2&$top=2 HTTP/1.1\r\n"
+        "Accept: application/json\r\n"
+        "\r\n"
+        "\r\n"
+        "--batch_1--\r\n"
+    )
+
+
+def test_parse_batch_response_keeps_the_parts_order():
+    first_page = {"d": {"results": [{"ID": 1, "Name": "Café"}]}}
+    error = {"error": {"code": "SY/530", "message": {"value": "Metadata cache"}}}
+    content = (
+        "--response_1\r\n" + build_response_part("HTTP/1.1 200 OK", json.dumps(first_page, ensure_ascii=False)) +
+        "--response_1\r\n" + build_response_part("HTTP/1.1 500 Internal Server Error", json.dumps(error)) +
+        "--response_1--\r\n"
+    ).encode("utf-8")
+    responses = parse_batch_response(content, "multipart/mixed; boundary=response_1")
+    assert [response.status_code for response in responses] == [200, 500]
+    assert responses[0].json() == first_page
+    assert responses[1].json() == error
+    assert responses[1].headers["content-type"] == "application/json"
+
+
+def test_parse_batch_response_flattens_changesets():
+    changeset = (
+        "--changeset_1\r\n" + build_response_part("HTTP/1.1 201 Created", "{}") +
+        "--changeset_1\r\n" + build_response_part("HTTP/1.1 204 No Content", "") +
+        "--changeset_1--\r\n"
+    )
+    content = (
+        "--response_1\r\n"
+        "Content-Type: multipart/mixed; boundary=changeset_1\r\n"
+        "\r\n" + changeset +
+        "--response_1--\r\n"
+    ).encode("utf-8")
+    responses = parse_batch_response(content, 'multipart/mixed; boundary="response_1"')
+    assert [response.status_code for response in responses] == [201, 204]
+    assert responses[1].content == b""
+
+
+def test_build_changeset_body():
+    body = build_changeset_body("batch_1", "changeset_1", "Entity", [{"ID": 1}, {"ID": 2}])
+    assert body.decode("utf-8") == (
+        "--batch_1\r\n"
+        "Content-Type: multipart/mixed; boundary=changeset_1\r\n"
+        "\r\n"
+        "--changeset_1\r\n"
+        "Content-Type: application/http\r\n"
+        "Content-Transfer-Encoding: binary\r\n"
+        "Content-ID: 1\r\n"
+        "\r\n"
+        "POST Entity HTTP/1.1\r\n"
+        "Content-Type: application/json\r\n"
+        "\r\n"
+        '{"ID": 1}\r\n'
+        "--changeset_1\r\n"
+        "Content-Type: application/http\r\n"
+        "Content-Transfer-Encoding: binary\r\n"
+        "Content-ID: 2\r\n"
+        "\r\n"
+        "POST Entity HTTP/1.1\r\n"
+        "Content-Type: application/json\r\n"
+        "\r\n"
+        '{"ID": 2}\r\n'
+        "--changeset_1--\r\n"
+        "--batch_1--\r\n"
+    )
+
+
+def test_build_batch_body_encodes_the_request_lines():
+    body = build_batch_body("batch_1", [
+        "Products?$skip=2&$top=2&$filter=Country eq 'FR' and Name eq 'Café'",
+        "Products?$filter=Name%20eq%20'A'&$select=ID,Name",
+        "Products?$filter=substringof('50%', Name)"
+    ])
+    request_lines = [line for line in body.decode("utf-8").split("\r\n") if line.startswith("GET ")]
+    assert request_lines == [
+        "GET Products?$skip=2&$top=2&$filter=Country%20eq%20'FR'%20and%20Name%20eq%20'Caf%C3%A9' HTTP/1.1",
+        "GET Products?$filter=Name%20eq%20'A'&$select=ID,Name HTTP/1.1",
+        "GET Products?$filter=substringof('50%25',%20Name) HTTP/1.1"
+    ]
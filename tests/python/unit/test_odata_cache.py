@@ -0,0 +1,61 @@
+import os
+import time
+import odata_cache
+from odata_cache import DiskCache
+
+
+def test_expired_documents_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+    cache = DiskCache("entity_sets", ttl=60)
+    cache.set("key", ["Products"])
+    assert cache.get("key") == ["Products"]
+    old_time = time.time() - 120
+    os.utime(cache.get_path("key"), (old_time, old_time))
+    assert cache.get("key") is None
+
+
+def test_oldest_documents_are_evicted_past_max_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+    cache = DiskCache("entity_sets", ttl=60, max_size=250)
+    for index in range(3):
+        cache.set("key {}".format(index), ["x" * 100])
+        file_time = time.time() - 10 + index
+        os.utime(cache.get_path("key {}".format(index)), (file_time, file_time))
+    cache.set("key 3", ["x" * 100])
+    assert cache.get("key 0") is None
+    assert cache.get("key 1") is None
+    assert cache.get("key 2") == ["x" * 100]
+    assert cache.get("key 3") == ["x" * 100]
+
+
+def test_compressed_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+    cache = DiskCache("pages", ttl=60, compress=True)
+    page = {"d": {"results": [{"ID": index, "Name": "Café"} for index in range(100)]}}
+    cache.set("key", page)
+    with open(cache.get_path("key"), "rb") as cache_file:
+        assert cache_file.read(2) == b"\x1f\x8b"
+    assert cache.get("key") == page
+
+
+def test_reading_a_document_protects_it_from_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+    cache = DiskCache("pages", ttl=600, max_size=250)
+    for index in range(2):
+        cache.set("key {}".format(index), ["x" * 100])
+        file_time = time.time() - 10 + index
+        os.utime(cache.get_path("key {}".format(index)), (file_time, file_time))
+    assert cache.get("key 0") is not None
+    cache.set("key 2", ["x" * 100])
+    assert cache.get("key 0") is not None
+    assert cache.get("key 1") is None
+
+
+def test_refresh_is_only_requested_once_while_the_option_stays_set(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+    cache = DiskCache("entity_sets", ttl=60)
+    assert not cache.is_refresh_requested("key", False)
+    assert cache.is_refresh_requested("key", True)
+    assert not cache.is_refresh_requested("key", True)
+    assert not cache.is_refresh_requested("key", False)
+    assert cache.is_refresh_requested("key", True)
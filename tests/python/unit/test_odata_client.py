@@ -0,0 +1,409 @@
+import datetime
+import json
+import os
+import re
+import threading
+import time
+import pytest
+import requests
+import odata_cache
+import odata_client
+from dataikuapi.utils import DataikuException
+from odata_client import ODataClient
+from odata_pagination import ParallelClientSidePager
+from odata_session_pool import SessionPool
+from test_odata_batch import build_response_part
+
+
+def build_response(status_code=200, body=None, headers=None, elapsed=0.01):
+    response = requests.Response()
+    response.status_code = status_code
+    if isinstance(body, bytes):
+        response._content = body
+    else:
+        response._content = json.dumps(body).encode("utf-8") if body is not None else b""
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    response.elapsed = datetime.timedelta(seconds=elapsed)
+    return response
+
+
+def build_page(first_id, row_count):
+    return build_response(body={"d": {"results": [{"ID": row_id} for row_id in range(first_id, first_id + row_count)]}})
+
+
+def build_batch_response(parts):
+    """
+    parts is a list of (status line, JSON body)
+    """
+    content = "".join("--response_1\r\n" + build_response_part(status_line, json.dumps(body)) for status_line, body in parts)
+    return build_response(202, body=(content + "--response_1--\r\n").encode("utf-8"), headers={"Content-Type": "multipart/mixed; boundary=response_1"})
+
+
+def get_batch_windows(body):
+    windows = []
+    for part_url in re.findall(r"GET (\S+) HTTP", body.decode("utf-8")):
+        skip = re.search(r"\$skip=(\d+)", part_url)
+        windows.append((int(skip.group(1)) if skip else 0, int(re.search(r"\$top=(\d+)", part_url).group(1))))
+    return windows
+
+
+class MockSession(object):
+    """
+    Stands for the requests session of a client: each request is recorded and answered by answer(method, url, **args),
+    which returns a response or raises
+    """
+    def __init__(self, answer):
+        self.answer = answer
+        self.requests = []
+        self.auth = None
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **args):
+        with self.lock:
+            self.requests.append((method, url))
+        return self.answer(method, url, **args)
+
+
+class FixedBackoff(object):
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.retry_afters = []
+
+    def get_delay(self, attempt, retry_after=None):
+        self.retry_afters.append(retry_after)
+        return self.delay
+
+
+def get_client(answer, delay=0, odata_version="v2"):
+    client = ODataClient({
+        "auth_type": "login",
+        "sap-odata_login": {"odata_instance": "https://host/sap/opu/odata/sap/ZSALES_SRV", "odata_version": odata_version},
+        "odata_list_selector": "Products"
+    })
+    client.session = MockSession(answer)
+    client.backoff = FixedBackoff(delay)
+    client.pooled_session.clear_csrf_token()
+    return client
+
+
+METADATA = b"""<?xml version="1.0" encoding="utf-8"?>
+<edmx:Edmx Version="1.0" xmlns:edmx="http://schemas.microsoft.com/ado/2007/06/edmx">
+  <edmx:DataServices m:DataServiceVersion="2.0" xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata">
+    <Schema Namespace="ZSALES_SRV" xmlns="http://schemas.microsoft.com/ado/2008/09/edm">
+      <EntityType Name="Product">
+        <Key><PropertyRef Name="ID"/></Key>
+        <Property Name="ID" Type="Edm.Int32" Nullable="false"/>
+      </EntityType>
+      <EntityContainer Name="ZSALES_SRV_Entities" m:IsDefaultEntityContainer="true">
+        <EntitySet Name="Products" EntityType="ZSALES_SRV.Product"/>
+      </EntityContainer>
+    </Schema>
+  </edmx:DataServices>
+</edmx:Edmx>"""
+
+
+def get_executor_threads():
+    return set(thread for thread in threading.enumerate() if thread.name.startswith("ThreadPoolExecutor"))
+
+
+def test_windows_stop_retrying_once_the_pages_are_no_longer_needed():
+    def answer(method, url, **args):
+        if "$skip" not in url:
+            return build_page(0, 10)
+        if "$skip=10&" in url:
+            return build_page(10, 10)
+        raise requests.exceptions.ConnectionError("Connection refused")
+    client = get_client(answer, delay=30)
+    threads_before = get_executor_threads()
+    pages = ParallelClientSidePager(client, "Products", bulk_size=10, parallel_pages=4).iterate_pages()
+    assert len(next(pages)) == 10
+    assert len(next(pages)) == 10  # the windows after this one are waiting to be tried again
+    pages.close()
+    deadline = time.time() + 5
+    while any(thread.is_alive() for thread in get_executor_threads() - threads_before) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not any(thread.is_alive() for thread in get_executor_threads() - threads_before)
+    assert len(client.session.requests) == 5
+
+
+def test_metadata_is_refreshed_once_while_the_refresh_option_stays_set(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+
+    client = get_client(lambda method, url, **args: build_response(body=METADATA))
+    client.get_metadata(cache_ttl=60)
+    client.get_metadata(cache_ttl=60)
+    assert len(client.session.requests) == 1
+    for _ in range(3):  # the option is saved with the dataset settings, so every run sees it set
+        assert client.get_metadata(cache_ttl=60, refresh=True).get_properties("Products")[0]["name"] == "ID"
+    assert len(client.session.requests) == 2
+    client.get_metadata(cache_ttl=60, refresh=False)
+    client.get_metadata(cache_ttl=60, refresh=True)
+    assert len(client.session.requests) == 3
+
+
+def test_count_with_inlinecount():
+    client = get_client(lambda method, url, **args: build_response(body={"d": {"__count": "1234", "results": [{"ID": 0}]}}))
+    assert client.get_count("Products", filter="Country eq 'FR'") == 1234
+    assert client.session.requests == [
+        ("GET", "https://host/sap/opu/odata/sap/ZSALES_SRV/Products?$top=1&$filter=Country eq 'FR'&$inlinecount=allpages")
+    ]
+
+
+def test_count_with_the_count_path_in_v4():
+    client = get_client(lambda method, url, **args: build_response(body=b"1234"), odata_version="v4")
+    assert client.get_count("Products", filter="Country eq 'FR'") == 1234
+    assert client.session.requests == [("GET", "https://host/sap/opu/odata/sap/ZSALES_SRV/Products/$count?$filter=Country eq 'FR'")]
+
+
+def test_counts_are_cached_per_filter(tmp_path, monkeypatch):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+    client = get_client(lambda method, url, **args: build_response(body=b"1234"), odata_version="v4")
+    for _ in range(2):
+        assert client.get_count("Products", filter="Country eq 'FR'", cache_ttl=60) == 1234
+    assert len(client.session.requests) == 1
+    client.get_count("Products", filter="Country eq 'DE'", cache_ttl=60)
+    client.get_count("Products", filter="Country eq 'DE'")  # without ttl, the cache is not used
+    assert len(client.session.requests) == 3
+
+
+def test_count_error_is_raised():
+    client = get_client(lambda method, url, **args: build_response(404, body={"error": {"message": {"value": "Not found"}}}))
+    with pytest.raises(DataikuException, match="This entity does not exist"):
+        client.get_count("Products")
+
+
+class BatchService(object):
+    """
+    Answers the CSRF token requests and the $batch requests on the client's session,
+    with the tokens and $batch part status codes given in turn
+    """
+    def __init__(self, csrf_tokens=("token-1",), batch_status_codes=None, part_status_codes=None):
+        self.csrf_tokens = list(csrf_tokens)
+        self.batch_status_codes = list(batch_status_codes or [])
+        self.part_status_codes = dict(part_status_codes or {})  # skip -> status codes of its first attempts
+        self.posted = []
+
+    def __call__(self, method, url, headers=None, data=None, **args):
+        if method == "GET":
+            return build_response(headers={"X-CSRF-Token": self.csrf_tokens.pop(0)})
+        self.posted.append((headers.get("X-CSRF-Token"), data))
+        if self.batch_status_codes:
+            status_code = self.batch_status_codes.pop(0)
+            if status_code == "connection error":
+                raise requests.exceptions.ConnectionError("Connection reset by peer")
+            if status_code == 403:
+                return build_response(403, headers={"X-CSRF-Token": "Required"})
+            if status_code != 202:
+                return build_response(status_code)
+        if b"changeset" in data:
+            return build_batch_response([("HTTP/1.1 201 Created", {"d": {"ID": 1}}), ("HTTP/1.1 201 Created", {"d": {"ID": 2}})])
+        parts = []
+        for skip, top in get_batch_windows(data):
+            status_codes = self.part_status_codes.get(skip)
+            if status_codes:
+                parts.append(("HTTP/1.1 {} Error".format(status_codes.pop(0)), {}))
+            else:
+                parts.append(("HTTP/1.1 200 OK", {"d": {"results": [{"ID": row_id} for row_id in range(skip, skip + top)]}}))
+        return build_batch_response(parts)
+
+
+def test_throttled_batch_parts_are_sent_again():
+    service = BatchService(part_status_codes={10: [503, 429]})
+    client = get_client(service)
+    pages = client.get_entity_collections_batch([(0, 10), (10, 10), (20, 10)], entity="Products")
+    assert [row["ID"] for items, _ in pages for row in items] == list(range(30))
+    assert [get_batch_windows(body) for _, body in service.posted] == [[(0, 10), (10, 10), (20, 10)], [(10, 10)], [(10, 10)]]
+    assert client.session.requests[0] == ("GET", "https://host/sap/opu/odata/sap/ZSALES_SRV/")  # the token is fetched once
+    assert [method for method, _ in client.session.requests[1:]] == ["POST", "POST", "POST"]
+
+
+def test_rejected_csrf_token_is_fetched_again():
+    service = BatchService(csrf_tokens=["token-1", "token-2"], batch_status_codes=[403])
+    client = get_client(service)
+    pages = client.get_entity_collections_batch([(0, 10)], entity="Products")
+    assert len(pages[0][0]) == 10
+    assert [token for token, _ in service.posted] == ["token-1", "token-2"]
+    assert [method for method, _ in client.session.requests] == ["GET", "POST", "GET", "POST"]
+    assert client.pooled_session.get_csrf_token() == "token-2"
+
+
+def test_batch_of_reads_is_sent_again_after_a_connection_error():
+    service = BatchService(batch_status_codes=["connection error", 502])
+    client = get_client(service)
+    pages = client.get_entity_collections_batch([(0, 10)], entity="Products")
+    assert len(pages[0][0]) == 10
+    assert len(service.posted) == 3
+
+
+def test_changeset_is_sent_again_when_refused_before_processing():
+    service = BatchService(batch_status_codes=[503, 429])
+    responses = get_client(service).post_changeset("Products", [{"ID": 1}, {"ID": 2}])
+    assert [response.status_code for response in responses] == [201, 201]
+    assert len(service.posted) == 3
+
+
+@pytest.mark.parametrize("status_code", [502, 504, "connection error"])
+def test_changeset_is_not_sent_again_when_it_may_have_been_processed(status_code):
+    service = BatchService(batch_status_codes=[status_code])
+    with pytest.raises(DataikuException):
+        get_client(service).post_changeset("Products", [{"ID": 1}, {"ID": 2}])
+    assert len(service.posted) == 1
+
+
+def answer_in_turn(*answers):
+    """
+    Answers the requests with the given status codes, or raises the given exceptions, then with 200
+    """
+    answers = list(answers)
+
+    def answer(method, url, **args):
+        next_answer = answers.pop(0) if answers else 200
+        if isinstance(next_answer, Exception):
+            raise next_answer
+        return build_response(next_answer, headers={"Retry-After": "7"} if next_answer == 429 else None)
+    return answer
+
+
+@pytest.mark.parametrize("status_code", [429, 502, 503, 504])
+def test_reads_are_retried_on_throttling(status_code):
+    client = get_client(answer_in_turn(status_code))
+    assert client.send_request("GET", "https://host/Products").status_code == 200
+    assert len(client.session.requests) == 2
+    assert client.limiter.limit < client.MAX_CONCURRENCY
+
+
+@pytest.mark.parametrize("status_code", [400, 404, 500])
+def test_errors_are_not_retried(status_code):
+    client = get_client(answer_in_turn(status_code))
+    assert client.send_request("GET", "https://host/Products").status_code == status_code
+    assert len(client.session.requests) == 1
+    assert client.limiter.limit == client.MAX_CONCURRENCY
+
+
+def test_reads_are_retried_after_connection_errors():
+    client = get_client(answer_in_turn(requests.exceptions.ConnectionError("Connection reset"), requests.exceptions.Timeout("Read timed out")))
+    assert client.send_request("GET", "https://host/Products").status_code == 200
+    assert len(client.session.requests) == 3
+
+
+def test_retries_are_limited():
+    client = get_client(answer_in_turn(*([503] * 10)))
+    assert client.send_request("GET", "https://host/Products").status_code == 503
+    assert len(client.session.requests) == client.MAX_THROTTLING_RETRIES + 1
+
+
+def test_retry_after_is_given_to_the_backoff():
+    client = get_client(answer_in_turn(429, 503))
+    client.send_request("GET", "https://host/Products")
+    assert client.backoff.retry_afters == [7, None]
+
+
+@pytest.mark.parametrize("status_code, retried", [(429, True), (503, True), (502, False), (504, False)])
+def test_writes_are_only_retried_when_refused_before_processing(status_code, retried):
+    client = get_client(answer_in_turn(status_code))
+    response = client.send_request("POST", "https://host/Products", data=b"{}")
+    assert response.status_code == (200 if retried else status_code)
+    assert len(client.session.requests) == (2 if retried else 1)
+
+
+def test_writes_are_not_retried_after_connection_errors():
+    client = get_client(answer_in_turn(requests.exceptions.ConnectionError("Connection reset")))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.send_request("POST", "https://host/Products", data=b"{}")
+    assert len(client.session.requests) == 1
+
+
+def test_idempotent_writes_are_retried_like_reads():
+    client = get_client(answer_in_turn(502, requests.exceptions.ConnectionError("Connection reset")))
+    assert client.send_request("POST", "https://host/$batch", idempotent=True, data=b"").status_code == 200
+    assert len(client.session.requests) == 3
+
+
+def get_pooled_session(user="alice", password="secret", ignore_ssl_check=False, access_token=None, instance="https://host/sap/opu/odata/sap/ZSALES_SRV"):
+    config = {
+        "auth_type": "login",
+        "sap-odata_login": {
+            "odata_instance": instance, "odata_version": "v2", "ignore_ssl_check": ignore_ssl_check,
+            "odata_username": user, "odata_password": password
+        }
+    }
+    if access_token:
+        config["sap-odata_oauth"] = {"odata_oauth": access_token}
+    return ODataClient(config).pooled_session
+
+
+def test_sessions_are_shared_by_the_clients_of_the_same_credentials(monkeypatch):
+    monkeypatch.setattr(odata_client, "session_pool", SessionPool())
+    pooled_session = get_pooled_session()
+    assert get_pooled_session() is pooled_session
+    assert pooled_session.session.auth == ("alice", "secret")
+    assert pooled_session.session.verify is True
+
+
+def test_sessions_are_isolated_by_credentials_and_ssl_check(monkeypatch):
+    monkeypatch.setattr(odata_client, "session_pool", SessionPool())
+    pooled_session = get_pooled_session()
+    other_sessions = [
+        get_pooled_session(user="bob"),
+        get_pooled_session(password="other secret"),
+        get_pooled_session(access_token="token"),
+        get_pooled_session(ignore_ssl_check=True),
+        get_pooled_session(instance="https://host/sap/opu/odata/sap/ZPURCHASES_SRV")
+    ]
+    assert len(set(id(session) for session in [pooled_session] + other_sessions)) == 6
+    assert other_sessions[0].session.auth == ("bob", "secret")
+    assert other_sessions[3].session.verify is False
+    assert pooled_session.session.verify is True
+
+
+def test_csrf_token_is_not_shared_between_credentials(monkeypatch):
+    monkeypatch.setattr(odata_client, "session_pool", SessionPool())
+    get_pooled_session().set_csrf_token("alice token")
+    assert get_pooled_session().get_csrf_token() == "alice token"
+    assert get_pooled_session(user="bob").get_csrf_token() is None
+
+
+def test_least_recently_used_session_is_closed(monkeypatch):
+    monkeypatch.setattr(odata_client, "session_pool", SessionPool(max_sessions=2))
+    first_session = get_pooled_session(user="alice")
+    second_session = get_pooled_session(user="bob")
+    get_pooled_session(user="alice")
+    get_pooled_session(user="carol")
+    assert get_pooled_session(user="alice") is first_session
+    assert get_pooled_session(user="bob") is not second_session
+
+
+def get_cached_pages_client(tmp_path, monkeypatch, records_limit):
+    monkeypatch.setattr(odata_cache, "get_cache_folder", lambda: str(tmp_path))
+    client = get_client(lambda method, url, **args: build_page(0, 10))
+    client.page_cache_ttl = 60
+    client.page_cache_records_limit = records_limit
+    return client
+
+
+def test_pages_of_previews_are_cached(tmp_path, monkeypatch):
+    client = get_cached_pages_client(tmp_path, monkeypatch, records_limit=100)
+    first_items, _ = client.get_entity_collections("Products", top=10)
+    cached_items, _ = client.get_entity_collections("Products", top=10)
+    assert cached_items == first_items and len(cached_items) == 10
+    assert len(client.session.requests) == 1
+    client.page_cache_records_limit = 50  # a sample of another size may select other rows
+    client.get_entity_collections("Products", top=10)
+    assert len(client.session.requests) == 2
+
+
+def test_pages_of_full_extractions_are_not_cached(tmp_path, monkeypatch):
+    client = get_cached_pages_client(tmp_path, monkeypatch, records_limit=None)
+    for _ in range(2):
+        client.get_entity_collections("Products", top=10)
+    assert len(client.session.requests) == 2
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_pages_of_change_tracking_are_not_cached(tmp_path, monkeypatch):
+    client = get_cached_pages_client(tmp_path, monkeypatch, records_limit=100)
+    client.track_changes = True
+    for _ in range(2):
+        client.get_entity_collections("Products", top=10)
+    assert len(client.session.requests) == 2
@@ -0,0 +1,70 @@
+import copy
+import json
+from odata_common import CompiledRowCleaner, clean_json, clean_json_and_date, get_clean_row_method
+
+
+ROWS = [
+    {
+        "__metadata": {"uri": "Entity(1)"},
+        "ID": 1,
+        "Name": "first",
+        "CreatedOn": "/Date(1700000000000)/",
+        "ChangedOn": None,
+        "ToItems": {"__deferred": {"uri": "Entity(1)/ToItems"}}
+    },
+    {
+        "__metadata": {"uri": "Entity(2)"},
+        "ID": 2,
+        "Name": "second",
+        "CreatedOn": "/Date(-1000)/",
+        "ChangedOn": "/Date(1600000000000)/",
+        "ToItems": {"__deferred": {"uri": "Entity(2)/ToItems"}}
+    },
+    {
+        "ID": 3,
+        "Name": None,
+        "CreatedOn": None,
+        "ChangedOn": "/Date(0)/",
+        "ToItems": None,
+        "Extra": {"nested": True}
+    }
+]
+
+
+def clean_all(clean_row, rows):
+    return [clean_row(row) for row in copy.deepcopy(rows)]
+
+
+def test_compiled_cleaner_matches_clean_json_and_date():
+    assert clean_all(CompiledRowCleaner(should_convert_date=True), ROWS) == clean_all(clean_json_and_date, ROWS)
+
+
+def test_compiled_cleaner_matches_clean_json():
+    assert clean_all(CompiledRowCleaner(should_convert_date=False), ROWS) == clean_all(clean_json, ROWS)
+
+
+def test_column_learned_after_empty_values():
+    rows = [{"ID": index, "ChangedOn": None} for index in range(3)] + [{"ID": 3, "ChangedOn": "/Date(0)/"}]
+    assert clean_all(CompiledRowCleaner(), rows)[-1] == {"ID": 3, "ChangedOn": "1970-01-01T00:00:00Z"}
+
+
+def test_nested_values_after_dates_are_turned_into_json():
+    rows = [
+        {"ID": 1, "ChangedOn": "/Date(0)/"},
+        {"ID": 2, "ChangedOn": {"value": "/Date(0)/"}},
+        {"ID": 3, "ChangedOn": ["/Date(0)/"]},
+        {"ID": 4, "ChangedOn": "not a date"}
+    ]
+    assert clean_all(CompiledRowCleaner(), rows) == clean_all(clean_json_and_date, rows)
+
+
+def test_nested_values_after_strings_are_turned_into_json():
+    rows = [{"ID": 1, "Details": "text"}, {"ID": 2, "Details": {"nested": True}}]
+    assert clean_all(CompiledRowCleaner(), rows) == clean_all(clean_json_and_date, rows)
+    assert json.loads(clean_all(CompiledRowCleaner(), rows)[-1]["Details"]) == {"nested": True}
+
+
+def test_clean_row_method_without_dates():
+    assert get_clean_row_method({"show_advanced_parameters": True, "should_convert_date": False}) is clean_json
+    assert get_clean_row_method({}) is clean_json
+    assert isinstance(get_clean_row_method({"should_convert_date": True}), CompiledRowCleaner)
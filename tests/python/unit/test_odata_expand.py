@@ -0,0 +1,47 @@
+from odata_expand import ExpandedRowBuilder, format_expand, parse_expand
+
+
+ORDER_V2 = {
+    "__metadata": {"uri": "Orders('1')"},
+    "ID": "1",
+    "to_Partner": {"__metadata": {"uri": "Partners('P')"}, "Name": "ACME"},
+    "to_Item": {"results": [
+        {"__metadata": {"uri": "Items('1-10')"}, "Item": "10", "to_Text": {"results": [{"Text": "ten"}]}},
+        {"__metadata": {"uri": "Items('1-20')"}, "Item": "20", "to_Text": {"results": []}}
+    ]},
+    "to_Notes": {"__deferred": {"uri": "Orders('1')/to_Notes"}}
+}
+
+
+def test_expand_option_per_version():
+    tree = parse_expand(["to_Item/to_Text", " to_Partner ", "to_Item"])
+    assert tree == {"to_Item": {"to_Text": {}}, "to_Partner": {}}
+    assert format_expand(tree, "v2") == "to_Item/to_Text,to_Partner"
+    assert format_expand(tree, "v4") == "to_Item($expand=to_Text),to_Partner"
+
+
+def test_flatten_numbers_the_related_entities():
+    builder = ExpandedRowBuilder(parse_expand(["to_Partner", "to_Item/to_Text", "to_Notes"]))
+    rows = list(builder.get_rows([ORDER_V2]))
+    assert rows == [{
+        "ID": "1",
+        "to_Partner/Name": "ACME",
+        "to_Item/0/Item": "10",
+        "to_Item/0/to_Text/0/Text": "ten",
+        "to_Item/1/Item": "20"
+    }]
+
+
+def test_explode_gives_one_row_per_related_entity():
+    builder = ExpandedRowBuilder(parse_expand(["to_Partner", "to_Item/to_Text"]), explode=True)
+    rows = list(builder.get_rows([ORDER_V2]))
+    assert rows == [
+        {"ID": "1", "to_Partner/Name": "ACME", "to_Item/Item": "10", "to_Item/to_Text/Text": "ten", "to_Notes": ORDER_V2["to_Notes"]},
+        {"ID": "1", "to_Partner/Name": "ACME", "to_Item/Item": "20", "to_Notes": ORDER_V2["to_Notes"]}
+    ]
+
+
+def test_explode_keeps_parents_without_related_entities_in_v4():
+    builder = ExpandedRowBuilder(parse_expand(["Items"]), explode=True)
+    rows = list(builder.get_rows([{"ID": 1, "Items": []}, {"ID": 2, "Items": [{"Line": 1}, {"Line": 2}]}]))
+    assert rows == [{"ID": 1}, {"ID": 2, "Items/Line": 1}, {"ID": 2, "Items/Line": 2}]
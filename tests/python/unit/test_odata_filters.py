@@ -0,0 +1,68 @@
+import datetime
+import pytest
+from odata_filters import (
+    build_keyset_filter, build_shard_filters, combine_filters, format_literal, interpolate_boundaries, parse_shard_boundaries
+)
+
+
+def test_combine_filters():
+    assert combine_filters("", None) is None
+    assert combine_filters("A eq 1") == "A eq 1"
+    assert combine_filters("A eq 1", None, "B eq 2") == "(A eq 1) and (B eq 2)"
+
+
+def test_v2_literals():
+    assert format_literal("/Date(1700000000000)/", "Edm.DateTime") == "datetime'2023-11-14T22:13:20'"
+    assert format_literal("2023-11-14T22:13:20Z", "Edm.DateTimeOffset") == "datetimeoffset'2023-11-14T22:13:20Z'"
+    assert format_literal("123", "Edm.Int64") == "123L"
+    assert format_literal("12.5", "Edm.Decimal") == "12.5M"
+    assert format_literal("0050569f-0000-0000-0000-000000000000", "Edm.Guid") == "guid'0050569f-0000-0000-0000-000000000000'"
+    assert format_literal("O'Neil & co", "Edm.String") == "'O''Neil %26 co'"
+    assert format_literal(None, "Edm.String") == "null"
+
+
+def test_v4_literals():
+    assert format_literal("/Date(1700000000000)/", "Edm.DateTimeOffset", "v4") == "2023-11-14T22:13:20Z"
+    assert format_literal("2023-11-14T22:13:20+01:00", "Edm.DateTimeOffset", "v4") == "2023-11-14T22:13:20%2B01:00"
+    assert format_literal(123, "Edm.Int64", "v4") == "123"
+    assert format_literal(True, "Edm.Boolean", "v4") == "true"
+
+
+def test_keyset_filter():
+    assert build_keyset_filter([("ID", "Edm.Int32")], [10]) == "ID gt 10"
+    assert build_keyset_filter([("Order", "Edm.String"), ("Item", "Edm.Int32")], ["A", 2]) == \
+        "(Order gt 'A') or (Order eq 'A' and Item gt 2)"
+
+
+def test_shard_filters():
+    assert build_shard_filters("Amount", [10, 20], "Edm.Int32") == [
+        "(Amount lt 10) or (Amount eq null)",
+        "Amount ge 10 and Amount lt 20",
+        "Amount ge 20"
+    ]
+
+
+def test_shard_filters_on_entered_dates():
+    boundaries = parse_shard_boundaries(["2020-01-01", "2021-06-30T12:00:00Z"], "Edm.DateTime")
+    assert build_shard_filters("CreatedOn", boundaries, "Edm.DateTime") == [
+        "(CreatedOn lt datetime'2020-01-01T00:00:00') or (CreatedOn eq null)",
+        "CreatedOn ge datetime'2020-01-01T00:00:00' and CreatedOn lt datetime'2021-06-30T12:00:00'",
+        "CreatedOn ge datetime'2021-06-30T12:00:00'"
+    ]
+    boundaries = parse_shard_boundaries(["2020-01-01"], "Edm.DateTimeOffset")
+    assert build_shard_filters("CreatedOn", boundaries, "Edm.DateTimeOffset", "v4")[1] == "CreatedOn ge 2020-01-01T00:00:00Z"
+    boundaries = parse_shard_boundaries(["2020-01-01"], "Edm.Date")
+    assert build_shard_filters("PostingDate", boundaries, "Edm.Date", "v4")[1] == "PostingDate ge 2020-01-01"
+
+
+def test_parse_shard_boundaries():
+    assert parse_shard_boundaries(["10", "2.5", "A"]) == [10, 2.5, "A"]
+    assert parse_shard_boundaries(["10"], "Edm.String") == ["10"]
+    with pytest.raises(ValueError):
+        parse_shard_boundaries(["2020-13-01"], "Edm.DateTime")
+
+
+def test_interpolate_boundaries():
+    assert interpolate_boundaries("0", "100", 4, "Edm.Int64") == [25, 50, 75]
+    assert interpolate_boundaries("/Date(0)/", "/Date(172800000)/", 2, "Edm.DateTime") == [datetime.datetime(1970, 1, 2)]
+    assert interpolate_boundaries("A", "Z", 2, "Edm.String") is None
@@ -0,0 +1,40 @@
+from odata_common import get_hash_key
+from odata_incremental import HighWaterMark, StateStore
+
+
+def test_high_water_mark_on_odata_dates():
+    high_water_mark = HighWaterMark("ChangedOn")
+    for value in ["/Date(1600000000000)/", None, "/Date(1700000000000)/", "/Date(1650000000000)/"]:
+        high_water_mark.observe({"ChangedOn": value})
+    assert high_water_mark.value == "/Date(1700000000000)/"
+
+
+def test_high_water_mark_starts_from_saved_value():
+    high_water_mark = HighWaterMark("Counter", value="120")
+    high_water_mark.observe({"Counter": "99"})
+    assert high_water_mark.value == "120"
+    high_water_mark.observe({"Counter": "121"})
+    assert high_water_mark.value == "121"
+
+
+def test_state_store(tmp_path):
+    store = StateStore(folder=str(tmp_path))
+    key = get_hash_key("https://host/service", "Entity", {"filter": None})
+    assert store.load(key) == {}
+    store.save(key, {"delta_link": "Entity?!deltatoken='1'"})
+    assert store.load(key) == {"delta_link": "Entity?!deltatoken='1'"}
+    store.clear(key)
+    assert store.load(key) == {}
+
+
+def test_high_water_mark_recognizes_the_rows_retrieved_at_the_mark():
+    first_run = HighWaterMark("Counter")
+    for row in [{"ID": 1, "Counter": 2}, {"ID": 2, "Counter": 3}, {"ID": 3, "Counter": 1}, {"ID": 4, "Counter": 3}]:
+        assert first_run.observe(row)
+    assert first_run.value == 3
+    next_run = HighWaterMark("Counter", first_run.value, sorted(first_run.row_hashes))
+    assert not next_run.observe({"ID": 2, "Counter": 3})
+    assert not next_run.observe({"ID": 4, "Counter": 3})
+    assert next_run.observe({"ID": 5, "Counter": 3})  # committed after the first run, with the same value
+    assert next_run.observe({"ID": 4, "Counter": 4})
+    assert next_run.value == 4 and len(next_run.row_hashes) == 1
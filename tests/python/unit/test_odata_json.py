@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+from odata_json import JSONCodec, JSON_DECODERS
+
+
+INSTALLED_DECODERS = [name for name, loads in JSON_DECODERS.items() if loads]
+DOCUMENTS = [
+    b'{"d": {"results": [{"__metadata": {"uri": "Products(1)"}, "ID": 1, "Price": "12.50", "Date": "/Date(1600000000000)/"}], "__next": "Products?$skiptoken=1"}}',
+    u'{"value": [{"Name": "Caf\u00e9 \\u00e9t\u00e9 \u65e5\u672c", "Escaped": "a\\"b\\\\c\\n\\t\\/", "Empty": null, "Flag": true}]}'.encode("utf-8"),
+    b'{"value": [{"Float": 0.1, "Small": 1e-310, "Large": 1.7976931348623157e308, "Negative": -0.0, "Exponent": 12E3}]}',
+    b'{"value": [{"Int64": 9223372036854775807, "Big": 123456789012345678901234567890, "Negative": -9223372036854775809}]}',
+    b'{"value": [{"NaN": NaN, "Infinity": Infinity, "Surrogate": "\\ud800"}]}',
+    b'{"value": [], "duplicate": 1, "duplicate": 2}',
+]
+
+
+@pytest.mark.parametrize("decoder", INSTALLED_DECODERS)
+def test_decoders_return_the_standard_library_values(decoder):
+    codec = JSONCodec(decoder=decoder)
+    for document in DOCUMENTS:
+        expected = json.loads(document)
+        decoded = codec.loads(document)
+        # NaN != NaN, compare the text of the values
+        assert repr(decoded) == repr(expected)
+        assert codec.loads(document.decode("utf-8")) == decoded or "NaN" in document.decode("utf-8")
+
+
+def test_encoder_writes_the_standard_library_text():
+    codec = JSONCodec()
+    value = {"uri": u"Products('Caf\u00e9')", "type": "Mock.Product", "nested": {"list": [1, 2.5, None, True]}}
+    assert codec.dumps(value) == json.dumps(value)
+
+
+def test_missing_library_falls_back_on_the_standard_library():
+    assert JSONCodec(decoder="not_installed").decoder == "json"
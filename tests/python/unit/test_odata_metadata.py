@@ -0,0 +1,91 @@
+from odata_metadata import ODataMetadata, parse_metadata, get_entity_set_name
+from odata_common import CompiledRowCleaner
+
+
+V2_METADATA = b"""<?xml version="1.0" encoding="utf-8"?>
+<edmx:Edmx Version="1.0" xmlns:edmx="http://schemas.microsoft.com/ado/2007/06/edmx">
+  <edmx:DataServices m:DataServiceVersion="2.0" xmlns:m="http://schemas.microsoft.com/ado/2007/08/dataservices/metadata">
+    <Schema Namespace="ZSALES_SRV" xml:lang="en" xmlns="http://schemas.microsoft.com/ado/2008/09/edm">
+      <EntityType Name="SalesOrder">
+        <Key><PropertyRef Name="SalesOrderID"/></Key>
+        <Property Name="SalesOrderID" Type="Edm.String" Nullable="false"/>
+        <Property Name="GrossAmount" Type="Edm.Decimal" Precision="15" Scale="2"/>
+        <Property Name="Quantity" Type="Edm.Decimal" Precision="31" Scale="14"/>
+        <Property Name="Weight" Type="Edm.Decimal"/>
+        <Property Name="ItemCount" Type="Edm.Int64"/>
+        <Property Name="CreatedAt" Type="Edm.DateTime"/>
+        <NavigationProperty Name="ToItems" Relationship="ZSALES_SRV.Assoc" FromRole="A" ToRole="B"/>
+      </EntityType>
+      <EntityContainer Name="ZSALES_SRV_Entities" m:IsDefaultEntityContainer="true">
+        <EntitySet Name="SalesOrderSet" EntityType="ZSALES_SRV.SalesOrder"/>
+      </EntityContainer>
+    </Schema>
+  </edmx:DataServices>
+</edmx:Edmx>"""
+
+V4_METADATA = b"""<?xml version="1.0" encoding="utf-8"?>
+<edmx:Edmx Version="4.0" xmlns:edmx="http://docs.oasis-open.org/odata/ns/edmx">
+  <edmx:DataServices>
+    <Schema Namespace="ODataDemo" Alias="Demo" xmlns="http://docs.oasis-open.org/odata/ns/edm">
+      <EntityType Name="Product">
+        <Key><PropertyRef Name="ID"/></Key>
+        <Property Name="ID" Type="Edm.Int32" Nullable="false"/>
+        <Property Name="ReleaseDate" Type="Edm.DateTimeOffset"/>
+      </EntityType>
+      <EntityType Name="FeaturedProduct" BaseType="Demo.Product">
+        <Property Name="Rating" Type="Edm.Double"/>
+      </EntityType>
+      <EntityContainer Name="DemoService">
+        <EntitySet Name="Featured" EntityType="ODataDemo.FeaturedProduct"/>
+      </EntityContainer>
+    </Schema>
+  </edmx:DataServices>
+</edmx:Edmx>"""
+
+
+def test_v2_schema_and_keys():
+    metadata = ODataMetadata(parse_metadata(V2_METADATA))
+    assert metadata.get_keys("SalesOrderSet") == ["SalesOrderID"]
+    assert metadata.get_dss_schema("SalesOrderSet") == {"columns": [
+        {"name": "SalesOrderID", "type": "string"},
+        {"name": "GrossAmount", "type": "double"},
+        {"name": "Quantity", "type": "string"},
+        {"name": "Weight", "type": "string"},
+        {"name": "ItemCount", "type": "bigint"},
+        {"name": "CreatedAt", "type": "date"}
+    ]}
+    assert metadata.get_dss_schema("Unknown") is None
+
+
+def test_v4_base_type_and_alias():
+    metadata = ODataMetadata(parse_metadata(V4_METADATA))
+    assert metadata.get_keys("Featured") == ["ID"]
+    assert [column["name"] for column in metadata.get_dss_schema("Featured")["columns"]] == ["ID", "ReleaseDate", "Rating"]
+
+
+def test_entity_set_name():
+    assert get_entity_set_name("/SalesOrderSet('1')/ToItems?$top=1") == "SalesOrderSet"
+
+
+def test_typed_row_cleaner():
+    metadata = ODataMetadata(parse_metadata(V2_METADATA))
+    clean_row = CompiledRowCleaner(properties=metadata.get_properties("SalesOrderSet"))
+    row = clean_row({
+        "__metadata": {"uri": "SalesOrderSet('1')"},
+        "SalesOrderID": "1",
+        "GrossAmount": "12.50",
+        "Quantity": "12345678901234567890.123",
+        "Weight": "0.1",
+        "ItemCount": "3",
+        "CreatedAt": "/Date(1700000000000)/",
+        "ToItems": {"__deferred": {"uri": "SalesOrderSet('1')/ToItems"}}
+    })
+    assert row == {
+        "SalesOrderID": "1",
+        "GrossAmount": 12.5,
+        "Quantity": "12345678901234567890.123",
+        "Weight": "0.1",
+        "ItemCount": 3,
+        "CreatedAt": "2023-11-14T22:13:20Z",
+        "ToItems": '{"__deferred": {"uri": "SalesOrderSet(\'1\')/ToItems"}}'
+    }
@@ -0,0 +1,37 @@
+import cProfile
+from odata_metrics import ExtractionMetrics
+
+
+def test_summary_adds_up_requests_pages_and_rows():
+    metrics = ExtractionMetrics()
+    metrics.record_request(0.2, 0.3, 1000)
+    metrics.record_request(0.4, 0.1, 3000)
+    metrics.record_retry()
+    metrics.record_page(2, decode_time=0.05)
+    metrics.record_page(1, decode_time=0.05)
+    clean_row = metrics.get_timed_cleaner(lambda item: {"value": item["value"] * 2})
+    assert [clean_row({"value": value}) for value in range(3)] == [{"value": 0}, {"value": 2}, {"value": 4}]
+    summary = metrics.get_summary()
+    assert summary["requests"] == 2
+    assert summary["retries"] == 1
+    assert summary["bytes"] == 4000
+    assert summary["average_ttfb"] == 0.3
+    assert summary["max_ttfb"] == 0.4
+    assert summary["download_time"] == 0.4
+    assert summary["decode_time"] == 0.1
+    assert summary["rows"] == 3
+    assert summary["average_rows_per_page"] == 1.5
+    assert summary["max_rows_per_page"] == 2
+
+
+def test_profiler_sees_the_row_cleaning():
+    metrics = ExtractionMetrics()
+    profiler = cProfile.Profile()
+    metrics.set_profiler(profiler)
+
+    def clean_row(item):
+        return dict(item)
+    timed_clean_row = metrics.get_timed_cleaner(clean_row)
+    timed_clean_row({"a": 1})
+    profiler.create_stats()
+    assert any(function_name == "clean_row" for _, _, function_name in profiler.stats)
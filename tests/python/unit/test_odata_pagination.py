@@ -0,0 +1,223 @@
+import re
+import threading
+import time
+import pytest
+from dataikuapi.utils import DataikuException
+from odata_filters import build_shard_filters
+from odata_pagination import (
+    BatchClientSidePager, ClientSidePager, KeysetPager, ParallelClientSidePager, ShardedPager, sample_shard_boundaries
+)
+
+
+filter_token_pattern = re.compile(r"\s*(\(|\)|'[^']*'|[^\s()]+)")
+FILTER_OPERATORS = {
+    "eq": lambda left, right: left == right,
+    "ne": lambda left, right: left != right,
+    "gt": lambda left, right: left is not None and left > right,
+    "ge": lambda left, right: left is not None and left >= right,
+    "lt": lambda left, right: left is not None and left < right,
+    "le": lambda left, right: left is not None and left <= right
+}
+
+
+def parse_filter(odata_filter):
+    """
+    Turns the $filter expressions built by the pagers (comparisons joined by and / or, with parenthesis)
+    into a predicate on the rows
+    """
+    tokens = filter_token_pattern.findall(odata_filter)
+
+    def parse_alternatives(position):
+        predicate, position = parse_conditions(position)
+        while position < len(tokens) and tokens[position] == "or":
+            other_predicate, position = parse_conditions(position + 1)
+            predicate = (lambda left, right: lambda row: left(row) or right(row))(predicate, other_predicate)
+        return predicate, position
+
+    def parse_conditions(position):
+        predicate, position = parse_condition(position)
+        while position < len(tokens) and tokens[position] == "and":
+            other_predicate, position = parse_condition(position + 1)
+            predicate = (lambda left, right: lambda row: left(row) and right(row))(predicate, other_predicate)
+        return predicate, position
+
+    def parse_condition(position):
+        if tokens[position] == "(":
+            predicate, position = parse_alternatives(position + 1)
+            return predicate, position + 1
+        property_name, operator, literal = tokens[position:position + 3]
+        value = None if literal == "null" else literal.strip("'") if literal.startswith("'") else int(literal)
+        return (lambda row: FILTER_OPERATORS[operator](row.get(property_name), value)), position + 3
+
+    return parse_alternatives(0)[0]
+
+
+class MockClient(object):
+    """
+    Serves $skip / $top windows of row_count rows, the windows further in the set being answered faster.
+    $filter and $orderby are applied to the rows before the window is taken.
+    """
+    odata_version = "v2"
+    last_page_statistics = None
+
+    def __init__(self, row_count=0, short_windows=None, rows=None):
+        self.rows = rows if rows is not None else [{"ID": row_id} for row_id in range(row_count)]
+        self.short_windows = short_windows or {}  # skip -> number of rows sent back instead of top
+        self.requested_skips = []
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def get_entity_collections(self, entity="", top=None, skip=None, can_raise=True, filter=None, orderby=None, **query):
+        skip = skip or 0
+        with self.lock:
+            self.requested_skips.append(skip)
+            self.queries.append(dict(query, top=top, filter=filter, orderby=orderby, can_raise=can_raise))
+        time.sleep(max(0, 0.02 - skip / 100000.0))
+        rows = self.rows
+        if filter:
+            predicate = parse_filter(filter)
+            rows = [row for row in rows if predicate(row)]
+        for sort_key in reversed(orderby or []):
+            property_name, _, direction = sort_key.partition(" ")
+            rows = sorted(rows, key=lambda row: row.get(property_name), reverse=(direction == "desc"))
+        top = self.short_windows.get(skip, top)
+        end = skip + top if top is not None else None
+        return [dict(row) for row in rows[skip:end]], None
+
+    def get_entity_collections_batch(self, windows, entity="", can_raise=True, **query):
+        return [self.get_entity_collections(entity=entity, top=top, skip=skip) for skip, top in windows]
+
+
+class FailingClient(MockClient):
+    def __init__(self, failing_filter, **kwargs):
+        super(FailingClient, self).__init__(**kwargs)
+        self.failing_filter = failing_filter
+
+    def get_entity_collections(self, filter=None, **kwargs):
+        if filter == self.failing_filter:
+            raise DataikuException("Error 500 on {}".format(filter))
+        return super(FailingClient, self).get_entity_collections(filter=filter, **kwargs)
+
+
+def get_shard_pagers(client, boundaries, bulk_size):
+    return [
+        ClientSidePager(client, "Sales", bulk_size=bulk_size, query={"filter": shard_filter})
+        for shard_filter in build_shard_filters("Amount", boundaries, "Edm.Int32")
+    ]
+
+
+def get_row_ids(pager):
+    return [row["ID"] for items in pager.iterate_pages() for row in items]
+
+
+def test_parallel_pages_are_yielded_in_order():
+    client = MockClient(4321)
+    pager = ParallelClientSidePager(client, "Products", bulk_size=100, parallel_pages=8)
+    assert get_row_ids(pager) == list(range(4321))
+
+
+def test_short_page_before_the_last_one_raises():
+    client = MockClient(5000, short_windows={1500: 400})
+    pager = ParallelClientSidePager(client, "Products", bulk_size=500, parallel_pages=4)
+    with pytest.raises(DataikuException, match="less than 500 rows"):
+        get_row_ids(pager)
+
+
+def test_no_window_is_requested_past_the_records_limit():
+    client = MockClient(10000)
+    pager = ParallelClientSidePager(client, "Products", bulk_size=500, parallel_pages=8, records_limit=700)
+    assert get_row_ids(pager)[:700] == list(range(700))
+    assert sorted(client.requested_skips) == [0, 500]
+
+
+def test_stale_count_does_not_stop_the_extraction():
+    for pager_class, options in [(ParallelClientSidePager, {"parallel_pages": 4}), (BatchClientSidePager, {"pages_per_batch": 4})]:
+        client = MockClient(5000)
+        pager = pager_class(client, "Products", bulk_size=500, total_count=3000, **options)
+        assert get_row_ids(pager) == list(range(5000))
+
+
+def test_count_limits_the_windows_requested_ahead():
+    client = MockClient(2250)
+    pager = ParallelClientSidePager(client, "Products", bulk_size=500, parallel_pages=8, total_count=2250)
+    assert get_row_ids(pager) == list(range(2250))
+    assert sorted(client.requested_skips) == [0, 500, 1000, 1500, 2000]
+
+
+def test_keyset_pages_follow_the_last_key():
+    client = MockClient(1050)
+    pager = KeysetPager(client, "Products", [("ID", "Edm.Int32")], bulk_size=100, query={"select": ["Name"]})
+    assert get_row_ids(pager) == list(range(1050))
+    assert [query["filter"] for query in client.queries[:3]] == [None, "ID gt 99", "ID gt 199"]
+    assert set(client.requested_skips) == {0}
+    assert client.queries[0]["orderby"] == ["ID"] and client.queries[0]["select"] == ["Name", "ID"]
+    assert [query["can_raise"] for query in client.queries[:2]] == [True, False]
+    assert len(client.queries) == 11  # the short page is the last one
+
+
+def test_keyset_pagination_stops_on_an_empty_page():
+    client = MockClient(1000)
+    pager = KeysetPager(client, "Products", [("ID", "Edm.Int32")], bulk_size=100)
+    assert get_row_ids(pager) == list(range(1000))
+    assert len(client.queries) == 11
+    assert client.queries[-1]["filter"] == "ID gt 999"
+
+
+def test_keyset_pages_on_composite_keys():
+    rows = [{"Order": order, "Item": item} for order in ["A", "B", "C"] for item in range(1, 5)]
+    client = MockClient(rows=list(reversed(rows)))
+    pager = KeysetPager(client, "Items", [("Order", "Edm.String"), ("Item", "Edm.Int32")], bulk_size=2, query={"filter": "Item ne 3"})
+    retrieved_rows = [(row["Order"], row["Item"]) for items in pager.iterate_pages() for row in items]
+    assert retrieved_rows == [(row["Order"], row["Item"]) for row in rows if row["Item"] != 3]
+    assert client.queries[1]["filter"] == "(Item ne 3) and ((Order gt 'A') or (Order eq 'A' and Item gt 2))"
+    assert client.queries[2]["filter"] == "(Item ne 3) and ((Order gt 'B') or (Order eq 'B' and Item gt 1))"
+    assert client.queries[0]["orderby"] == ["Order", "Item"]
+
+
+def test_shards_retrieve_every_row_once():
+    rows = [{"ID": row_id, "Amount": row_id % 40 if row_id % 7 else None} for row_id in range(1000)]
+    client = MockClient(rows=rows)
+    pager = ShardedPager(get_shard_pagers(client, [10, 20, 30], bulk_size=50), buffered_pages=2)
+    assert sorted(get_row_ids(pager)) == list(range(1000))  # the rows without amount are in the first shard
+    assert set(query["filter"] for query in client.queries) == {
+        "(Amount lt 10) or (Amount eq null)", "Amount ge 10 and Amount lt 20", "Amount ge 20 and Amount lt 30", "Amount ge 30"
+    }
+
+
+def test_shard_error_is_raised():
+    client = FailingClient("Amount ge 20", rows=[{"ID": row_id, "Amount": row_id % 40} for row_id in range(1000)])
+    pager = ShardedPager(get_shard_pagers(client, [20], bulk_size=50))
+    with pytest.raises(DataikuException, match="Error 500 on Amount ge 20"):
+        get_row_ids(pager)
+
+
+def test_shards_stop_once_the_pages_are_no_longer_needed():
+    client = MockClient(rows=[{"ID": row_id, "Amount": row_id % 40} for row_id in range(10000)])
+    threads_before = set(threading.enumerate())
+    pages = ShardedPager(get_shard_pagers(client, [10, 20, 30], bulk_size=10), buffered_pages=1).iterate_pages()
+    assert len(next(pages)) == 10
+    pages.close()
+    deadline = time.time() + 5
+    while any(thread.is_alive() for thread in set(threading.enumerate()) - threads_before) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not set(threading.enumerate()) - threads_before
+    assert len(client.queries) < 20
+
+
+def test_sample_shard_boundaries():
+    client = MockClient(rows=[{"ID": row_id, "Amount": row_id % 400 if row_id % 3 else None} for row_id in range(1000)])
+    assert sample_shard_boundaries(client, "Sales", "Amount", 4, edm_type="Edm.Int32") == [99, 199, 299]
+    assert [query["orderby"] for query in client.queries] == [["Amount asc"], ["Amount desc"]]
+    assert client.queries[0]["filter"] == "Amount ne null" and client.queries[0]["select"] == ["Amount"]
+    assert sample_shard_boundaries(client, "Sales", "Amount", 2, edm_type="Edm.Int32", filter="Amount lt 100") == [49]
+    assert client.queries[-1]["filter"] == "(Amount lt 100) and (Amount ne null)"
+
+
+def test_sample_shard_boundaries_of_an_empty_set():
+    assert sample_shard_boundaries(MockClient(rows=[{"ID": 1, "Amount": None}]), "Sales", "Amount", 4) == []
+
+
+def test_sample_shard_boundaries_of_values_that_cant_be_interpolated():
+    client = MockClient(rows=[{"ID": 1, "Code": "A"}, {"ID": 2, "Code": "Z"}])
+    with pytest.raises(DataikuException, match="please enter them manually"):
+        sample_shard_boundaries(client, "Sales", "Code", 4, edm_type="Edm.String")
@@ -0,0 +1,102 @@
+import datetime
+import pytest
+from dataikuapi.utils import DataikuException
+from odata_constants import ODataConstants
+from odata_partitioning import ODataPartitioning
+
+
+def get_partitioning(period="DAY", partitioning_type="time", odata_version=ODataConstants.ODATA_V2, edm_type=None):
+    config = {"partitioning_type": partitioning_type, "partitioning_property": "CreatedAt", "partitioning_period": period}
+    return ODataPartitioning(config, odata_version=odata_version, edm_type=edm_type)
+
+
+@pytest.mark.parametrize("period, partition_id, start, end", [
+    ("YEAR", "2023", datetime.datetime(2023, 1, 1), datetime.datetime(2024, 1, 1)),
+    ("MONTH", "2024-01", datetime.datetime(2024, 1, 1), datetime.datetime(2024, 2, 1)),
+    ("MONTH", "2023-12", datetime.datetime(2023, 12, 1), datetime.datetime(2024, 1, 1)),
+    ("DAY", "2024-02-28", datetime.datetime(2024, 2, 28), datetime.datetime(2024, 2, 29)),
+    ("DAY", "2024-02-29", datetime.datetime(2024, 2, 29), datetime.datetime(2024, 3, 1)),
+    ("DAY", "2023-12-31", datetime.datetime(2023, 12, 31), datetime.datetime(2024, 1, 1)),
+    ("HOUR", "2024-03-10-08", datetime.datetime(2024, 3, 10, 8), datetime.datetime(2024, 3, 10, 9)),
+    ("HOUR", "2023-12-31-23", datetime.datetime(2023, 12, 31, 23), datetime.datetime(2024, 1, 1, 0))
+])
+def test_get_time_range(period, partition_id, start, end):
+    assert get_partitioning(period).get_time_range(partition_id) == (start, end)
+
+
+@pytest.mark.parametrize("period, partition_id", [("DAY", "2024-01"), ("MONTH", "2024-13"), ("HOUR", "2024-01-01"), ("WEEK", "2024-01")])
+def test_get_time_range_rejects_ids_not_matching_the_period(period, partition_id):
+    with pytest.raises(DataikuException, match="does not match the {} period".format(period)):
+        get_partitioning(period).get_time_range(partition_id)
+
+
+@pytest.mark.parametrize("period, partition_id, v2_filter, v4_filter", [
+    (
+        "YEAR", "2023",
+        "CreatedAt ge datetime'2023-01-01T00:00:00' and CreatedAt lt datetime'2024-01-01T00:00:00'",
+        "CreatedAt ge 2023-01-01T00:00:00Z and CreatedAt lt 2024-01-01T00:00:00Z"
+    ),
+    (
+        "MONTH", "2023-12",
+        "CreatedAt ge datetime'2023-12-01T00:00:00' and CreatedAt lt datetime'2024-01-01T00:00:00'",
+        "CreatedAt ge 2023-12-01T00:00:00Z and CreatedAt lt 2024-01-01T00:00:00Z"
+    ),
+    (
+        "DAY", "2024-02-29",
+        "CreatedAt ge datetime'2024-02-29T00:00:00' and CreatedAt lt datetime'2024-03-01T00:00:00'",
+        "CreatedAt ge 2024-02-29T00:00:00Z and CreatedAt lt 2024-03-01T00:00:00Z"
+    ),
+    (
+        "HOUR", "2023-12-31-23",
+        "CreatedAt ge datetime'2023-12-31T23:00:00' and CreatedAt lt datetime'2024-01-01T00:00:00'",
+        "CreatedAt ge 2023-12-31T23:00:00Z and CreatedAt lt 2024-01-01T00:00:00Z"
+    )
+])
+def test_get_partition_filter_for_time_partitions(period, partition_id, v2_filter, v4_filter):
+    assert get_partitioning(period, odata_version=ODataConstants.ODATA_V2).get_partition_filter(partition_id) == v2_filter
+    assert get_partitioning(period, odata_version=ODataConstants.ODATA_V4).get_partition_filter(partition_id) == v4_filter
+
+
+def test_get_partition_filter_uses_the_type_of_the_property():
+    v2_offset = get_partitioning("DAY", odata_version=ODataConstants.ODATA_V2, edm_type="Edm.DateTimeOffset")
+    assert v2_offset.get_partition_filter("2024-01-31") == (
+        "CreatedAt ge datetimeoffset'2024-01-31T00:00:00Z' and CreatedAt lt datetimeoffset'2024-02-01T00:00:00Z'"
+    )
+    v4_date = get_partitioning("MONTH", odata_version=ODataConstants.ODATA_V4, edm_type="Edm.Date")
+    assert v4_date.get_partition_filter("2024-12") == "CreatedAt ge 2024-12-01 and CreatedAt lt 2025-01-01"
+
+
+def test_get_partition_filter_for_discrete_partitions():
+    assert get_partitioning(partitioning_type="discrete").get_partition_filter("FR") == "CreatedAt eq 'FR'"
+    assert get_partitioning(partitioning_type="discrete", odata_version=ODataConstants.ODATA_V4).get_partition_filter("FR") == "CreatedAt eq 'FR'"
+
+
+def test_get_partition_filter_without_partitioning():
+    assert get_partitioning(partitioning_type="none").get_partition_filter("2024-01-01") is None
+    assert get_partitioning("DAY").get_partition_filter(None) is None
+
+
+@pytest.mark.parametrize("period, first_value, last_value, partition_ids", [
+    ("YEAR", "2022-06-15T10:00:00", "2024-01-01T00:00:00", ["2022", "2023", "2024"]),
+    ("MONTH", "2023-11-20", "2024-02-01", ["2023-11", "2023-12", "2024-01", "2024-02"]),
+    ("DAY", "2024-02-27T18:30:00", "2024-03-01T00:00:00", ["2024-02-27", "2024-02-28", "2024-02-29", "2024-03-01"]),
+    ("DAY", "/Date(1703980800000)/", "/Date(1704067199000)/", ["2023-12-31"]),
+    ("HOUR", "2023-12-31T22:15:00Z", "2024-01-01T00:59:59Z", ["2023-12-31-22", "2023-12-31-23", "2024-01-01-00"])
+])
+def test_list_time_partitions(period, first_value, last_value, partition_ids):
+    assert get_partitioning(period).list_time_partitions(first_value, last_value) == partition_ids
+
+
+def test_list_time_partitions_converts_offsets_to_utc():
+    partitioning = get_partitioning("MONTH", odata_version=ODataConstants.ODATA_V4)
+    assert partitioning.list_time_partitions("2023-12-31T23:30:00-01:00", "2024-02-29T23:00:00+01:00") == ["2024-01", "2024-02"]
+
+
+def test_list_time_partitions_ends_now_by_default():
+    partitioning = get_partitioning("YEAR")
+    this_year = datetime.datetime.utcnow().strftime("%Y")
+    assert partitioning.list_time_partitions("2020-01-01")[-1] == this_year
+
+
+def test_list_time_partitions_of_an_invalid_value():
+    assert get_partitioning("DAY").list_time_partitions("not a date") == []
@@ -0,0 +1,57 @@
+import json
+import pytest
+from odata_stream import ODataPageStream
+
+
+def iterate_chunks(body, chunk_size):
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def stream(page, chunk_size=7):
+    body = json.dumps(page, ensure_ascii=False, indent=1).encode("utf-8")
+    return ODataPageStream(iterate_chunks(body, chunk_size)).open()
+
+
+ROWS = [
+    {"__metadata": {"uri": "Entity(1)"}, "ID": 1, "Name": "Café €", "Amount": 12345678901234567890},
+    {"__metadata": {"uri": "Entity(2)"}, "ID": 2, "Name": "a \"quoted\" name", "Amount": 1.5e-10},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 65536])
+def test_v2_results_and_next_link(chunk_size):
+    page = stream({"d": {"results": ROWS, "__count": "2", "__next": "Entity?$skiptoken=2"}}, chunk_size)
+    assert list(page) == ROWS
+    assert page.next_page_url == "Entity?$skiptoken=2"
+    assert page.count == "2"
+    assert page.row_count == 2
+
+
+def test_v4_value_and_next_link_before_rows():
+    page = stream({"@odata.context": "$metadata#Entity", "@odata.nextLink": "Entity?$skip=2", "value": ROWS})
+    assert list(page) == ROWS
+    assert page.next_page_url == "Entity?$skip=2"
+
+
+def test_v2_single_entity():
+    assert list(stream({"d": {"ID": 1, "Name": "one"}})) == [{"ID": 1, "Name": "one"}]
+
+
+def test_empty_pages():
+    assert not stream({"d": {"results": []}})
+    assert not stream({"value": []})
+    assert not ODataPageStream([]).open()
+
+
+def test_error_is_detected_before_rows():
+    error = {"code": "/IWBEP/CM_MGW_RT/004", "message": {"value": "Metadata cache on"}}
+    page = stream({"error": error})
+    assert not page
+    assert page.error == error
+
+
+def test_truncated_page_raises():
+    body = json.dumps({"d": {"results": ROWS}}).encode("utf-8")[:-10]
+    with pytest.raises(ValueError):
+        list(ODataPageStream(iterate_chunks(body, 5)).open())
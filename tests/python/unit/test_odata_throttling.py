@@ -0,0 +1,87 @@
+import datetime
+from email.utils import format_datetime
+from odata_throttling import AdaptiveConcurrencyLimiter, Backoff, get_request_kind, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    in_a_minute = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=60)
+    assert 55 < parse_retry_after(format_datetime(in_a_minute, usegmt=True)) <= 60
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    backoff = Backoff(base_delay=1, max_delay=10)
+    for attempt in range(10):
+        assert 0 <= backoff.get_delay(attempt) <= min(10, 2 ** attempt)
+    assert backoff.get_delay(0, retry_after=30) >= 30
+
+
+def test_limiter_halves_the_effective_concurrency_when_throttled():
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency=32)
+    for _ in range(8):
+        limiter.acquire()
+    limiter.on_throttled("error 429")
+    assert limiter.limit == 4
+    limiter.on_throttled("error 429")
+    assert limiter.limit == 4  # cool down
+
+
+def test_limiter_grows_additively_when_the_limit_is_reached():
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency=8)
+    limiter.limit = 2
+    for _ in range(2):
+        limiter.acquire()
+    for _ in range(2):
+        limiter.on_success(0.1)
+    assert limiter.limit == 3
+
+
+def test_limiter_does_not_grow_while_latency_degrades():
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency=8)
+    for _ in range(8):
+        limiter.acquire()
+    limiter.limit = 2
+    limiter.on_success(0.1)
+    for _ in range(5):
+        limiter.on_success(3.0)
+    limit = limiter.limit
+    for _ in range(20):
+        limiter.on_success(3.0)
+    assert limiter.limit == limit  # slow answers hold the limit back, without decreasing it
+    for _ in range(20):
+        limiter.on_success(0.1)
+    assert limiter.limit > limit
+
+
+def test_limiter_try_acquire_does_not_wait():
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
+
+def test_large_pages_are_not_compared_to_small_requests():
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency=8)
+    for _ in range(8):
+        limiter.acquire()
+    limiter.on_throttled("error 429")
+    assert limiter.limit == 4
+    limiter.on_success(0.02, get_request_kind("GET", "https://host/service/$metadata"))
+    limiter.on_success(0.03, get_request_kind("GET", "https://host/service/Products/$count"))
+    page_kind = get_request_kind("GET", "https://host/service/Products?$skip=0&$top=10000")
+    for latency in [2.0, 2.5, 1.8, 3.0] * 10:
+        limiter.on_success(latency, page_kind)
+    assert limiter.limit > 4
+    limit = limiter.limit
+    for _ in range(20):
+        limiter.on_success(12.0, page_kind)
+    assert limiter.limit == limit
+
+
+def test_request_kind():
+    assert get_request_kind("GET", "https://host/service/Products?$skip=0&$top=500") == get_request_kind("GET", "https://host/service/Products?$top=500&$skip=9000")
+    assert get_request_kind("GET", "https://host/service/Products?$top=500") != get_request_kind("GET", "https://host/service/Products?$top=1")
+    assert get_request_kind("GET", "https://host/service/Products?$top=500") != get_request_kind("GET", "https://host/service/Products/$count")
@@ -0,0 +1,21 @@
+from odata_tuning import BulkSizeTuner
+
+
+def test_grows_toward_the_target_duration_by_steps():
+    tuner = BulkSizeTuner(1000, target_duration=5, max_page_bytes=10 ** 9)
+    # 0.5s to first byte, 1ms per row: 4500 rows fill 5 seconds
+    assert tuner.observe(1000, {"ttfb": 0.5, "duration": 1.5, "bytes": 100000}) == 4000
+    assert tuner.observe(4000, {"ttfb": 0.5, "duration": 4.5, "bytes": 400000}) == 4500
+
+
+def test_shrinks_under_the_memory_ceiling():
+    tuner = BulkSizeTuner(1000, target_duration=60, max_page_bytes=1000 * 1000)
+    # 4KB per row: at most 250 rows per MB
+    assert tuner.observe(1000, {"ttfb": 0.1, "duration": 0.2, "bytes": 4000 * 1000}) == 250
+
+
+def test_stops_after_the_tuning_pages():
+    tuner = BulkSizeTuner(1000, target_duration=5, tuning_pages=1)
+    tuner.observe(1000, {"ttfb": 0.5, "duration": 1.5, "bytes": 100000})
+    assert not tuner.is_tuning()
+    assert tuner.observe(4000, {"ttfb": 0.5, "duration": 40, "bytes": 100000}) == 4000
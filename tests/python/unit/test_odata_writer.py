@@ -0,0 +1,50 @@
+import json
+import pytest
+from dataikuapi.utils import DataikuException
+
+pytest.importorskip("dataiku.connector")
+from odata_batch import BatchPartResponse  # noqa: E402
+from odata_writer import ODataWriter  # noqa: E402
+
+
+class MockClient(object):
+    """
+    Accepts the changesets, except the ones listed in failures: a status code fails the changeset in the $batch
+    response, an exception fails the whole $batch request
+    """
+    odata_version = "v2"
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.changesets = []
+
+    def post_changeset(self, entity, payloads):
+        self.changesets.append(payloads)
+        failure = self.failures.get(len(self.changesets))
+        if isinstance(failure, Exception):
+            raise failure
+        if failure:
+            error = {"error": {"code": "SY/530", "message": {"value": "Duplicate key"}}}
+            return [BatchPartResponse(failure, "Bad Request", {}, json.dumps(error).encode("utf-8"))]
+        return [BatchPartResponse(201, "Created", {}, b"{}") for _ in payloads]
+
+
+def write_rows(client, row_count):
+    writer = ODataWriter(client, "Products", {"columns": [{"name": "ID"}, {"name": "Name"}]}, changeset_size=10)
+    for row_id in range(row_count):
+        writer.write_row([row_id, "name {}".format(row_id)])
+    writer.close()
+    return writer
+
+
+def test_failed_changesets_do_not_abort_the_write():
+    client = MockClient(failures={
+        2: 400,
+        3: DataikuException("$batch request failed with error 504: Gateway Timeout")
+    })
+    writer = write_rows(client, 45)
+    assert len(client.changesets) == 5
+    assert client.changesets[4] == [{"ID": row_id, "Name": "name {}".format(row_id)} for row_id in range(40, 45)]
+    assert writer.written_rows == 25
+    assert writer.failed_rows == 20
+    assert writer.failed_changesets == 2